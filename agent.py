@@ -1,55 +1,105 @@
-from smolagents import CodeAgent, LiteLLMModel
 import pandas as pd
-import json, os
+import contextvars, json, os, time, queue, threading
+from concurrent.futures import ThreadPoolExecutor
 import plotly.graph_objs as go
 import streamlit as st
-from dotenv import load_dotenv
+from smolagents.memory import ActionStep
+from pool import agent_pool, AGENT_MODEL_ID
+from sandbox import SandboxExecutor
+from sql_engine import is_large
+from cache import dataset_cache, split_sheet
+from response_cache import response_cache
+from tracing import tracer
 
-load_dotenv()
+# Runs the figure and answer agents of a question side by side.
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INDIUS_ANSWER_WORKERS", "8")), thread_name_prefix="indius-answer"
+)
 
-def response_code(question, file_name, data_info):
-    model = LiteLLMModel(
-        model_id="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY")
-    )
+def load_step(file_name, df):
+    """Describe how the generated script gets its data."""
+    if df is not None:
+        return f"Use the pandas DataFrame 'df' that is already loaded from 'files/{file_name}'; do not read the file again."
+    if is_large(f"files/{file_name}"):
+        return (f"The file 'files/{file_name}' is too large to load with pandas. Do not read it; compute what you need "
+                "with the sql tool, which queries the whole file as the table 'data' and returns a small DataFrame.")
+    path, sheet = split_sheet(f"files/{file_name}")
+    if path.endswith("xlsx"):
+        return (f"Read the sheet {sheet!r} of " if sheet else "Read ") + (
+            f"the Excel file located at '{path}' with pd.read_excel(..., engine='calamine') "
+            "and store it in a variable called 'df'.")
+    return f"Read the CSV file located at 'files/{file_name}' using pandas and store it in a variable called 'df'."
 
-    agent = CodeAgent(
-        tools=[],
-        model=model,
-        additional_authorized_imports=["pandas"]
-    )
+def step_event(stage, step):
+    """Describe a finished agent step for progressive rendering."""
+    return {
+        "type": "step",
+        "stage": stage,
+        "step": step.step_number,
+        "code": step.tool_calls[0].arguments if step.tool_calls else None,
+        "observations": step.observations,
+        "error": str(step.error) if step.error else None,
+        "duration": step.duration,
+    }
 
-    query = f"""
-    Consider this dataset example: {data_info}
+def stream_agent(profile, question, file_name, query, df, accept=None, cancel=None):
+    """Run a pooled agent and yield an event per step, ending with a "final" event.
+
+    A cached answer for this question and version of the file is yielded as the
+    final event straight away. Setting the cancel event stops the run, including
+    a code action that is still executing.
+    """
+    with tracer.span(f"agent.{profile}") as span:
+        dataset = dataset_cache.dataset_key(f"files/{file_name}")
+        found, result = response_cache.get(profile, dataset, question, AGENT_MODEL_ID, fuzzy=True)
+        if span:
+            span.set(cached=found)
+        if not found:
+            with agent_pool.checkout(profile) as agent:
+                agent.tools["sql"].file_path = f"files/{file_name}"
+                if isinstance(agent.python_executor, SandboxExecutor):
+                    # The sandbox worker loads its own copy of the file as df.
+                    agent.python_executor.attach(f"files/{file_name}", cancel, preload=df is not None)
+                elif df is not None:
+                    # Shallow copy: with copy-on-write the shared cached frame stays untouched.
+                    agent.state["df"] = df.copy(deep=False)
+                for step in agent.run(query, stream=True):
+                    if cancel is not None and cancel.is_set():
+                        return
+                    if isinstance(step, ActionStep):
+                        tracer.record(
+                            "agent.step", step.start_time, step.end_time, agent=profile, step=step.step_number,
+                            input_tokens=agent.model.last_input_token_count or 0,
+                            output_tokens=agent.model.last_output_token_count or 0,
+                            **({"error": str(step.error)} if step.error else {}),
+                        )
+                        yield step_event(profile, step)
+                    else:
+                        result = step
+            if accept is None or accept(result):
+                response_cache.put(profile, dataset, question, AGENT_MODEL_ID, result)
+        yield {"type": "final", "stage": profile, "result": result}
+
+def is_figure(result):
+    return isinstance(result, go.Figure)
+
+def code_query(question, file_name, data_info, df=None):
+    return f"""
+    Consider this dataset (its columns, types, ranges and sample rows are listed, so there is no need to inspect it):
+    {data_info}
     Create a Python script that does the following steps:
-    1. Read the CSV file located at 'files/{file_name}' using pandas and store it in a variable called 'df'.
+    1. {load_step(file_name, df)}
     2. Analyze the data to answer the user's question: "{question}".
     3. Return the answers for the above question as string not json.
     """
 
-    try:
-        result = agent.run(query)
-        return result
-    except Exception as e:
-        return e
-
-def response_fig(question, file_name, data_info):
-    model = LiteLLMModel(
-        model_id="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY")
-    )
-
-    agent = CodeAgent(
-        tools=[],
-        model=model,
-        additional_authorized_imports=["pandas", "plotly.express", "plotly.graph_objects", "json"]
-    )
-
+def fig_query(question, file_name, data_info, df=None):
     # Improved query with stricter instructions
-    query = f"""
-    Consider this dataset example: {data_info}
+    return f"""
+    Consider this dataset (its columns, types, ranges and sample rows are listed, so there is no need to inspect it):
+    {data_info}
     Create a Python script that does the following steps:
-    1. Read the CSV file located at 'files/{file_name}' using pandas and store it in a variable called 'df'.
+    1. {load_step(file_name, df)}
     2. Analyze the data to answer the user's question: "{question}".
     3. Create a Plotly graph using plotly.graph_objects (go.Figure) to visualize the answer.
     4. Ensure the plot is visually appealing for a dark background:
@@ -59,43 +109,78 @@ def response_fig(question, file_name, data_info):
     6. Return only the 'fig' object at the end of the script (do not print or return anything else).
     """
 
-    try:
-        result = agent.run(query)
-
-        # Stricter validation
-        if isinstance(result, go.Figure):
-            return result
-        else:
-            error_msg = f"Generated result is not a Plotly Figure: got {type(result)} instead"
-            return None
-
-    except Exception as e:
-        error_msg = f"Code execution failed: {str(e)}"
-        return None
-
-def response_code_run(hypothesis, file_name, data_info):
-    model = LiteLLMModel(
-        model_id="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY")
-    )
-
-    agent = CodeAgent(
-        tools=[],
-        model=model,
-        additional_authorized_imports=["pandas", "numpy", "sklearn", "math", "statistics"]
-    )
-
-    query = f"""
-    Consider this dataset example: {data_info}
+def hypothesis_query(hypothesis, file_name, data_info, df=None):
+    return f"""
+    Consider this dataset (its columns, types, ranges and sample rows are listed, so there is no need to inspect it):
+    {data_info}
     Create a Python script that does the following steps:
-    1. Read the CSV file located at 'files/{file_name}' using pandas.
+    1. {load_step(file_name, df)}
     2. Analyze the data to answer user's hypothesis: {hypothesis}.
     3. Return the result of the hypothesis with the statistical test you used as a string.
     4. Ensure the returned result has the used statistical test being run to test the hypothesis, followed by the key results (e.g., p-value, coefficients, etc.).
     """
 
+def stream_hypothesis(hypothesis, file_name, data_info, df=None):
+    """Yield the hypothesis agent's step events, ending with a "final" event."""
+    query = hypothesis_query(hypothesis, file_name, data_info, df)
     try:
-        result = agent.run(query)
-        return result
+        yield from stream_agent("hypothesis", hypothesis, file_name, query, df)
     except Exception as e:
-        return e
+        yield {"type": "final", "stage": "hypothesis", "result": e}
+
+def answer_streams(question, file_name, data_info, df=None, cancel=None):
+    """Return the figure and answer agents' event streams for a question, keyed by stage."""
+    with tracer.span("prompt"):
+        queries = {
+            "figure": fig_query(question, file_name, data_info, df),
+            "answer": code_query(question, file_name, data_info, df),
+        }
+    return {
+        "figure": stream_agent("figure", question, file_name, queries["figure"], df, accept=is_figure, cancel=cancel),
+        "answer": stream_agent("answer", question, file_name, queries["answer"], df, cancel=cancel),
+    }
+
+def stream_answer(question, file_name, data_info, df=None):
+    """Run the figure and answer agents concurrently, yielding their step events as they happen.
+
+    The last event has type "done" and carries the answer, the figure (or None)
+    and per-stage timings.
+    """
+    start = time.perf_counter()
+    events = queue.Queue()
+    cancel = threading.Event()
+
+    def pump(stage, stream):
+        began = time.perf_counter()
+        try:
+            for event in stream:
+                events.put(event)
+        except Exception as e:
+            events.put({"type": "final", "stage": stage, "result": e})
+        events.put({"type": "timing", "stage": stage, "seconds": time.perf_counter() - began})
+
+    for stage, stream in answer_streams(question, file_name, data_info, df, cancel).items():
+        # Carry the current trace into the pump thread.
+        executor.submit(contextvars.copy_context().run, pump, stage, stream)
+
+    results, timings = {}, {}
+    try:
+        while len(timings) < 2:
+            event = events.get()
+            if event["type"] == "timing":
+                timings[f"{event['stage']} agent"] = event["seconds"]
+            elif event["type"] == "final":
+                results[event["stage"]] = event["result"]
+            else:
+                yield event
+    finally:
+        # A consumer that stops early (e.g. a Streamlit rerun) stops both agents.
+        cancel.set()
+    timings["total"] = time.perf_counter() - start
+    figure = results.get("figure")
+    yield {
+        "type": "done",
+        "answer": results.get("answer"),
+        "figure": figure if is_figure(figure) else None,
+        "timings": timings,
+    }
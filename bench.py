@@ -0,0 +1,692 @@
+#!/usr/bin/env python3
+"""Benchmarks and load tests for the app's slow paths.
+
+Model calls are answered by a local fake_llm server after --latency seconds
+(varied by up to --jitter), from scripted replies that suit any fastfood-like
+dataset, and first from --replay, a recording of real replies (see fake_llm.py),
+so runs are repeatable, offline and free.
+
+data: write synthetic datasets of any size, resampled from fastfood.csv with
+noise and numbered item variants, missing values kept. They are stored in
+--data-dir and reused by the commands below.
+
+pipeline: time each stage behind the page on datasets of growing size, each in
+a fresh interpreter: load_data (first parse, from the Arrow sidecar, from the
+frame cache), the summary profile (first and cached), the dataset card, the
+question agents and the plot agent.
+
+load: run --sessions browser sessions at once, each a headless AppTest in its
+own process that opens the page, then --iterations times clicks a suggested
+question, asks its own question, draws a plot and reruns. The sessions share
+one worker service (service.py), as Streamlit replicas would, unless --local.
+
+pipeline and load print p50/p95/p99 latency per step, throughput and the peak
+RSS of the whole process tree, sandbox workers and service included. --out
+saves the result as JSON; compare prints the change between two saved results.
+
+excel: time loading Excel sheets of growing size through each reader the app
+could use. For every size a one-sheet workbook of mixed numeric, text,
+categorical and date columns is written (needs xlsxwriter), then read with:
+
+  openpyxl   pd.read_excel's default engine, if installed
+  calamine   pd.read_excel(engine="calamine"), as the app parses sheets
+  sidecar    a repeat load from the Arrow sidecar the first load stored
+
+startup: time a Streamlit cold start and the reruns after it, each trial in a
+fresh interpreter:
+
+  imports    the import block at the top of main.py
+  first run  the first page run after those imports, with the first file
+             selected and model calls answered by a local fake_llm server
+  rerun      a page rerun once background work has settled (median)
+
+Give --app another checkout to compare before and after a change.
+
+Examples:
+  python bench.py data --rows 100000 1000000 10000000
+  python bench.py pipeline --rows 10000 1000000 --out before.json
+  python bench.py load --sessions 8 --iterations 3 --latency 1.5 --out load.json
+  python bench.py compare before.json after.json
+  python bench.py excel --rows 10000 100000 500000
+  python bench.py startup --trials 3 --app ../indius-main
+"""
+
+import argparse
+import ast
+import json
+import os
+import resource
+import secrets
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(APP_DIR, "fastfood.csv")
+DATA_DIR = os.path.join(".cache", "bench")
+
+# Packages main.py should not need until a question, plot or hypothesis is asked.
+HEAVY_PACKAGES = ("smolagents", "litellm", "google.genai", "scipy")
+RESULT_MARK = "bench result: "
+
+# A reply for each kind of prompt the app sends, found by text the prompt
+# contains; the first match wins, so the figure prompt goes before the answer
+# prompt it extends. Agent replies run on any frame with a numeric column.
+SCRIPTED_REPLIES = [
+    {"match": "three interesting questions",
+     "reply": '["Which restaurant has the most calories on average?", '
+              '"How does sodium relate to calories?", "Which items have the most protein?"]'},
+    {"match": "Create a Plotly graph",
+     "reply": "Thought: Chart the first numeric column.\nCode:\n```py\nimport plotly.graph_objects as go\n"
+              "column = list(df.select_dtypes('number').columns)[0]\n"
+              "fig = go.Figure(go.Histogram(x=df[column]))\nfinal_answer(fig)\n```<end_code>"},
+    {"match": "answer the user's question",
+     "reply": "Thought: Summarize the numbers.\nCode:\n```py\n"
+              "final_answer(df.describe().to_string())\n```<end_code>"},
+    {"match": "Returns the fig object",
+     "reply": "Thought: Draw the chart.\nCode:\n```py\nimport plotly.graph_objects as go\n"
+              "fig = go.Figure(go.Bar(x=[1, 2, 3], y=[3, 1, 2]))\nfinal_answer(fig)\n```<end_code>"},
+    {"match": "Map this hypothesis", "reply": '{"test": null}'},
+    {"match": "hypothes", "reply": "1. Calories differ by restaurant - compare the group means with an ANOVA."},
+]
+
+QUESTIONS = (
+    "What is the average calories per restaurant",
+    "Which items have the most sodium",
+    "How are protein and calories related",
+)
+
+
+def timed(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def write_workbook(path, rows, seed=0):
+    """Write a workbook whose first sheet holds rows rows of synthetic data."""
+    import numpy as np
+    import xlsxwriter
+
+    rng = np.random.default_rng(seed)
+    columns = {
+        "id": np.arange(rows),
+        "amount": rng.normal(100, 25, rows).round(2),
+        "quantity": rng.integers(1, 50, rows),
+        "region": rng.choice(["north", "south", "east", "west"], rows),
+        "note": [f"order {i}" for i in range(rows)],
+    }
+    start = np.datetime64("2020-01-01")
+    dates = (start + rng.integers(0, 1500, rows).astype("timedelta64[D]")).astype("datetime64[s]").tolist()
+    # constant_memory streams rows to disk, so the writer stays small for big sheets.
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    sheet = workbook.add_worksheet("data")
+    date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+    names = list(columns) + ["date"]
+    sheet.write_row(0, 0, names)
+    values = [columns[name].tolist() if isinstance(columns[name], np.ndarray) else columns[name] for name in columns]
+    for i in range(rows):
+        sheet.write_row(i + 1, 0, [column[i] for column in values])
+        sheet.write_datetime(i + 1, len(values), dates[i], date_format)
+    workbook.close()
+
+
+def bench(rows, directory):
+    """Return {reader: seconds} for one sheet of rows rows."""
+    import pandas as pd
+
+    import ingest
+
+    path = os.path.join(directory, f"bench_{rows}.xlsx")
+    write_workbook(path, rows)
+    results = {}
+    try:
+        import openpyxl  # noqa: F401
+        results["openpyxl"] = timed(lambda: pd.read_excel(path, engine="openpyxl"))
+    except ImportError:
+        results["openpyxl"] = None
+    results["calamine"] = timed(lambda: ingest.read_sheet(path))
+    results["first load"] = timed(lambda: ingest.load_table(path))
+    results["sidecar"] = timed(lambda: ingest.load_table(path))
+    results["size MB"] = os.path.getsize(path) / 1024 ** 2
+    return results
+
+
+def synthesize(path, rows, source=SOURCE, seed=0, chunk_rows=1_000_000):
+    """Write a CSV of rows rows resampled from source, a chunk at a time.
+
+    Rows are drawn with replacement. Numbers get noise of a tenth of their
+    column's spread, keeping its precision and sign; text with mostly distinct
+    values (item names) gets numbered variants, so distinct counts grow with
+    the file. Missing values stay missing.
+    """
+    import numpy as np
+    import pandas as pd
+
+    base = pd.read_csv(source)
+    rng = np.random.default_rng(seed)
+    variants = max(1, rows // len(base))
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        chunk = base.iloc[rng.integers(0, len(base), n)].reset_index(drop=True)
+        for name in base.columns:
+            column = base[name]
+            if pd.api.types.is_numeric_dtype(column):
+                noisy = chunk[name] + rng.normal(0, column.std() / 10, n)
+                if column.min() >= 0:
+                    noisy = noisy.clip(lower=0)
+                chunk[name] = noisy.round().astype(column.dtype) if column.dtype.kind == "i" else noisy.round(1)
+            elif column.nunique() > len(column) / 2:
+                chunk[name] = chunk[name] + " #" + rng.integers(0, variants, n).astype(str)
+        chunk.to_csv(path, mode="w" if start == 0 else "a", header=start == 0, index=False)
+
+
+def dataset(rows, data_dir=DATA_DIR):
+    """Return the path of the synthetic dataset of rows rows, writing it if needed."""
+    path = os.path.abspath(os.path.join(data_dir, f"fastfood_{rows}.csv"))
+    if not os.path.exists(path):
+        os.makedirs(data_dir, exist_ok=True)
+        synthesize(path + ".part", rows)
+        os.replace(path + ".part", path)
+    return path
+
+
+def workspace(data_file):
+    """Make a directory to run the app in, with data_file as its only dataset.
+
+    The app's modules are linked in; its files, sidecars and caches stay in the
+    workspace, away from the checkout's.
+    """
+    directory = tempfile.mkdtemp(prefix="indius-bench-")
+    for name in os.listdir(APP_DIR):
+        if name.endswith(".py") or name == "logo.png":
+            os.symlink(os.path.join(APP_DIR, name), os.path.join(directory, name))
+    os.makedirs(os.path.join(directory, "files"))
+    os.symlink(os.path.abspath(data_file), os.path.join(directory, "files", os.path.basename(data_file)))
+    return directory
+
+
+def fake_server(args):
+    from fake_llm import FakeLLMServer, Recording
+
+    replies = Recording(args.replay, entries=SCRIPTED_REPLIES)
+    return FakeLLMServer(replies, latency=args.latency, jitter=args.jitter, seed=args.seed).start()
+
+
+def app_env(server, directory):
+    """Environment for app processes answered by server, with their caches in directory."""
+    return {
+        **os.environ,
+        "INDIUS_LLM_API_BASE": server.url,
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "bench"),
+        "INDIUS_RESPONSE_CACHE": os.path.join(directory, ".cache", "responses.sqlite3"),
+    }
+
+
+def child_result(command, cwd=None, env=None):
+    """Run this script with command in a fresh interpreter and return the result it prints."""
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), *command],
+        cwd=cwd, env=env, capture_output=True, text=True,
+    )
+    # Agents log their steps to stdout too; the result is on the marked line.
+    lines = [line for line in out.stdout.splitlines() if line.startswith(RESULT_MARK)]
+    if out.returncode or not lines:
+        raise RuntimeError(f"bench {' '.join(command)} failed:\n{out.stderr[-2000:]}")
+    return json.loads(lines[-1][len(RESULT_MARK):])
+
+
+def percentiles(samples):
+    import numpy as np
+
+    return {
+        "count": len(samples),
+        "p50": float(np.percentile(samples, 50)),
+        "p95": float(np.percentile(samples, 95)),
+        "p99": float(np.percentile(samples, 99)),
+    }
+
+
+def tree_rss(pid):
+    """Return the resident bytes of process pid and all its descendants, read from /proc."""
+    rss, children = {}, {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Fields after the command name: state, ppid, ... rss is the 22nd.
+                fields = f.read().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        rss[int(entry)] = int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+        children.setdefault(int(fields[1]), []).append(int(entry))
+    total, pending = 0, [pid]
+    while pending:
+        current = pending.pop()
+        total += rss.get(current, 0)
+        pending.extend(children.get(current, ()))
+    return total
+
+
+class PeakMemory:
+    """Sample the memory of this process and its descendants during a with-block.
+
+    peak is in bytes. Without /proc it is this process's own peak only.
+    """
+
+    def __init__(self, interval=0.2):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, tree_rss(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.peak = max(self.peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def top_level_imports(script):
+    """Compile the import statements at the top of a script, up to its first other statement."""
+    with open(script) as f:
+        tree = ast.parse(f.read())
+    body = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            break
+        body.append(node)
+    return compile(ast.Module(body=body, type_ignores=[]), script, "exec")
+
+
+def measure_startup(app, reruns, settle):
+    """Measure one cold start of app's main.py in this, fresh, interpreter."""
+    from fake_llm import FakeLLMServer, Recording
+
+    # The app's modules, not this checkout's, must be the ones imported.
+    sys.path[0] = app
+    os.chdir(app)
+    cache = tempfile.mkdtemp(prefix="indius-bench-")
+    server = FakeLLMServer(Recording(entries=SCRIPTED_REPLIES)).start()
+    os.environ.update(
+        INDIUS_LLM_API_BASE=server.url,
+        GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "bench"),
+        INDIUS_RESPONSE_CACHE=os.path.join(cache, "responses.sqlite3"),
+    )
+    try:
+        code = top_level_imports("main.py")
+        imports = timed(lambda: exec(code, {"__name__": "bench_imports"}))
+        heavy = [name for name in HEAVY_PACKAGES if name in sys.modules]
+
+        from streamlit.testing.v1 import AppTest
+
+        page = AppTest.from_file("main.py", default_timeout=120)
+        first = timed(page.run)
+        # Let background work the first run started (imports, prefetching) finish.
+        time.sleep(settle)
+        reruns = [timed(page.run) for _ in range(reruns)]
+        errors = [str(e.value) for e in page.exception]
+    finally:
+        server.stop()
+        shutil.rmtree(cache)
+    return {"imports": imports, "first run": first, "rerun": statistics.median(reruns),
+            "heavy": heavy, "errors": errors}
+
+
+def startup(app, trials, reruns, settle):
+    """Return the median of each startup measure over trials fresh interpreters."""
+    results = [
+        child_result(["startup", "--app", app, "--reruns", str(reruns), "--settle", str(settle), "--measure"])
+        for _ in range(trials)
+    ]
+    summary = {key: statistics.median(r[key] for r in results) for key in ("imports", "first run", "rerun")}
+    summary["heavy"] = results[-1]["heavy"]
+    summary["errors"] = results[-1]["errors"]
+    return summary
+
+
+def measure_pipeline(file_name, repeats):
+    """Time each stage behind the page for files/<file_name>, in this, fresh, interpreter."""
+    import plotly.graph_objs as go
+
+    import service
+    from agent import stream_answer
+    from cache import dataset_cache
+    from card import dataset_card
+    from charts import PLOT_TYPES
+    from plot import generate_plot
+    from profiler import profile_dataset
+
+    file_path = f"files/{file_name}"
+    samples = {}
+
+    def measure(stage, fn):
+        samples.setdefault(stage, []).append(timed(fn))
+
+    measure("load_data first parse", lambda: service.load_frame(file_path))
+    for _ in range(repeats):
+        dataset_cache.invalidate(file_path)
+        measure("load_data sidecar", lambda: service.load_frame(file_path))
+        measure("load_data cached", lambda: service.load_frame(file_path))
+    df = service.load_frame(file_path)
+    measure("summary profile first", lambda: profile_dataset(file_path, df))
+    for _ in range(repeats):
+        measure("summary profile cached", lambda: profile_dataset(file_path, df))
+    measure("dataset card", lambda: dataset_card(file_path, df))
+    data_info = dataset_card(file_path, df)
+
+    # As after the page's first run: agents created, code workers holding the frame.
+    service.warm_up()
+    service.preload_workers(file_path)
+    frame = service.agent_frame(file_path)
+    columns = df.columns.tolist()
+    results = {}
+    for i in range(repeats):
+        # A new question and chart each time, so the response cache never answers.
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (run {i})?"
+        measure("question agents",
+                lambda: results.update(done=list(stream_answer(question, file_name, data_info, frame))[-1]))
+        chart = f"{PLOT_TYPES[i % len(PLOT_TYPES)]} (run {i})"
+        measure("plot agent",
+                lambda: results.update(plot=generate_plot(data_info, file_name, chart, columns[0], columns[-1])))
+        # The scripted replies always succeed; a failed run would time the error path instead.
+        if results["done"]["figure"] is None or not isinstance(results["done"]["answer"], str):
+            raise RuntimeError(f"question agents failed on {question!r}: {results['done']['answer']!r}")
+        if not isinstance(results["plot"], go.Figure):
+            raise RuntimeError(f"plot agent failed on {chart!r}: {results['plot']!r}")
+    return {
+        "rows": len(df),
+        "throughput": {stage: len(times) / sum(times) for stage, times in samples.items()},
+        "latency": {stage: percentiles(times) for stage, times in samples.items()},
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def pipeline(args):
+    """Run measure_pipeline for each dataset size in a fresh interpreter and workspace."""
+    server = fake_server(args)
+    results = {}
+    try:
+        for rows in args.rows:
+            data_file = dataset(rows, args.data_dir)
+            directory = workspace(data_file)
+            try:
+                with PeakMemory() as memory:
+                    result = child_result(
+                        ["pipeline", "--measure", os.path.basename(data_file), "--repeats", str(args.repeats)],
+                        cwd=directory, env=app_env(server, directory),
+                    )
+                # The agents' code runs in sandbox workers, outside the measured interpreter.
+                result["peak_rss_mb"] = max(result["peak_rss_mb"], memory.peak / 1024 ** 2)
+                results[f"{rows} rows"] = result
+            finally:
+                shutil.rmtree(directory)
+    finally:
+        server.stop()
+    return {"command": "pipeline", "config": settings(args), "datasets": results}
+
+
+def run_session(file_name, session, iterations):
+    """Drive one browser session through the page; return [action, seconds, ok] per step."""
+    from streamlit.testing.v1 import AppTest
+
+    page = AppTest.from_file("main.py", default_timeout=600)
+    steps = []
+
+    def act(action, *inputs):
+        for give in inputs:
+            give()
+        seconds = timed(page.run)
+        # A step fails on an exception, or on an error shown instead of a result.
+        steps.append([action, seconds, not page.exception and not page.error])
+
+    act("open")
+    chooser = next(box for box in page.selectbox if box.label == "Select a file to analyze")
+    if chooser.value != file_name:
+        act("open", lambda: chooser.select(file_name))
+    for i in range(iterations):
+        suggested = page.session_state["questions"][i % 3]
+        act("suggested question", lambda: next(b for b in page.button if b.label == suggested).click())
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} (session {session}, run {i})?"
+        act("ask", lambda: page.text_input(key="tab1_input").input(question),
+            lambda: page.button(key="ask_button").click())
+        act("plot", lambda: page.button(key="plot_button").click())
+        act("rerun")
+    return steps
+
+
+def load(args):
+    """Run args.sessions sessions at once on one dataset and summarize their steps."""
+    server = fake_server(args)
+    data_file = os.path.abspath(args.dataset) if args.dataset else dataset(args.rows, args.data_dir)
+    directory = workspace(data_file)
+    env = app_env(server, directory)
+    worker = None
+    if not args.local:
+        env["INDIUS_SERVICE"] = os.path.join(directory, "indius.sock")
+        env["INDIUS_SERVICE_KEY"] = secrets.token_hex(16)
+        worker = subprocess.Popen(
+            [sys.executable, "service.py", "--address", env["INDIUS_SERVICE"]],
+            cwd=directory, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        while not os.path.exists(env["INDIUS_SERVICE"]):
+            time.sleep(0.1)
+    # AppTest cannot run sessions on threads of one interpreter, so each is a process.
+    command = ["load", "--session", os.path.basename(data_file), "--iterations", str(args.iterations)]
+    results, errors = [], []
+
+    def session(i):
+        try:
+            results.append(child_result(command + ["--session-id", str(i)], cwd=directory, env=env))
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    try:
+        with PeakMemory() as memory:
+            started = time.perf_counter()
+            threads = [threading.Thread(target=session, args=(i,)) for i in range(args.sessions)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+    finally:
+        if worker:
+            worker.terminate()
+            worker.wait()
+        server.stop()
+        shutil.rmtree(directory)
+    steps = [step for result in results for step in result]
+    times = {}
+    for action, seconds, _ in steps:
+        times.setdefault(action, []).append(seconds)
+    return {
+        "command": "load",
+        "config": settings(args),
+        "seconds": elapsed,
+        "throughput": len(steps) / elapsed,
+        "latency": {action: percentiles(samples) for action, samples in times.items()},
+        "failed_steps": sum(not ok for _, _, ok in steps),
+        "failed_sessions": len(errors),
+        "peak_rss_mb": memory.peak / 1024 ** 2,
+        "errors": errors,
+    }
+
+
+def settings(args):
+    return {key: value for key, value in vars(args).items() if key not in ("command", "out")}
+
+
+def report(result):
+    """Print a pipeline or load result as a latency table per dataset."""
+    sections = result["datasets"] if result["command"] == "pipeline" else {"load": result}
+    for name, section in sections.items():
+        print(f"\n{name}: peak RSS {section['peak_rss_mb']:.0f} MB")
+        if result["command"] == "load":
+            print(f"{section['throughput']:.2f} steps/s over {section['seconds']:.1f}s, "
+                  f"{section['failed_steps']} failed steps, {section['failed_sessions']} failed sessions")
+        print(f"  {'step':<24} {'count':>5} {'p50':>9} {'p95':>9} {'p99':>9}")
+        for step, stats in section["latency"].items():
+            print(f"  {step:<24} {stats['count']:>5} " + " ".join(
+                f"{stats[p]:>8.3f}s" for p in ("p50", "p95", "p99")
+            ))
+    for error in result.get("errors", []):
+        print(error)
+
+
+def flatten(result, prefix=""):
+    """Return the numbers in a saved result as {dotted key: value}, settings left out."""
+    numbers = {}
+    for key, value in result.items():
+        if isinstance(value, dict) and key != "config":
+            numbers.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            numbers[f"{prefix}{key}"] = value
+    return numbers
+
+
+def compare(before, after):
+    """Print each number two saved results share, with its relative change."""
+    old, new = flatten(before), flatten(after)
+    shared = [key for key in old if key in new]
+    width = max(map(len, shared), default=0)
+    print(f"{'':<{width}} {'before':>10} {'after':>10} {'change':>8}")
+    for key in shared:
+        change = f"{(new[key] - old[key]) / old[key]:+.1%}" if old[key] else "-"
+        print(f"{key:<{width}} {old[key]:>10.4g} {new[key]:>10.4g} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    data = commands.add_parser("data", help="write synthetic datasets")
+    data.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    data.add_argument("--data-dir", default=DATA_DIR)
+
+    def with_model(command):
+        command.add_argument("--data-dir", default=DATA_DIR)
+        command.add_argument("--latency", type=float, default=0.5, help="seconds each model reply takes")
+        command.add_argument("--jitter", type=float, default=0.2, help="vary the latency by up to this many seconds")
+        command.add_argument("--seed", type=int, default=0)
+        command.add_argument("--replay", help="fake_llm recording to answer from before the scripted replies")
+        command.add_argument("--out", help="save the result to this JSON file")
+        return command
+
+    pipe = with_model(commands.add_parser("pipeline", help="time each stage behind the page"))
+    pipe.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    pipe.add_argument("--repeats", type=int, default=5)
+    # Internal: measure one dataset in this interpreter and print the result.
+    pipe.add_argument("--measure", metavar="FILE", help=argparse.SUPPRESS)
+
+    sessions = with_model(commands.add_parser("load", help="run browser sessions at once"))
+    sessions.add_argument("--sessions", type=int, default=4)
+    sessions.add_argument("--iterations", type=int, default=2)
+    sessions.add_argument("--rows", type=int, default=100_000)
+    sessions.add_argument("--dataset", help="CSV or workbook to use instead of a synthetic one")
+    sessions.add_argument("--local", action="store_true", help="run the jobs in each session, without the service")
+    # Internal: run one session in this interpreter and print its steps.
+    sessions.add_argument("--session", metavar="FILE", help=argparse.SUPPRESS)
+    sessions.add_argument("--session-id", type=int, default=0, help=argparse.SUPPRESS)
+
+    diff = commands.add_parser("compare", help="compare two saved results")
+    diff.add_argument("before")
+    diff.add_argument("after")
+
+    excel = commands.add_parser("excel", help="time Excel readers and the sidecar")
+    excel.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+
+    start = commands.add_parser("startup", help="time a cold start and reruns of the page")
+    start.add_argument("--app", default=APP_DIR, help="checkout whose main.py to start (default: this one)")
+    start.add_argument("--trials", type=int, default=3)
+    start.add_argument("--reruns", type=int, default=5)
+    start.add_argument("--settle", type=float, default=15, help="seconds to wait between the first run and reruns")
+    # Internal: run one trial in this interpreter and print it as JSON.
+    start.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.command == "data":
+        for rows in args.rows:
+            started = time.perf_counter()
+            path = dataset(rows, args.data_dir)
+            print(f"{path}  {os.path.getsize(path) / 1024 ** 2:.1f} MB  {time.perf_counter() - started:.1f}s")
+        return
+
+    if args.command == "pipeline" and args.measure:
+        print(RESULT_MARK + json.dumps(measure_pipeline(args.measure, args.repeats)), flush=True)
+        return
+
+    if args.command == "load" and args.session:
+        print(RESULT_MARK + json.dumps(run_session(args.session, args.session_id, args.iterations)), flush=True)
+        return
+
+    if args.command in ("pipeline", "load"):
+        result = pipeline(args) if args.command == "pipeline" else load(args)
+        report(result)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(result, f, indent=2)
+        if result.get("failed_steps") or result.get("failed_sessions"):
+            sys.exit("Some steps failed, so the timings above include error paths.")
+        return
+
+    if args.command == "compare":
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        compare(before, after)
+        return
+
+    if args.command == "startup":
+        app = os.path.abspath(args.app)
+        if args.measure:
+            print(RESULT_MARK + json.dumps(measure_startup(app, args.reruns, args.settle)), flush=True)
+            return
+        r = startup(app, args.trials, args.reruns, args.settle)
+        print(f"{app}: median of {args.trials} cold starts")
+        print(f"  imports    {r['imports']:.2f}s  (heavy packages loaded: {', '.join(r['heavy']) or 'none'})")
+        print(f"  first run  {r['first run']:.2f}s")
+        print(f"  rerun      {r['rerun'] * 1000:.0f}ms")
+        for error in r["errors"]:
+            print(f"  page error: {error}")
+        return
+
+    try:
+        import xlsxwriter  # noqa: F401
+    except ImportError:
+        parser.error("excel writes its workbooks with xlsxwriter, which is not installed: pip install xlsxwriter")
+    import ingest
+
+    directory = tempfile.mkdtemp(prefix="indius-bench-")
+    # Keep benchmark sidecars out of the app's own.
+    ingest.SIDECAR_DIR = os.path.join(directory, "sidecars")
+    try:
+        print(f"{'rows':>9} {'MB':>7} {'openpyxl':>9} {'calamine':>9} {'1st load':>9} {'sidecar':>9}")
+        for rows in args.rows:
+            r = bench(rows, directory)
+            cells = [r["openpyxl"], r["calamine"], r["first load"], r["sidecar"]]
+            print(f"{rows:>9} {r['size MB']:>7.1f} " + " ".join(
+                f"{'-' if s is None else f'{s:.2f}s':>9}" for s in cells
+            ))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
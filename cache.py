@@ -0,0 +1,154 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+# Upper bound on the memory held by parsed frames across all sessions.
+MAX_BYTES = int(os.getenv("INDIUS_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# A dataset path names a file, or one sheet of a workbook as 'files/book.xlsx#Sheet'.
+SHEET_MARK = ".xlsx#"
+
+
+def split_sheet(file_path):
+    """Split a dataset path into the file on disk and its sheet name (None for the first sheet)."""
+    head, mark, sheet = file_path.partition(SHEET_MARK)
+    return (head + ".xlsx", sheet) if mark else (file_path, None)
+
+
+def source_path(file_path):
+    """Return the file on disk that holds a dataset."""
+    return split_sheet(file_path)[0]
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Return a content hash of a file, read in fixed-size chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(source_path(file_path), "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def frame_nbytes(df):
+    """Return the in-memory size of a DataFrame in bytes."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+class DatasetCache:
+    """Process-wide LRU cache holding one parsed DataFrame per file (or workbook sheet).
+
+    Entries are validated against the file's size and mtime on every lookup; if
+    those changed, the content hash decides whether the file really changed.
+    Cached frames are shared between sessions and must not be mutated in place.
+    """
+
+    def __init__(self, max_bytes=MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes_held = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._file_locks = {}
+        # Content hashes of files whose frames are not held, by (size, mtime).
+        self._versions = {}
+
+    def get(self, file_path, loader):
+        """Return the parsed frame for file_path, calling loader(file_path) on a miss."""
+        with self._lock:
+            file_lock = self._file_locks.setdefault(file_path, threading.Lock())
+
+        # Only one session parses a given file; the others wait and then hit.
+        with file_lock:
+            stat = os.stat(source_path(file_path))
+            with self._lock:
+                entry = self._entries.get(file_path)
+                if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                    return self._hit(file_path, entry)
+
+            digest = file_digest(file_path)
+            with self._lock:
+                entry = self._entries.get(file_path)
+                if entry and entry["digest"] == digest:
+                    entry["size"], entry["mtime_ns"] = stat.st_size, stat.st_mtime_ns
+                    return self._hit(file_path, entry)
+                self.misses += 1
+
+            df = loader(file_path)
+            memory = df.attrs.get("memory")
+            entry = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "digest": digest,
+                "frame": df,
+                "nbytes": frame_nbytes(df),
+                # What compact dtypes saved over the loaded ones, if they were applied.
+                "saved": memory["before"] - memory["after"] if memory else 0,
+            }
+            with self._lock:
+                self._drop(file_path)
+                if entry["nbytes"] <= self.max_bytes:
+                    while self._entries and self.bytes_held + entry["nbytes"] > self.max_bytes:
+                        self._drop(next(iter(self._entries)))
+                        self.evictions += 1
+                    self._entries[file_path] = entry
+                    self.bytes_held += entry["nbytes"]
+            return df
+
+    def version(self, file_path):
+        """Return the content hash of file_path, reusing the cached one while the file is unchanged."""
+        stat = os.stat(source_path(file_path))
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry and (entry["size"], entry["mtime_ns"]) == (stat.st_size, stat.st_mtime_ns):
+                return entry["digest"]
+            known = self._versions.get(file_path)
+            if known and known[:2] == (stat.st_size, stat.st_mtime_ns):
+                return known[2]
+        digest = file_digest(file_path)
+        with self._lock:
+            self._versions[file_path] = (stat.st_size, stat.st_mtime_ns, digest)
+        return digest
+
+    def dataset_key(self, file_path):
+        """Return the key cached answers about file_path are stored under.
+
+        The sheets of a workbook share its version, so the sheet is added to it;
+        ResponseCache.invalidate(version) drops the answers for every sheet.
+        """
+        sheet = split_sheet(file_path)[1]
+        version = self.version(file_path)
+        return f"{version}#{sheet}" if sheet else version
+
+    def invalidate(self, file_path):
+        """Drop the cached frame for file_path."""
+        with self._lock:
+            self._drop(file_path)
+
+    def stats(self):
+        """Return hit/miss counters and memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes_held": self.bytes_held,
+                "bytes_saved": sum(entry["saved"] for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def _hit(self, file_path, entry):
+        self.hits += 1
+        self._entries.move_to_end(file_path)
+        return entry["frame"]
+
+    def _drop(self, file_path):
+        entry = self._entries.pop(file_path, None)
+        if entry:
+            self.bytes_held -= entry["nbytes"]
+
+
+dataset_cache = DatasetCache()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from cache import dataset_cache
+from ingest import SIDECAR_DIR, load_table
+from profiler import profile_dataset
+from quality import quality_report, summary_line
+from scheduler import estimate_tokens
+
+# Approximate prompt tokens a rendered card may take.
+CARD_TOKENS = int(os.getenv("INDIUS_CARD_TOKENS", "800"))
+TOP_K = 5
+MAX_CORRELATIONS = 10
+SAMPLE_ROWS = 3
+# Longest cell or category value quoted in a card.
+MAX_VALUE_CHARS = 40
+
+CARD_VERSION = 2
+
+# Progressively terser renderings: (top values, correlations, sample rows).
+DETAIL_LEVELS = [(5, 10, 3), (3, 5, 2), (2, 3, 1), (1, 0, 0), (0, 0, 0)]
+
+_cards = {}
+_lock = threading.Lock()
+
+
+def card_path(file_path):
+    """Return the path of the stored card for a data file, next to its sidecar."""
+    return os.path.join(SIDECAR_DIR, os.path.basename(file_path) + ".card.json")
+
+
+def short(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.4g}"
+    text = str(value)
+    return text if len(text) <= MAX_VALUE_CHARS else text[:MAX_VALUE_CHARS - 1] + "…"
+
+
+def plain(value):
+    """Convert a numpy or pandas scalar into something json can store."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return None
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    return value if isinstance(value, (int, float, bool)) else str(value)
+
+
+def correlations(df, numeric, limit=MAX_CORRELATIONS):
+    """Return the strongest pairwise Pearson correlations as (a, b, r), strongest first."""
+    if len(numeric) < 2:
+        return []
+    matrix = df[numeric].corr().to_numpy()
+    rows, cols = np.triu_indices(len(numeric), k=1)
+    values = matrix[rows, cols]
+    order = np.argsort(-np.abs(np.nan_to_num(values)))[:limit]
+    return [[numeric[rows[i]], numeric[cols[i]], float(values[i])] for i in order if not np.isnan(values[i])]
+
+
+def build_card(file_path, df):
+    """Summarize a dataset: schema, cardinalities, ranges, top values and correlations."""
+    profile = profile_dataset(file_path, df)
+    describe = profile["describe"]
+    columns, numeric = [], []
+    for name in df.columns:
+        column = {
+            "name": str(name),
+            "dtype": str(profile["dtypes"][name]),
+            "nulls": int(profile["nulls"][name]),
+            "distinct": int(profile["distinct"][name]),
+        }
+        if name in describe.columns and pd.notna(describe[name].get("mean")):
+            numeric.append(name)
+            column.update({stat: plain(describe[name].get(stat)) for stat in ("min", "max", "mean", "std")})
+        else:
+            counts = df[name].value_counts().head(TOP_K)
+            column["top"] = [[plain(value), int(count)] for value, count in counts.items()]
+        columns.append(column)
+    return {
+        "version": CARD_VERSION,
+        "dataset": dataset_cache.version(file_path),
+        "file": os.path.basename(file_path),
+        "rows": profile["rows"],
+        "columns": columns,
+        "correlations": correlations(df, numeric),
+        "quality": summary_line(quality_report(file_path, df)),
+        "sample": [[plain(v) for v in row] for row in df.head(SAMPLE_ROWS).itertuples(index=False)],
+    }
+
+
+def read_card(file_path, version):
+    """Return the stored card for this version of the file, or None."""
+    try:
+        with open(card_path(file_path)) as f:
+            card = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if card.get("version") != CARD_VERSION or card.get("dataset") != version:
+        return None
+    return card
+
+
+def write_card(file_path, card):
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    target = card_path(file_path)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(card, f)
+    os.replace(tmp, target)
+
+
+def load_card(file_path, df=None):
+    """Return the card for the current version of a file, building and storing it once."""
+    version = dataset_cache.version(file_path)
+    with _lock:
+        card = _cards.get(file_path)
+    if card is None or card["dataset"] != version:
+        card = read_card(file_path, version)
+        if card is None:
+            card = build_card(file_path, df if df is not None else dataset_cache.get(file_path, load_table))
+            write_card(file_path, card)
+        with _lock:
+            _cards[file_path] = card
+    return card
+
+
+def column_line(column, top_k):
+    line = f"- {column['name']} ({column['dtype']}): {column['nulls']} null, ~{column['distinct']} distinct"
+    if "mean" in column:
+        stats = ", ".join(f"{s} {short(column[s])}" for s in ("min", "max", "mean") if column.get(s) is not None)
+        return f"{line}, {stats}"
+    if top_k and column["top"]:
+        values = ", ".join(f"{short(value)} ({count})" for value, count in column["top"][:top_k])
+        return f"{line}; top: {values}"
+    return line
+
+
+def render_card(card, budget=CARD_TOKENS):
+    """Render a card as prompt text, dropping detail until it fits budget tokens."""
+    for top_k, n_correlations, n_rows in DETAIL_LEVELS:
+        lines = [f"Dataset '{card['file']}': {card['rows']} rows, {len(card['columns'])} columns."]
+        lines += ["Columns:"] + [column_line(column, top_k) for column in card["columns"]]
+        if card["quality"]:
+            lines.append(card["quality"])
+        if n_correlations and card["correlations"]:
+            pairs = ", ".join(f"{a}~{b} {r:+.2f}" for a, b, r in card["correlations"][:n_correlations])
+            lines.append(f"Strongest correlations: {pairs}")
+        if n_rows and card["sample"]:
+            lines.append("Sample rows:")
+            lines.append(",".join(c["name"] for c in card["columns"]))
+            lines += [",".join("" if v is None else short(v) for v in row) for row in card["sample"][:n_rows]]
+        text = "\n".join(lines)
+        if estimate_tokens(text) <= budget:
+            return text
+    # Still too long: list as many columns as fit.
+    kept = []
+    for line in lines:
+        if estimate_tokens("\n".join(kept + [line])) > budget:
+            break
+        kept.append(line)
+    hidden = len(card["columns"]) - (len(kept) - 2)
+    return "\n".join(kept + [f"... and {hidden} more columns."])
+
+
+def dataset_card(file_path, df=None, budget=CARD_TOKENS):
+    """Return the prompt-ready description of a dataset within budget tokens."""
+    return render_card(load_card(file_path, df), budget)
@@ -0,0 +1,163 @@
+import pandas as pd
+import plotly.graph_objs as go
+
+from downsample import (
+    POINT_BUDGET, GRID_BINS, line_indices, stride, histogram_bins, density_grid, grouped_box,
+)
+
+TEMPLATE = "plotly_dark"
+COLORS = ["#00CC96", "#EF553B", "#FFA15A", "#636EFA", "#AB63FA", "#19D3F3"]
+
+PLOT_TYPES = (
+    "Scatter Plot", "Line Chart", "Bar Chart", "Histogram",
+    "Box Plot", "Violin Plot", "Heatmap", "Contour Plot",
+    "3D Scatter Plot", "3D Surface Plot",
+)
+# Plot types that take a third column, and those that cannot be drawn without one.
+Z_PLOT_TYPES = ("Heatmap", "Contour Plot", "3D Scatter Plot", "3D Surface Plot")
+Z_REQUIRED = ("3D Scatter Plot", "3D Surface Plot")
+
+
+def is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def axis_keys(series):
+    """Bin a high-cardinality numeric column into GRID_BINS bin centers; leave others as is."""
+    if is_numeric(series) and series.nunique() > GRID_BINS:
+        bins = pd.cut(series, GRID_BINS)
+        return bins.map(lambda interval: interval.mid).astype(float)
+    return series
+
+
+def grid(df, x, y, z):
+    """Average z over an x/y grid, for heatmap, contour and surface traces."""
+    keys = pd.DataFrame({"x": axis_keys(df[x]), "y": axis_keys(df[y]), "z": df[z]})
+    table = keys.pivot_table(index="y", columns="x", values="z", aggfunc="mean", observed=True)
+    return table.columns, table.index, table.to_numpy()
+
+
+def count_grid(df, x, y):
+    """Count rows over an x/y grid, binning numeric axes server-side."""
+    if is_numeric(df[x]) and is_numeric(df[y]):
+        return density_grid(df[x], df[y])
+    table = pd.crosstab(axis_keys(df[y]), axis_keys(df[x]))
+    return table.columns, table.index, table.to_numpy()
+
+
+def sample(df, budget):
+    """Return at most budget rows, evenly spread over the frame."""
+    return df if len(df) <= budget else df.iloc[stride(len(df), budget)]
+
+
+def scatter(df, x, y, z, budget):
+    if len(df) > budget and is_numeric(df[x]) and is_numeric(df[y]):
+        # Too many markers to ship: rasterize into a density grid instead.
+        xs, ys, counts = density_grid(df[x], df[y])
+        return go.Heatmap(x=xs, y=ys, z=counts, colorscale="Viridis", colorbar=dict(title="rows"))
+    data = sample(df, budget)
+    return go.Scattergl(x=data[x], y=data[y], mode="markers", marker=dict(color=COLORS[0], size=6, opacity=0.8))
+
+
+def line(df, x, y, z, budget):
+    data = df.sort_values(x)
+    if len(data) > budget and is_numeric(data[y]):
+        data = data.iloc[line_indices(data[x], data[y], budget)]
+    return go.Scattergl(x=data[x], y=data[y], mode="lines", line=dict(color=COLORS[0], width=2))
+
+
+def bar(df, x, y, z, budget):
+    keys = axis_keys(df[x])
+    if x != y and is_numeric(df[y]):
+        values = df[y].groupby(keys, observed=True, sort=True).mean()
+    else:
+        values = keys.value_counts().sort_index()
+    return go.Bar(x=values.index, y=values.to_numpy(), marker_color=COLORS[0])
+
+
+def histogram(df, x, y, z, budget):
+    if len(df) <= budget:
+        return go.Histogram(x=df[x], marker_color=COLORS[0])
+    if is_numeric(df[x]):
+        centers, counts, widths = histogram_bins(df[x])
+        return go.Bar(x=centers, y=counts, width=widths, marker_color=COLORS[0])
+    counts = df[x].value_counts().sort_index()
+    return go.Bar(x=counts.index, y=counts.to_numpy(), marker_color=COLORS[0])
+
+
+def box(df, x, y, z, budget):
+    if len(df) > budget and is_numeric(df[y]):
+        return grouped_box(df[x], df[y], marker_color=COLORS[0])
+    return go.Box(x=df[x], y=df[y], marker_color=COLORS[0], boxpoints="outliers")
+
+
+def violin(df, x, y, z, budget):
+    # Violins have no precomputed form; draw the kernel density from an even sample.
+    data = sample(df, budget)
+    return go.Violin(x=data[x], y=data[y], line_color=COLORS[0], box_visible=True, meanline_visible=True)
+
+
+def heatmap(df, x, y, z, budget):
+    if z is None:
+        xs, ys, counts = count_grid(df, x, y)
+        return go.Heatmap(x=xs, y=ys, z=counts, colorscale="Viridis", colorbar=dict(title="rows"))
+    xs, ys, values = grid(df, x, y, z)
+    return go.Heatmap(x=xs, y=ys, z=values, colorscale="Viridis", colorbar=dict(title=z))
+
+
+def contour(df, x, y, z, budget):
+    if z is None:
+        xs, ys, counts = count_grid(df, x, y)
+        return go.Contour(x=xs, y=ys, z=counts, colorscale="Viridis", colorbar=dict(title="rows"))
+    xs, ys, values = grid(df, x, y, z)
+    return go.Contour(x=xs, y=ys, z=values, colorscale="Viridis", colorbar=dict(title=z))
+
+
+def scatter_3d(df, x, y, z, budget):
+    data = sample(df, budget)
+    color = data[z] if is_numeric(data[z]) else COLORS[0]
+    return go.Scatter3d(x=data[x], y=data[y], z=data[z], mode="markers", marker=dict(color=color, colorscale="Viridis", size=3))
+
+
+def surface(df, x, y, z, budget):
+    xs, ys, values = grid(df, x, y, z)
+    return go.Surface(x=xs, y=ys, z=values, colorscale="Viridis")
+
+
+BUILDERS = {
+    "Scatter Plot": scatter,
+    "Line Chart": line,
+    "Bar Chart": bar,
+    "Histogram": histogram,
+    "Box Plot": box,
+    "Violin Plot": violin,
+    "Heatmap": heatmap,
+    "Contour Plot": contour,
+    "3D Scatter Plot": scatter_3d,
+    "3D Surface Plot": surface,
+}
+
+
+def build_figure(df, plot_type, x, y, z=None, budget=POINT_BUDGET, x_range=None):
+    """Build a Plotly figure for one of PLOT_TYPES directly from a DataFrame.
+
+    Traces are reduced server-side to about budget points. x_range, a (low, high)
+    pair, restricts a numeric X axis so a zoomed-in window is drawn in full detail.
+    """
+    if plot_type not in BUILDERS:
+        raise ValueError(f"Unsupported plot type: {plot_type}")
+    if plot_type in Z_REQUIRED and z is None:
+        raise ValueError(f"{plot_type} needs a Z-axis column.")
+    columns = list(dict.fromkeys(c for c in (x, y, z) if c is not None))
+    data = df[columns].dropna()
+    if x_range is not None:
+        data = data[data[x].between(*x_range)]
+
+    fig = go.Figure(BUILDERS[plot_type](data, x, y, z, budget))
+    title = f"{plot_type}: {y} vs {x}" if plot_type != "Histogram" else f"Histogram of {x}"
+    fig.update_layout(template=TEMPLATE, title=title)
+    if plot_type in Z_REQUIRED:
+        fig.update_layout(scene=dict(xaxis_title=x, yaxis_title=y, zaxis_title=z))
+    else:
+        fig.update_layout(xaxis_title=x, yaxis_title="count" if plot_type == "Histogram" else y)
+    return fig
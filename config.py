@@ -0,0 +1,12 @@
+import pandas as pd
+from dotenv import load_dotenv
+
+# Modules read their INDIUS_* settings from os.environ when first imported, so
+# entry points import this module before any other to apply .env exactly once.
+load_dotenv()
+
+# Process-wide on purpose: cached frames are shared by every session and agent,
+# which each get a shallow copy (agent.py, sandbox.py) that copy-on-write keeps
+# from writing through to the cache without paying for a deep copy. Chained
+# assignment in agent code (df[a][b] = x) then has no effect and pandas warns.
+pd.set_option("mode.copy_on_write", True)
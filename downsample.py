@@ -0,0 +1,155 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+# Maximum number of points a single trace sends to the browser.
+POINT_BUDGET = int(os.getenv("INDIUS_POINT_BUDGET", "5000"))
+# Bins per axis for rasterized scatter/density plots, and for histograms.
+GRID_BINS = 200
+HISTOGRAM_BINS = 100
+
+# Per-point trace attributes that must be sliced together with x/y.
+POINT_ATTRIBUTES = ("x", "y", "z", "text", "hovertext", "customdata")
+MARKER_ATTRIBUTES = ("color", "size", "symbol", "opacity")
+
+
+def as_numbers(values):
+    """Return values as a float array, mapping datetimes to nanoseconds."""
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype("int64").to_numpy(dtype=float)
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def lttb(x, y, n):
+    """Return the indices of n points picked by Largest-Triangle-Three-Buckets.
+
+    x must be sorted; the first and last points are always kept.
+    """
+    size = len(x)
+    if n >= size or n < 3:
+        return np.arange(size)
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    indices = np.empty(n, dtype=np.int64)
+    indices[0], indices[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else size
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def minmax(y, n):
+    """Return the indices of the minimum and maximum of y in each of n/2 buckets."""
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    buckets = np.arange(size) * max(n // 2, 1) // size
+    series = pd.Series(y)
+    grouped = series.groupby(buckets)
+    return np.union1d(grouped.idxmin().dropna(), grouped.idxmax().dropna()).astype(np.int64)
+
+
+def stride(size, n):
+    """Return n evenly spaced indices out of size."""
+    if n >= size:
+        return np.arange(size)
+    return np.linspace(0, size - 1, n).astype(np.int64)
+
+
+def line_indices(x, y, n):
+    """Pick the points of a line trace that preserve its visual shape."""
+    xs = as_numbers(x)
+    ys = as_numbers(y)
+    if np.isnan(xs).any() or np.isnan(ys).any() or (np.diff(xs) < 0).any():
+        return minmax(ys, n) if not np.isnan(ys).all() else stride(len(ys), n)
+    return lttb(xs, ys, n)
+
+
+def histogram_bins(values, bins=HISTOGRAM_BINS):
+    """Pre-aggregate a numeric column into histogram bin centers, counts and widths."""
+    values = as_numbers(values)
+    counts, edges = np.histogram(values[~np.isnan(values)], bins=bins)
+    return (edges[:-1] + edges[1:]) / 2, counts, np.diff(edges)
+
+
+def density_grid(x, y, bins=GRID_BINS):
+    """Bin two numeric columns into a 2D count grid (x centers, y centers, counts)."""
+    xs, ys = as_numbers(x), as_numbers(y)
+    keep = ~(np.isnan(xs) | np.isnan(ys))
+    counts, x_edges, y_edges = np.histogram2d(xs[keep], ys[keep], bins=bins)
+    return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+
+def box_stats(values):
+    """Return the precomputed statistics Plotly needs to draw one box."""
+    values = pd.Series(as_numbers(values)).dropna()
+    q1, median, q3 = values.quantile([0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "lowerfence": inside.min(),
+        "upperfence": inside.max(),
+        "mean": values.mean(),
+    }
+
+
+def grouped_box(x, y, **kwargs):
+    """Build a Box trace from per-group statistics instead of raw points."""
+    groups = pd.Series(as_numbers(y)).groupby(pd.Series(x).to_numpy(), observed=True, sort=True)
+    stats = pd.DataFrame({name: box_stats(values) for name, values in groups}).T
+    return go.Box(x=stats.index.tolist(), **{k: stats[k].tolist() for k in stats.columns}, **kwargs)
+
+
+def take(trace, indices):
+    """Keep only the given points of a trace, including per-point marker styling."""
+    size = len(trace.x) if trace.x is not None else len(trace.y)
+    for name in POINT_ATTRIBUTES:
+        values = getattr(trace, name, None)
+        if values is not None and not isinstance(values, str) and len(values) == size:
+            trace[name] = np.asarray(values)[indices]
+    marker = getattr(trace, "marker", None)
+    for name in MARKER_ATTRIBUTES if marker is not None else ():
+        values = getattr(marker, name, None)
+        if values is not None and not isinstance(values, (str, int, float)) and len(values) == size:
+            marker[name] = np.asarray(values)[indices]
+
+
+def downsample_trace(trace, budget):
+    """Return a lighter equivalent of trace, or the trace itself if it fits the budget."""
+    kind = trace.type
+    if kind in ("scatter", "scattergl") and trace.x is not None and trace.y is not None:
+        if len(trace.x) <= budget:
+            return trace
+        mode = trace.mode or "lines"
+        indices = line_indices(trace.x, trace.y, budget) if "lines" in mode else stride(len(trace.x), budget)
+        take(trace, indices)
+    elif kind == "scatter3d" and trace.x is not None and len(trace.x) > budget:
+        take(trace, stride(len(trace.x), budget))
+    elif kind == "histogram" and trace.x is not None and len(trace.x) > budget:
+        values = pd.Series(np.asarray(trace.x))
+        if pd.api.types.is_numeric_dtype(values):
+            centers, counts, widths = histogram_bins(values)
+            return go.Bar(x=centers, y=counts, width=widths, name=trace.name, marker=trace.marker.to_plotly_json())
+        counts = values.value_counts().sort_index()
+        return go.Bar(x=counts.index, y=counts.to_numpy(), name=trace.name, marker=trace.marker.to_plotly_json())
+    elif kind == "box" and trace.y is not None and len(trace.y) > budget:
+        x = trace.x if trace.x is not None else np.full(len(trace.y), trace.name or "")
+        return grouped_box(x, trace.y, name=trace.name, marker=trace.marker.to_plotly_json())
+    return trace
+
+
+def downsample_figure(fig, budget=POINT_BUDGET):
+    """Reduce every oversized trace of a figure to at most budget points."""
+    traces = [downsample_trace(trace, budget) for trace in fig.data]
+    return go.Figure(data=traces, layout=fig.layout)
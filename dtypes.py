@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cache import frame_nbytes
+
+# Compact dtypes are applied to every frame load_table returns unless disabled.
+ENABLED = os.getenv("INDIUS_COMPACT_DTYPES", "1") != "0"
+# Text columns whose distinct/non-null ratio is at or below this become categoricals
+# (the sidecars dictionary-encode by the same rule).
+CATEGORY_MAX_RATIO = 0.5
+
+ARROW_STRING = pd.StringDtype("pyarrow")
+
+
+def compact_floats(series):
+    """Return series as float32 when every value survives the round trip exactly."""
+    values = series.to_numpy()
+    narrow = values.astype(np.float32)
+    with np.errstate(over="ignore", invalid="ignore"):
+        exact = np.array_equal(narrow.astype(np.float64), values, equal_nan=True)
+    return series.astype(np.float32) if exact else series
+
+
+def compact_text(series):
+    """Return a text column as a categorical or an Arrow-backed string column.
+
+    Columns mixing strings with other objects are left alone.
+    """
+    present = series.dropna()
+    if not len(present) or pd.api.types.infer_dtype(present, skipna=True) != "string":
+        return series
+    if present.nunique() <= len(present) * CATEGORY_MAX_RATIO:
+        return series.astype("category")
+    return series.astype(ARROW_STRING)
+
+
+def compact_column(series):
+    # Integers stay int64: products and running sums in agent code would
+    # wrap around silently in a narrower type.
+    if series.dtype == np.float64:
+        return compact_floats(series)
+    if series.dtype == object:
+        return compact_text(series)
+    return series
+
+
+def compact_frame(df):
+    """Return df with narrower dtypes that hold exactly the same values.
+
+    Floats are narrowed only when no value changes; low-cardinality text becomes
+    categorical and other text Arrow-backed strings. The memory before and after
+    is recorded in df.attrs["memory"].
+    """
+    before = frame_nbytes(df)
+    compact = df.copy(deep=False)
+    for i in range(df.shape[1]):
+        # By position, so duplicate column names are handled too.
+        compact.isetitem(i, compact_column(df.iloc[:, i]))
+    compact.attrs["memory"] = {"before": before, "after": frame_nbytes(compact)}
+    return compact
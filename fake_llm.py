@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Gemini API, for exercising the app without network access.
+
+Serves Gemini ``:generateContent`` and ``:streamGenerateContent`` calls
+(google-genai and LiteLLM's gemini provider) and OpenAI-style
+``/chat/completions`` calls. Point the app at it with
+INDIUS_LLM_API_BASE=http://127.0.0.1:<port>.
+
+It can also throttle like the real API: answer a share of calls, or every
+call past a requests-per-minute limit, with HTTP 429.
+
+Replies can be replayed from a recording (--replay), a JSON-lines file of
+{"prompt": ..., "reply": ...} objects. With --upstream, prompts the recording
+does not know are sent to the real API once and their replies appended to it,
+so a session can be recorded once and replayed without network access.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+import urllib.request
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Default reply: valid for both plain text prompts and CodeAgent steps.
+DEFAULT_REPLY = "Thought: Answering directly.\nCode:\n```py\nfinal_answer(\"fake answer\")\n```<end_code>"
+
+
+def prompt_text(body):
+    """Flatten a Gemini or OpenAI request body into the prompt text."""
+    if "messages" in body:
+        parts = [m.get("content") for m in body["messages"]]
+    else:
+        parts = [
+            part.get("text", "")
+            for content in [body.get("system_instruction", {})] + body.get("contents", [])
+            for part in content.get("parts", [])
+        ]
+    return "\n".join(p if isinstance(p, str) else json.dumps(p) for p in parts if p)
+
+
+def gemini_payload(text):
+    return {
+        "candidates": [
+            {"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP", "index": 0}
+        ],
+        "usageMetadata": {"promptTokenCount": 1, "candidatesTokenCount": 1, "totalTokenCount": 2},
+        "modelVersion": "fake",
+    }
+
+
+def error_payload(status, message):
+    """Error body in the shape google-genai and LiteLLM both parse."""
+    return {"error": {"code": status, "message": message, "status": "RESOURCE_EXHAUSTED"}}
+
+
+def split_chunks(text, size):
+    """Split a reply into chunks of roughly size words, keeping whitespace."""
+    words = text.split(" ")
+    return [" ".join(words[i:i + size]) + (" " if i + size < len(words) else "") for i in range(0, len(words), size)]
+
+
+def collapse(text):
+    return " ".join(text.split())
+
+
+class Recording:
+    """Recorded replies, looked up by prompt.
+
+    Entries are {"prompt": ..., "reply": ...}, matched after collapsing
+    whitespace, or {"match": ..., "reply": ...}, which answers any prompt
+    containing that text; exact prompts win, then the first matching entry.
+    Prompts with no entry get fallback, or, given upstream (a Gemini API base
+    URL), are asked there once; the reply is kept and appended to path.
+    """
+
+    def __init__(self, path=None, entries=(), upstream=None, model="gemini-2.0-flash", api_key=None,
+                 fallback=DEFAULT_REPLY):
+        self.path = path
+        self.upstream = upstream.rstrip("/") if upstream else None
+        self.model = model
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        self.fallback = fallback
+        self.prompts = {}
+        self.matches = []
+        self.recorded = 0
+        self._lock = threading.Lock()
+        for entry in entries:
+            self.add(entry)
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self.add(json.loads(line))
+
+    def add(self, entry):
+        if "prompt" in entry:
+            self.prompts[collapse(entry["prompt"])] = entry["reply"]
+        else:
+            self.matches.append((entry["match"], entry["reply"]))
+
+    def __call__(self, prompt):
+        key = collapse(prompt)
+        with self._lock:
+            if key in self.prompts:
+                return self.prompts[key]
+        for text, reply in self.matches:
+            if text in prompt:
+                return reply
+        if not self.upstream:
+            return self.fallback
+        reply = self.ask_upstream(prompt)
+        with self._lock:
+            self.prompts[key] = reply
+            self.recorded += 1
+            if self.path:
+                with open(self.path, "a") as f:
+                    f.write(json.dumps({"prompt": prompt, "reply": reply}) + "\n")
+        return reply
+
+    def ask_upstream(self, prompt):
+        """Send prompt to the upstream API as one user turn and return the reply text."""
+        request = urllib.request.Request(
+            f"{self.upstream}/v1beta/models/{self.model}:generateContent",
+            data=json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode(),
+            headers={"Content-Type": "application/json", "x-goog-api-key": self.api_key or ""},
+        )
+        with urllib.request.urlopen(request, timeout=120) as response:
+            parts = json.load(response)["candidates"][0]["content"]["parts"]
+        return "".join(part.get("text", "") for part in parts)
+
+
+def openai_payload(text):
+    return {
+        "id": "fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": "fake",
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+class FakeLLMServer:
+    """Threaded HTTP server that answers every model call with canned replies.
+
+    replies may be a list of strings (served in a cycle) or a callable taking
+    the prompt text and returning the reply, such as a Recording. Each reply
+    waits latency seconds, give or take up to jitter. error_rate is the share
+    of calls answered with 429; rpm, if set, answers 429 to calls beyond that
+    many in the last 60 seconds. Random choices follow seed.
+    """
+
+    def __init__(self, replies=None, host="127.0.0.1", port=0, latency=0.0, chunk_words=4, chunk_delay=0.0,
+                 error_rate=0.0, rpm=None, jitter=0.0, seed=0):
+        self.replies = replies or [DEFAULT_REPLY]
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_words = chunk_words
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.rpm = rpm
+        self.requests = []
+        self.connections = set()
+        self.throttled = 0
+        self._recent = deque()
+        self._cycle = itertools.cycle(self.replies) if not callable(self.replies) else None
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def throttle(self):
+        """Decide whether to reject the current call with 429."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            limited = self._random.random() < self.error_rate or (self.rpm is not None and len(self._recent) >= self.rpm)
+            if limited:
+                self.throttled += 1
+            else:
+                self._recent.append(now)
+            return limited
+
+    def reply(self, prompt):
+        with self._lock:
+            self.requests.append(prompt)
+            if self._cycle is None:
+                return self.replies(prompt)
+            return next(self._cycle)
+
+    def delay(self):
+        """Return how long to wait before the current reply."""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with server._lock:
+                    server.connections.add(self.client_address)
+                if server.throttle():
+                    self.send_json(error_payload(429, "Resource has been exhausted (e.g. check quota)."), status=429)
+                    return
+                text = server.reply(prompt_text(body))
+                delay = server.delay()
+                if delay:
+                    time.sleep(delay)
+                if ":streamGenerateContent" in self.path:
+                    self.send_stream(split_chunks(text, server.chunk_words))
+                    return
+                payload = openai_payload(text) if self.path.endswith("/chat/completions") else gemini_payload(text)
+                self.send_json(payload)
+
+            def send_stream(self, chunks):
+                """Send chunks as server-sent events over a chunked response."""
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for chunk in chunks:
+                    event = f"data: {json.dumps(gemini_payload(chunk))}\r\n\r\n".encode()
+                    self.wfile.write(f"{len(event):X}\r\n".encode() + event + b"\r\n")
+                    self.wfile.flush()
+                    if server.chunk_delay:
+                        time.sleep(server.chunk_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def send_json(self, payload, status=200):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before each reply")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed chunks")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of calls answered with 429")
+    parser.add_argument("--rpm", type=int, default=None, help="answer 429 beyond this many calls per minute")
+    parser.add_argument("--jitter", type=float, default=0.0, help="vary each reply's latency by up to this many seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for jitter and error-rate choices")
+    parser.add_argument("--replay", help="JSON-lines recording of prompts and replies to serve")
+    parser.add_argument("--upstream", help="Gemini API base URL to record unknown prompts from, "
+                                           "e.g. https://generativelanguage.googleapis.com")
+    parser.add_argument("--model", default="gemini-2.0-flash", help="model asked upstream")
+    args = parser.parse_args()
+    replies = Recording(args.replay, upstream=args.upstream, model=args.model) if args.replay or args.upstream else None
+    server = FakeLLMServer(
+        replies, port=args.port, latency=args.latency, chunk_delay=args.chunk_delay, error_rate=args.error_rate,
+        rpm=args.rpm, jitter=args.jitter, seed=args.seed,
+    )
+    print(f"Fake LLM listening on {server.url}")
+    server.httpd.serve_forever()
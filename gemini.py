@@ -0,0 +1,69 @@
+import inspect
+import json
+import os
+import threading
+
+import requests
+from google import genai
+from google.genai import errors
+
+import config  # noqa: F401
+
+TEXT_MODEL_ID = os.getenv("INDIUS_TEXT_MODEL", "gemini-2.0-flash")
+# Point both this client and the agents' at another endpoint, e.g. a local fake_llm server.
+API_BASE = os.getenv("INDIUS_LLM_API_BASE")
+# google-genai releases whose per-call HTTP sessions keep_alive replaces. Its
+# HttpOptions has no way to supply a session; later releases pool connections.
+PATCHED_SDK = ("1.2.",)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def keep_alive(api_client):
+    """Send the SDK's API-key requests over one pooled HTTP session; return whether it could.
+
+    google-genai 1.2 opens a fresh requests.Session per call, which costs a new
+    TCP/TLS handshake every time. This replaces a private method, so it is only
+    done for the releases in PATCHED_SDK and when that method looks as expected;
+    any other client is left as it is.
+    """
+    method = getattr(type(api_client), "_request_unauthorized", None)
+    if not genai.__version__.startswith(PATCHED_SDK) or method is None:
+        return False
+    if list(inspect.signature(method).parameters) != ["self", "http_request", "stream"]:
+        return False
+    try:
+        from google.genai._api_client import HttpResponse
+    except ImportError:
+        return False
+    session = requests.Session()
+
+    def request_unauthorized(http_request, stream=False):
+        data = http_request.data
+        if data and not isinstance(data, bytes):
+            data = json.dumps(data)
+        response = session.request(
+            method=http_request.method,
+            url=http_request.url,
+            headers=http_request.headers,
+            data=data or None,
+            timeout=http_request.timeout,
+            stream=stream,
+        )
+        errors.APIError.raise_for_response(response)
+        return HttpResponse(response.headers, response if stream else [response.text])
+
+    api_client._request_unauthorized = request_unauthorized
+    return True
+
+
+def get_client():
+    """Return the process-wide Gemini client."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            http_options = {"base_url": API_BASE} if API_BASE else None
+            _client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"), http_options=http_options)
+            keep_alive(_client._api_client)
+        return _client
@@ -0,0 +1,434 @@
+import hashlib
+import io
+import itertools
+import os
+import queue
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+from python_calamine import CalamineWorkbook, SheetTypeEnum, SheetVisibleEnum
+
+import dtypes
+from cache import dataset_cache, file_digest, source_path, split_sheet
+from dtypes import CATEGORY_MAX_RATIO
+
+# Typed Arrow IPC copies of uploaded files live here, outside the 'files' listing.
+SIDECAR_DIR = os.getenv("INDIUS_SIDECAR_DIR", ".sidecars")
+
+FORMAT_VERSION = b"1"
+
+# Uploads are copied and parsed in pieces of this size. Larger uploads than
+# MAX_UPLOAD_BYTES are refused (keep it at or below server.maxUploadSize).
+UPLOAD_CHUNK = 1 << 20
+MAX_UPLOAD_BYTES = int(os.getenv("INDIUS_MAX_UPLOAD_MB", "200")) * 1024 ** 2
+
+_verified = {}
+_sheets = {}
+_lock = threading.Lock()
+
+
+def sidecar_path(file_path):
+    """Return the path of the Arrow sidecar for a data file."""
+    return os.path.join(SIDECAR_DIR, os.path.basename(file_path) + ".arrow")
+
+
+def sheet_names(file_path):
+    """List the visible worksheets of a workbook, in workbook order.
+
+    Only the workbook's metadata is read; the result is kept while the file is unchanged.
+    """
+    stat = os.stat(file_path)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cached = _sheets.get(file_path)
+    if cached is None or cached[0] != key:
+        workbook = CalamineWorkbook.from_path(file_path)
+        try:
+            names = [
+                sheet.name for sheet in workbook.sheets_metadata
+                if sheet.typ == SheetTypeEnum.WorkSheet and sheet.visible == SheetVisibleEnum.Visible
+            ]
+        finally:
+            workbook.close()
+        cached = _sheets[file_path] = (key, names)
+    return cached[1]
+
+
+def read_sheet(file_path):
+    """Parse one workbook sheet (the first unless the path names one) into a DataFrame."""
+    path, sheet = split_sheet(file_path)
+    # calamine parses in Rust and reads only the requested sheet.
+    if sheet is None:
+        sheet = next(iter(sheet_names(path)), 0)
+    return pd.read_excel(path, sheet_name=sheet, engine="calamine")
+
+
+def read_source(file_path):
+    """Parse a CSV file or workbook sheet into an Arrow table."""
+    if file_path.endswith("csv"):
+        try:
+            return pv.read_csv(file_path, convert_options=pv.ConvertOptions(strings_can_be_null=True))
+        except pa.ArrowInvalid:
+            # Malformed rows that pandas tolerates; let pandas infer and convert.
+            return pa.Table.from_pandas(pd.read_csv(file_path), preserve_index=False)
+    return pa.Table.from_pandas(read_sheet(file_path), preserve_index=False)
+
+
+def encode_categoricals(table):
+    """Dictionary-encode low-cardinality string columns."""
+    for i, field in enumerate(table.schema):
+        if not (pa.types.is_string(field.type) or pa.types.is_large_string(field.type)):
+            continue
+        column = table.column(i)
+        non_null = len(column) - column.null_count
+        if non_null and pc.count_distinct(column).as_py() <= non_null * CATEGORY_MAX_RATIO:
+            table = table.set_column(i, field.name, column.dictionary_encode().combine_chunks())
+    return table
+
+
+def source_metadata(file_path, digest=None):
+    """Return the sidecar metadata describing the current source file."""
+    stat = os.stat(source_path(file_path))
+    return {
+        b"indius.version": FORMAT_VERSION,
+        b"indius.source_size": str(stat.st_size).encode(),
+        b"indius.source_mtime_ns": str(stat.st_mtime_ns).encode(),
+        b"indius.source_digest": (digest or file_digest(file_path)).encode(),
+    }
+
+
+def read_metadata(file_path):
+    """Return the metadata stored in a file's sidecar, or None if there is none."""
+    try:
+        with pa.memory_map(sidecar_path(file_path)) as source:
+            return pa.ipc.open_file(source).schema.metadata or {}
+    except (FileNotFoundError, pa.ArrowInvalid):
+        return None
+
+
+def is_fresh(file_path):
+    """Check whether the sidecar matches the current contents of file_path."""
+    stat = os.stat(source_path(file_path))
+    if _verified.get(file_path) == (stat.st_size, stat.st_mtime_ns):
+        return True
+    meta = read_metadata(file_path)
+    if not meta or meta.get(b"indius.version") != FORMAT_VERSION:
+        return False
+    if meta[b"indius.source_size"] != str(stat.st_size).encode():
+        return False
+    if meta[b"indius.source_mtime_ns"] != str(stat.st_mtime_ns).encode():
+        # Touched or rewritten: only the content decides.
+        if meta[b"indius.source_digest"] != file_digest(file_path).encode():
+            return False
+    _verified[file_path] = (stat.st_size, stat.st_mtime_ns)
+    return True
+
+
+def build_sidecar(file_path):
+    """Convert a data file into a typed Arrow IPC sidecar."""
+    table = encode_categoricals(read_source(file_path))
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), **source_metadata(file_path)})
+
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    target = sidecar_path(file_path)
+    tmp = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Uncompressed IPC so readers can memory-map buffers without copying.
+    with pa.OSFile(tmp, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=1 << 16)
+    os.replace(tmp, target)
+    _verified.pop(file_path, None)
+    return target
+
+
+def ensure_sidecar(file_path):
+    """Build the sidecar for file_path unless an up-to-date one exists."""
+    with _lock:
+        if not is_fresh(file_path):
+            build_sidecar(file_path)
+    return sidecar_path(file_path)
+
+
+def sidecar_rows(file_path):
+    """Return the number of rows in a file's sidecar."""
+    with pa.memory_map(sidecar_path(file_path)) as source:
+        reader = pa.ipc.open_file(source)
+        return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+
+def append_base(file_path):
+    """Return (digest, rows) of the version of file_path that its current one appends rows to.
+
+    Known when the fresh sidecar was built by extending that version's; None otherwise.
+    """
+    with _lock:
+        if not is_fresh(file_path):
+            return None
+    meta = read_metadata(file_path)
+    if not meta or b"indius.base_digest" not in meta:
+        return None
+    return meta[b"indius.base_digest"].decode(), int(meta[b"indius.base_rows"])
+
+
+def read_sidecar(file_path):
+    """Open a file's sidecar through a memory map and return it as a DataFrame."""
+    with pa.memory_map(sidecar_path(file_path)) as source:
+        table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True)
+
+
+def load_table(file_path):
+    """Load a data file through its sidecar, falling back to a direct parse.
+
+    The frame gets compact dtypes unless INDIUS_COMPACT_DTYPES=0.
+    """
+    try:
+        ensure_sidecar(file_path)
+        df = read_sidecar(file_path)
+    except (OSError, pa.ArrowException):
+        df = pd.read_csv(file_path) if file_path.endswith("csv") else read_sheet(file_path)
+    return dtypes.compact_frame(df) if dtypes.ENABLED else df
+
+
+class UploadError(ValueError):
+    """An upload that cannot be ingested."""
+
+
+class ChunkPipe(io.RawIOBase):
+    """Readable stream fed with byte chunks from another thread."""
+
+    def __init__(self):
+        self._chunks = queue.Queue(maxsize=8)
+        self._buffer = b""
+        self._closed_writer = False
+
+    def readable(self):
+        return True
+
+    def feed(self, chunk):
+        self._chunks.put(chunk)
+
+    def finish(self):
+        self._chunks.put(None)
+
+    def readinto(self, buffer):
+        while not self._buffer and not self._closed_writer:
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._closed_writer = True
+            else:
+                self._buffer = chunk
+        n = min(len(buffer), len(self._buffer))
+        buffer[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+def read_chunks(upload, chunk_size=UPLOAD_CHUNK):
+    """Yield an uploaded file's bytes in chunks without copying it whole."""
+    upload.seek(0)
+    for chunk in iter(lambda: upload.read(chunk_size), b""):
+        yield chunk
+
+
+def ends_with_newline(file_path):
+    """Tell whether a file ends at a row boundary, so bytes added to it start new rows."""
+    with open(file_path, "rb") as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def upload_digests(upload, prefix=0):
+    """Return the content hash file_digest would compute for the uploaded bytes, and for their first prefix bytes.
+
+    Both come from one pass; the second is None unless 0 < prefix <= the upload's size.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    head, done = None, 0
+    for chunk in read_chunks(upload):
+        if done < prefix <= done + len(chunk):
+            digest.update(chunk[:prefix - done])
+            head = digest.hexdigest()
+            digest.update(chunk[prefix - done:])
+        else:
+            digest.update(chunk)
+        done += len(chunk)
+    return digest.hexdigest(), head
+
+
+def sniff_schema(file_name, head):
+    """Validate the first chunk of an upload and return its CSV schema (None for Excel)."""
+    if not file_name.endswith("csv"):
+        if not head.startswith(b"PK\x03\x04"):
+            raise UploadError(f"{file_name} is not a valid .xlsx workbook.")
+        return None
+    # Parse only complete lines; the last one may continue in the next chunk.
+    sample = head if len(head) < UPLOAD_CHUNK else head[:head.rfind(b"\n") + 1]
+    try:
+        table = pv.read_csv(pa.py_buffer(sample), convert_options=pv.ConvertOptions(strings_can_be_null=True))
+    except pa.ArrowInvalid as e:
+        raise UploadError(f"{file_name} does not look like a CSV file: {e}") from e
+    if not table.num_columns or any(not name.strip() for name in table.column_names):
+        raise UploadError(f"{file_name} needs a header row naming every column.")
+    # A column that is empty in the sample may hold text later on.
+    return pa.schema([
+        pa.field(f.name, pa.string()) if pa.types.is_null(f.type) else f
+        for f in encode_categoricals(table).schema
+    ])
+
+
+class DictionaryBuilder:
+    """Dictionary-encodes one string column batch by batch with a growing dictionary.
+
+    Each batch only appends values, so the IPC writer can store the changes as deltas.
+    """
+
+    def __init__(self):
+        self.dictionary = pa.array([], pa.string())
+
+    def encode(self, column):
+        values = pc.unique(column.drop_null())
+        new = pc.filter(values, pc.invert(pc.is_in(values, value_set=self.dictionary)))
+        if len(new):
+            self.dictionary = pa.concat_arrays([self.dictionary, new.cast(pa.string())])
+        indices = pc.index_in(column, value_set=self.dictionary).cast(pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, self.dictionary)
+
+
+def stream_sidecar(pipe, target, schema, metadata, base=None):
+    """Parse CSV bytes from pipe batch by batch into an Arrow IPC file at target.
+
+    With base, the path of a sidecar of the same schema, its batches are copied
+    first and pipe holds only rows to append to them, without a header.
+    """
+    categorical = [pa.types.is_dictionary(f.type) for f in schema]
+    column_types = {f.name: f.type.value_type if pa.types.is_dictionary(f.type) else f.type for f in schema}
+    builders = [DictionaryBuilder() if c else None for c in categorical]
+    reader = pv.open_csv(
+        pipe,
+        read_options=pv.ReadOptions(column_names=schema.names) if base else None,
+        convert_options=pv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+    output = schema.with_metadata(metadata)
+    options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+    with pa.OSFile(target, "wb") as sink:
+        with pa.ipc.new_file(sink, output, options=options) as writer:
+            if base:
+                with pa.memory_map(base) as source:
+                    previous = pa.ipc.open_file(source)
+                    for i in range(previous.num_record_batches):
+                        batch = previous.get_batch(i)
+                        writer.write_batch(batch)
+                    # New rows extend the dictionaries the copied batches end with.
+                    for j, builder in enumerate(builders):
+                        if builder and previous.num_record_batches:
+                            builder.dictionary = batch.column(j).dictionary.cast(pa.string())
+            for batch in reader:
+                columns = [
+                    builder.encode(column) if builder else column
+                    for builder, column in zip(builders, batch.columns)
+                ]
+                writer.write_batch(pa.record_batch(columns, schema=output))
+
+
+def ingest_upload(upload, directory="files", progress=None):
+    """Store an uploaded file under directory and build its sidecar in the same pass.
+
+    The upload is read in chunks: its first chunk is validated, and CSV bytes are
+    parsed into the sidecar while they are written, so typed storage is ready
+    when the copy is. An upload identical to the stored file is not rewritten,
+    and one that only appends rows to a stored CSV ending in a newline has just
+    those rows parsed: the sidecar is the stored one plus the new batches, and
+    records the version it extends (see append_base). progress(fraction) is
+    called as chunks are written. Returns the file path.
+    """
+    if upload.size > MAX_UPLOAD_BYTES:
+        raise UploadError(
+            f"{upload.name} is {upload.size / 1024 ** 2:.0f} MB; the limit is {MAX_UPLOAD_BYTES / 1024 ** 2:.0f} MB."
+        )
+    file_path = os.path.join(directory, os.path.basename(upload.name))
+    stored = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    digest, prefix = upload_digests(upload, stored)
+    if stored == upload.size and dataset_cache.version(file_path) == digest:
+        ensure_sidecar(file_path)
+        return file_path
+    base = None
+    if (prefix and stored < upload.size and file_path.endswith("csv") and ends_with_newline(file_path)
+            and dataset_cache.version(file_path) == prefix):
+        base = ensure_sidecar(file_path)
+
+    chunks = read_chunks(upload)
+    head = next(chunks, b"")
+    schema = sniff_schema(upload.name, head)
+    # Chosen up front so the sidecar can carry the source's metadata from its first byte.
+    mtime_ns = time.time_ns()
+    metadata = {
+        b"indius.version": FORMAT_VERSION,
+        b"indius.source_size": str(upload.size).encode(),
+        b"indius.source_mtime_ns": str(mtime_ns).encode(),
+        b"indius.source_digest": digest.encode(),
+    }
+    offset = 0
+    if base is not None:
+        with pa.memory_map(base) as source:
+            schema = pa.ipc.open_file(source).schema.remove_metadata()
+        metadata[b"indius.base_digest"] = prefix.encode()
+        metadata[b"indius.base_rows"] = str(sidecar_rows(file_path)).encode()
+        offset = stored
+
+    os.makedirs(directory, exist_ok=True)
+    os.makedirs(SIDECAR_DIR, exist_ok=True)
+    suffix = f"{os.getpid()}.{threading.get_ident()}.tmp"
+    data_tmp, sidecar_tmp = f"{file_path}.{suffix}", f"{sidecar_path(file_path)}.{suffix}"
+    pipe, parser, errors = None, None, []
+    if schema is not None:
+        pipe = ChunkPipe()
+
+        def parse():
+            try:
+                stream_sidecar(pipe, sidecar_tmp, schema, metadata, base)
+            except Exception as e:
+                errors.append(e)
+                # Keep draining so the writer never blocks on a full pipe.
+                while pipe.read(UPLOAD_CHUNK):
+                    pass
+
+        parser = threading.Thread(target=parse, daemon=True, name="indius-ingest")
+        parser.start()
+
+    written = 0
+    try:
+        with open(data_tmp, "wb") as f:
+            for chunk in itertools.chain([head], chunks):
+                f.write(chunk)
+                if pipe is not None and written + len(chunk) > offset:
+                    # When appending, only the bytes past the stored file are parsed.
+                    pipe.feed(chunk[max(offset - written, 0):])
+                written += len(chunk)
+                if progress is not None:
+                    progress(written / max(upload.size, 1))
+    finally:
+        if pipe is not None:
+            pipe.finish()
+            parser.join()
+        if written < upload.size:
+            # Interrupted part way: leave no partial files behind.
+            for path in (data_tmp, sidecar_tmp):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    os.replace(data_tmp, file_path)
+    os.utime(file_path, ns=(mtime_ns, mtime_ns))
+    with _lock:
+        _verified.pop(file_path, None)
+        if parser is not None and not errors:
+            os.replace(sidecar_tmp, sidecar_path(file_path))
+        else:
+            # Excel, or a CSV whose later rows did not fit the sniffed (or stored) types: parse it whole.
+            if os.path.exists(sidecar_tmp):
+                os.remove(sidecar_tmp)
+            build_sidecar(file_path)
+    return file_path
@@ -1,11 +1,18 @@
+import config  # noqa: F401
 import streamlit as st
 import os
 import pandas as pd
-import ast
 import json
-from plot import generate_plot
-from agent import response_fig, response_code, response_code_run
-from model import get_response
+import uuid
+from functools import lru_cache
+from charts import build_figure, is_numeric, PLOT_TYPES, Z_PLOT_TYPES, Z_REQUIRED
+from downsample import downsample_figure, POINT_BUDGET
+from cache import dataset_cache
+from ingest import ingest_upload, sheet_names, UploadError
+from sql_engine import is_large
+import service
+import tracing
+from tracing import tracer
 import plotly.graph_objs as go
 
 # Page config
@@ -20,37 +27,111 @@ def files_exist():
         os.makedirs("files")
     return bool(os.listdir("files") if os.path.exists("files") else False)
 
-def load_data(file_path):
-    """Load data from a file."""
-    if file_path.endswith("csv"):
-        return pd.read_csv(file_path)
-    else:
-        return pd.read_excel(file_path)
-
-def display_data_summary(df):
-    """Display a summary of the dataset."""
+def display_cache_stats():
+    """Display dataset cache counters."""
+    stats = dataset_cache.stats()
+    with st.expander("Dataset cache"):
+        st.caption(
+            f"Hits: {stats['hits']} · Misses: {stats['misses']} · Evictions: {stats['evictions']}"
+        )
+        st.caption(
+            f"Held: {stats['entries']} file(s), {stats['bytes_held'] / 1024 ** 2:.1f} MB"
+            f" of {stats['max_bytes'] / 1024 ** 2:.0f} MB"
+        )
+        if stats["bytes_saved"]:
+            st.caption(f"Compact dtypes saved {stats['bytes_saved'] / 1024 ** 2:.1f} MB")
+
+def display_model_stats():
+    """Display model call counters, queue depth and latency."""
+    stats = service.model_stats()
+    with st.expander("Model calls"):
+        st.caption(
+            f"Requests: {stats['requests']} · Coalesced: {stats['coalesced']} · "
+            f"Rate limited: {stats['rate_limited']} · Retries: {stats['retries']} · Errors: {stats['errors']}"
+        )
+        depth = stats["queue_depth"]
+        st.caption(f"Active: {stats['active']} · Queued: {depth['interactive']} interactive, {depth['prefetch']} prefetch")
+        for lane in ("interactive", "prefetch"):
+            if stats[f"{lane}_latency_p50"] is not None:
+                st.caption(
+                    f"{lane.capitalize()} latency p50 {stats[f'{lane}_latency_p50']:.2f}s"
+                    f" · p95 {stats[f'{lane}_latency_p95']:.2f}s"
+                )
+
+def trace_waterfall(spans):
+    """Draw a trace's spans as bars on a shared timeline, children below their parents."""
+    spans = sorted(spans, key=lambda span: span["start"])
+    depth = {}
+    for span in spans:
+        depth[span["span_id"]] = depth.get(span["parent_id"], -1) + 1
+    start = spans[0]["start"]
+    fig = go.Figure(go.Bar(
+        y=list(range(len(spans))),
+        x=[((span["end"] or span["start"]) - span["start"]) / 1e9 for span in spans],
+        base=[(span["start"] - start) / 1e9 for span in spans],
+        orientation="h",
+        marker_color=["#EF553B" if span["error"] else "#00CC96" for span in spans],
+        hovertext=[", ".join(f"{k}={v}" for k, v in span["attributes"].items()) for span in spans],
+    ))
+    fig.update_yaxes(
+        autorange="reversed", tickmode="array", tickvals=list(range(len(spans))),
+        ticktext=["\u00a0\u00a0" * depth[span["span_id"]] + span["name"] for span in spans],
+    )
+    fig.update_layout(xaxis_title="seconds", height=max(200, 28 * len(spans)), margin=dict(t=10))
+    return fig
+
+@st.fragment
+def display_traces():
+    """Developer panel: the waterfall of a recent request and latency percentiles per span."""
+    traces = tracer.traces()
+    if service.ADDRESS:
+        # Work done in the service is recorded there, under the same trace ids
+        for trace_id, spans in service.traces().items():
+            traces.setdefault(trace_id, []).extend(spans)
+    requests = {
+        trace_id: root
+        for trace_id, spans in traces.items()
+        for root in spans if root["parent_id"] is None and root["end"] is not None
+    }
+    if not requests:
+        st.caption("No requests traced yet.")
+        return
+    trace_id = st.selectbox(
+        "Request", list(requests), key="trace_id",
+        format_func=lambda t: f"{requests[t]['name']} · {(requests[t]['end'] - requests[t]['start']) / 1e9:.2f}s",
+    )
+    st.plotly_chart(trace_waterfall(traces[trace_id]))
+    st.markdown("**Recent runs**")
+    st.dataframe(pd.DataFrame(tracing.aggregates(traces)).T.rename(columns=lambda c: f"{c} (s)" if c != "count" else c))
+    st.download_button(
+        "Download traces (OTLP JSON)", json.dumps(tracing.to_otlp([s for spans in traces.values() for s in spans])),
+        file_name="traces.json", mime="application/json",
+    )
+
+def display_data_summary(df, profile, quality):
+    """Display a summary of the dataset from its precomputed profile and quality report."""
     st.subheader("📊 Detailed Summary Report")
 
     # Section 1: Basic Information
     st.markdown("### 📄 Basic Information")
     col1, col2, col3 = st.columns(3)
     with col1:
-        st.metric("Number of Rows", df.shape[0])
+        st.metric("Number of Rows", profile["rows"])
     with col2:
-        st.metric("Number of Columns", df.shape[1])
+        st.metric("Number of Columns", profile["columns"])
     with col3:
-        st.metric("Total Cells", df.size)
+        st.metric("Total Cells", profile["cells"])
 
     st.markdown("**Column Names:**")
     st.write(", ".join(df.columns))
 
     # Section 2: Data Types
     st.markdown("### 🧾 Data Types")
-    st.write(df.dtypes.to_frame(name="Data Type"))
+    st.write(profile["dtypes"].astype(str).to_frame(name="Data Type"))
 
     # Section 3: Missing Values
     st.markdown("### 🚨 Missing Values")
-    missing_values = df.isnull().sum()
+    missing_values = profile["nulls"]
     if missing_values.sum() > 0:
         st.warning("Your dataset contains missing values. Consider handling them for better analysis.")
         st.write(missing_values[missing_values > 0].to_frame(name="Missing Values"))
@@ -59,40 +140,89 @@ def display_data_summary(df):
 
     # Section 4: Unique Values
     st.markdown("### 🔍 Unique Values per Column")
-    unique_values = df.nunique()
-    st.write(unique_values.to_frame(name="Unique Values"))
+    st.caption("Approximate (HyperLogLog) counts.")
+    st.write(profile["distinct"].to_frame(name="Unique Values"))
 
     # Section 5: Descriptive Statistics
     st.markdown("### 📈 Descriptive Statistics")
     with st.expander("View Descriptive Statistics"):
-        st.write(df.describe(include='all'))
+        st.write(profile["describe"].astype(str))
 
     # Section 6: Data Cleanliness Assessment
     st.markdown("### 🧹 Data Cleanliness Assessment")
-    total_cells = df.size
-    missing_cells = df.isnull().sum().sum()
-    duplicate_rows = df.duplicated().sum()
-    cleanliness_score = ((total_cells - missing_cells) / total_cells) * 100
+    missing_cells = quality["missing"]
+    duplicates = quality["duplicates"]
+    near_duplicates = quality["near_duplicates"]
+    cleanliness_score = quality["score"]
 
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     with col1:
         st.metric("Missing Cells", missing_cells)
-        st.metric("Duplicate Rows", duplicate_rows)
+        st.metric("Duplicate Rows", duplicates["rows"])
     with col2:
-        st.metric("Cleanliness Score", f"{cleanliness_score:.2f}%")
+        st.metric("Near-duplicate Rows", near_duplicates["rows"])
+        st.metric("Type Violations", quality["violations"])
+    with col3:
+        st.metric("Outlier Rows", quality["outlier_rows"], help="Not counted in the score: outliers may be genuine.")
+        st.metric("Quality Score", f"{cleanliness_score:.2f}%")
         st.progress(cleanliness_score / 100)
 
+    if quality["keys"]:
+        st.caption("Unique key: " + ", ".join(quality["keys"]))
+    if near_duplicates["ignored"]:
+        st.caption("Ignored as row ids when looking for near-duplicates: " + ", ".join(near_duplicates["ignored"]))
+    if quality["rows"] < quality["source_rows"]:
+        st.caption(f"Checked on a random sample of {quality['rows']} of {quality['source_rows']} rows.")
+    with st.expander("View Column Quality"):
+        st.write(quality["columns"])
+    examples = duplicates["examples"] + near_duplicates["examples"]
+    if examples:
+        with st.expander("View Duplicate Examples"):
+            for positions in examples:
+                st.write(df.iloc[positions])
+
     if missing_cells > 0:
         st.warning("⚠️ Your dataset contains missing values. Consider handling them for better analysis.")
-    if duplicate_rows > 0:
+    if duplicates["rows"] > 0:
         st.warning("⚠️ Your dataset contains duplicate rows. Consider removing them for better analysis.")
+    if near_duplicates["rows"] > 0:
+        st.warning("⚠️ Some rows differ only in case, spacing or rounding. They may be duplicates entered differently.")
+    if quality["violations"] > 0:
+        st.warning("⚠️ Some values do not match their column's type. See the column quality table.")
 
     # Section 7: Sample Data
     st.markdown("### 📋 Sample Data")
     with st.expander("View Sample Data"):
         st.write(df.head())
 
-def handle_hypothesis_testing(df, selected_file, dataset_head, dataset_info):
+def show_step(event):
+    """Display one agent step as soon as it finishes."""
+    st.markdown(f"**{event['stage'].capitalize()} · step {event['step']}** ({event['duration']:.1f}s)")
+    if event["code"]:
+        st.code(event["code"], language="python")
+    if event["error"]:
+        st.error(event["error"])
+    elif event["observations"]:
+        st.text(event["observations"][:1000])
+
+def show_answer(question, selected_file, data_info):
+    """Answer a question with text and a figure, and report how long each stage took."""
+    with tracer.span("question", root=True, question=question, file=selected_file):
+        with st.status("Generating response...") as status:
+            for event in service.answer(st.session_state.session_id, question, selected_file, data_info):
+                if event["type"] == "step":
+                    show_step(event)
+            status.update(label="Response ready", state="complete", expanded=False)
+        st.write(event["answer"])
+        if isinstance(event["figure"], go.Figure):
+            with tracer.span("plotly"):
+                st.plotly_chart(downsample_figure(event["figure"]))
+        else:
+            st.error(f"Error generating visualization...")
+        st.caption(" · ".join(f"{stage}: {seconds:.1f}s" for stage, seconds in event["timings"].items()))
+
+@st.fragment
+def handle_hypothesis_testing(df, selected_file, data_info):
     """Handle hypothesis testing and guide me functionality."""
     st.subheader("Welcome to Hypothesis Testing!")
     st.write("""
@@ -114,57 +244,207 @@ def handle_hypothesis_testing(df, selected_file, dataset_head, dataset_info):
         if not hypothesis.strip():
             st.warning("Please enter a hypothesis before running.")
         else:
-            with st.spinner("Testing your hypothesis..."):
+            with tracer.span("hypothesis", root=True, hypothesis=hypothesis, file=selected_file):
                 try:
-                    # Get results from the agent
-                    results = response_code_run(hypothesis, selected_file, dataset_head)
-                    st.success("Hypothesis test completed!")
+                    with st.status("Testing your hypothesis...") as status:
+                        results, native = None, False
+                        try:
+                            # Mapped to a built-in test by rules, then the model
+                            tested = service.stats_test(hypothesis, selected_file)
+                        except ValueError as e:
+                            tested = None
+                            st.write(f"{e} Falling back to the analysis agent.")
+                        if tested is not None:
+                            result, results = tested
+                            st.write(f"Ran **{result['test']}** on `{'`, `'.join(result['columns'])}`.")
+                            st.text(results)
+                            native = True
+                        if results is None:
+                            # No built-in test fits: have the agent write the analysis, showing its steps as they run
+                            for event in service.hypothesis(hypothesis, selected_file, data_info):
+                                if event["type"] == "step":
+                                    show_step(event)
+                            results = event["result"]
+                        # Keep a built-in test's results open; collapse the agent's steps
+                        status.update(label="Hypothesis test completed!", state="complete", expanded=native)
+                    if isinstance(results, Exception):
+                        raise results
 
                     # Generate an explanation of the results
                     prompt = f"""
-                    The following are the results from a statistical test run on the dataset with columns {list(df.columns)} and data info {dataset_info} to test the hypothesis '{hypothesis}'.
+                    The following are the results from a statistical test run on this dataset to test the hypothesis '{hypothesis}'.
+                    {data_info}
                     Test results:\n{results}
                     Your output should have only one point talking about whether the hypothesis is true or false and why.
                     NOTE: The output should not have any other text other than what is required.
                     """
-                    explanation = get_response(prompt)
                     st.subheader("Explanation:")
-                    st.write(explanation)
+                    st.write_stream(service.stream_text(prompt))
                 except Exception as e:
                     st.error(f"An error occurred while testing the hypothesis: {e}")
 
     # Handle "Guide Me" button
     if guide_me:
-        with st.spinner("Generating suggestions..."):
+        with tracer.span("guide", root=True, file=selected_file):
             try:
                 # Generate hypotheses or analysis suggestions
                 prompt = f"""
                 Given the following dataset information and sample data, suggest 3 hypotheses or statistical analyses that could provide insights into the data.
                 The user has no background in statistics or coding, so include a simple explanation for each suggestion.
 
-                Sample data:\n{dataset_head}
+                Dataset:\n{data_info}
 
                 List the suggestions in a numbered format, e.g., '1. [Hypothesis/Analysis] - [Simple explanation with suitable statistical tests]'.
                 NOTE: Your output should not contain any text other than the numbered hypothesis and explanation.
                 """
-                suggestions = get_response(prompt).strip().split("\n")
                 st.subheader("Suggested Hypotheses/Analyses:")
-                for suggestion in suggestions:
-                    st.write(suggestion)
+                st.write_stream(service.stream_text(prompt))
             except Exception as e:
                 st.error(f"An error occurred while generating suggestions: {e}")
 
+@st.fragment
+def handle_questions(df, selected_file, data_info):
+    """Suggested questions and free-form questions about the dataset."""
+    st.write(df.head())
+
+    # Generate and cache questions; they are about the columns, so a re-upload that keeps
+    # them (such as one appending rows) keeps the questions and only recomputes the answers
+    columns = [(str(name), dtype.kind) for name, dtype in df.dtypes.items()]
+    version = dataset_cache.version(f"files/{selected_file}")
+    if (st.session_state.get("stored_file") != selected_file or
+        st.session_state.get("stored_columns") != columns):
+        with st.spinner("Generating questions..."), tracer.span("suggest_questions", root=True):
+            query = f"""
+            Consider this dataset: {data_info}
+            Give me three interesting questions from this dataset.
+            Return the output as a list [question1, question2, question3] without backticks.
+            """
+            questions = service.ask_literal(query)
+            st.session_state.questions = questions
+            st.session_state.stored_file = selected_file
+            st.session_state.stored_columns = columns
+    if st.session_state.get("stored_version") != (selected_file, version):
+        # Start answering them in the background; switching files cancels this batch
+        service.prefetch(st.session_state.session_id, selected_file, st.session_state.questions, data_info)
+        st.session_state.stored_version = (selected_file, version)
+
+    questions = st.session_state.questions
+    question1, question2, question3 = questions
+    st.text("Suggested Questions: ")
+    pending = service.prefetch_status(st.session_state.session_id)
+    if pending["queued"] or pending["running"]:
+        st.caption(f"Preparing answers in the background: {pending['done']} of {sum(pending.values())} runs done")
+
+    # Display question buttons
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        question_element1 = st.button(question1)
+    with col2:
+        question_element2 = st.button(question2)
+    with col3:
+        question_element3 = st.button(question3)
+
+    if question_element1:
+        show_answer(question1, selected_file, data_info)
+
+    if question_element2:
+        show_answer(question2, selected_file, data_info)
+
+    if question_element3:
+        show_answer(question3, selected_file, data_info)
+
+    # Query container with button-driven interaction
+    with st.container(border=True):
+        st.write(f"File name: {selected_file}")
+        query = st.text_input("", placeholder="Ask anything...", key="tab1_input")
+        ask_button = st.button("Ask", key="ask_button")
+
+        if ask_button and query:
+            show_answer(query, selected_file, data_info)
+
+@lru_cache(maxsize=64)
+def column_range(file_path, version, column):
+    """Return a numeric column's (min, max), scanned once per file version; None for other columns."""
+    series = service.load_frame(file_path)[column]
+    if not is_numeric(series) or not series.notna().any():
+        return None
+    return float(series.min()), float(series.max())
+
+@st.fragment
+def handle_plots(df, selected_file, data_info):
+    """Plot controls and the chart they draw."""
+    st.write(df.head())
+
+    # Plot controls
+    plot_type = st.selectbox("Plot Type", PLOT_TYPES, key="plot_type")
+
+    columns = df.columns.tolist()
+    X_axis = st.selectbox("X-Axis", columns, key="x_axis")
+    Y_axis = st.selectbox("Y-Axis", columns, key="y_axis")
+    Z_axis = None
+    if plot_type in Z_PLOT_TYPES:
+        z_options = columns if plot_type in Z_REQUIRED else ["None"] + columns
+        Z_axis = st.selectbox("Z-Axis", z_options, key="z_axis")
+        Z_axis = None if Z_axis == "None" else Z_axis
+    style_with_ai = st.checkbox("Style it for me with AI (slower)", key="style_with_ai")
+
+    with st.expander("Detail"):
+        budget = st.number_input(
+            "Point budget", min_value=100, value=POINT_BUDGET, step=1000, key="point_budget",
+            help="Larger traces are decimated or binned before they are sent to the browser.",
+        )
+        # Zooming re-renders the selected window from the full data
+        x_range = None
+        file_path = f"files/{selected_file}"
+        bounds = column_range(file_path, dataset_cache.version(file_path), X_axis)
+        if bounds and bounds[0] < bounds[1]:
+            low, high = bounds
+            x_range = st.slider("Zoom X range", low, high, (low, high), key="x_range")
+
+    if st.button("Plot", key="plot_button"):
+        with tracer.span("plot", root=True, plot_type=plot_type, ai=style_with_ai):
+            if style_with_ai:
+                with st.spinner("Generating plot..."):
+                    fig = service.plot(data_info, selected_file, plot_type, X_axis, Y_axis)
+                    st.plotly_chart(downsample_figure(fig, budget) if isinstance(fig, go.Figure) else fig)
+            else:
+                try:
+                    st.plotly_chart(build_figure(df, plot_type, X_axis, Y_axis, Z_axis, budget, x_range))
+                except Exception as e:
+                    st.error(f"Could not draw a {plot_type} for these columns: {e}")
+
 # Sidebar for file upload
 with st.sidebar:
     st.subheader("Files", divider="gray")
     upload_files = st.file_uploader("", accept_multiple_files=True, type=["csv", "xlsx"])
 
     if upload_files:
+        # The uploader keeps its files across reruns; ingest each upload only once
+        ingested = st.session_state.setdefault("ingested_uploads", set())
         for upload_file in upload_files:
-            bytes_data = upload_file.getvalue()
-            filename = upload_file.name
-            with open(f"files/{filename}", mode="wb") as w:
-                w.write(bytes_data)
+            if upload_file.file_id in ingested:
+                continue
+            progress = st.progress(0.0, text=f"Ingesting {upload_file.name}...")
+            try:
+                target = os.path.join("files", os.path.basename(upload_file.name))
+                replaced = dataset_cache.version(target) if os.path.exists(target) else None
+                # Copy in chunks and build the typed sidecar in the same pass; appended rows alone are parsed
+                ingest_upload(upload_file, "files", progress=lambda done: progress.progress(min(done, 1.0)))
+                ingested.add(upload_file.file_id)
+                if replaced and dataset_cache.version(target) != replaced:
+                    # Answers computed from the old rows are stale; prompt-keyed replies are left alone
+                    service.invalidate_answers(replaced)
+            except UploadError as e:
+                st.error(str(e))
+            finally:
+                progress.empty()
+
+# Load the agent and model stack in the background while the first page renders
+service.start_warm_up()
+
+# Identifies this browser session to the background prefetcher
+if "session_id" not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 
 # Main content
 if files_exist():
@@ -172,124 +452,53 @@ if files_exist():
     files = os.listdir("files")
     selected_file = st.selectbox("Select a file to analyze", files)
 
+    if selected_file and selected_file.endswith(".xlsx"):
+        # Each sheet is its own dataset, parsed and stored only once it is picked
+        sheets = sheet_names(f"files/{selected_file}")
+        if len(sheets) > 1:
+            sheet = st.selectbox("Sheet", sheets)
+            if sheet != sheets[0]:
+                selected_file = f"{selected_file}#{sheet}"
+
     if selected_file:
+        # Load data once per rerun; the cache makes this a lookup after the first parse
+        with st.spinner("Loading data..."):
+            df = service.load_frame(f"files/{selected_file}")
+        if st.session_state.get("preloaded_file") != selected_file:
+            service.preload(selected_file)
+            st.session_state.preloaded_file = selected_file
+        # Description of the dataset shared by every prompt, built once per file version
+        data_info, rows = service.describe(selected_file)
+        if is_large(f"files/{selected_file}"):
+            st.info(f"This file is large: showing a random sample of {len(df):,} of its {rows:,} rows. "
+                    "Questions are answered with SQL over the whole file.")
+
+        with st.sidebar:
+            display_cache_stats()
+            display_model_stats()
+
         # Navigation tabs
-        tab1, tab2, tab3, tab4 = st.tabs(["Table", "Plots", "Summary", "Hypothesis"])
+        tab_names = ["Table", "Plots", "Summary", "Hypothesis"] + (["Developer"] if tracing.PANEL else [])
+        tab1, tab2, tab3, tab4, *dev_tab = st.tabs(tab_names)
 
         with tab1:
-            # Load data
-            with st.spinner("Loading data..."):
-                df = load_data(f"files/{selected_file}")
-                st.write(df.head())
-                data_info = df.head()
-
-            # Generate and cache questions
-            if ('stored_file' not in st.session_state or
-                st.session_state.stored_file != selected_file):
-                with st.spinner("Generating questions..."):
-                    query = f"""
-                    Consider this dataset: {data_info}
-                    Give me three interesting questions from this dataset.
-                    Return the output as a list [question1, question2, question3] without backticks.
-                    """
-                    questions = get_response(query).strip()
-                    questions = ast.literal_eval(questions)
-                    st.session_state.questions = questions
-                    st.session_state.stored_file = selected_file
-
-            questions = st.session_state.questions
-            question1, question2, question3 = questions
-            st.text("Suggested Questions: ")
-
-            # Display question buttons
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                question_element1 = st.button(question1)
-            with col2:
-                question_element2 = st.button(question2)
-            with col3:
-                question_element3 = st.button(question3)
-
-            if question_element1:
-                with st.spinner("Generating response..."):
-                    resp_fig = response_fig(question1, selected_file, data_info)
-                    resp_code = response_code(question1, selected_file, data_info)
-                    st.write(resp_code)
-                    if isinstance(resp_fig, go.Figure):
-                        st.plotly_chart(resp_fig)
-                    else:
-                        st.error(f"Error generating visualization...")
-
-            if question_element2:
-                with st.spinner("Generating response..."):
-                    resp_fig = response_fig(question2, selected_file, data_info)
-                    resp_code = response_code(question2, selected_file, data_info)
-                    st.write(resp_code)
-                    if isinstance(resp_fig, go.Figure):
-                        st.plotly_chart(resp_fig)
-                    else:
-                        st.error(f"Error generating visualization...")
-
-            if question_element3:
-                with st.spinner("Generating response..."):
-                    resp_fig = response_fig(question3, selected_file, data_info)
-                    resp_code = response_code(question3, selected_file, data_info)
-                    st.write(resp_code)
-                    if isinstance(resp_fig, go.Figure):
-                        st.plotly_chart(resp_fig)
-                    else:
-                        st.error(f"Error generating visualization...")
-
-            # Query container with button-driven interaction
-            with st.container(border=True):
-                st.write(f"File name: {selected_file}")
-                query = st.text_input("", placeholder="Ask anything...", key="tab1_input")
-                ask_button = st.button("Ask", key="ask_button")
-
-                if ask_button and query:
-                    with st.spinner("Generating response..."):
-                        resp_fig = response_fig(query, selected_file, data_info)
-                        resp_code = response_code(query, selected_file, data_info)
-                        st.write(resp_code)
-                        if isinstance(resp_fig, go.Figure):
-                            st.plotly_chart(resp_fig)
-                        else:
-                            st.error(f"Error generating visualization...")
+            handle_questions(df, selected_file, data_info)
 
         with tab2:
-            # Load data
-            with st.spinner("Loading data..."):
-                df = load_data(f"files/{selected_file}")
-                st.write(df.head())
-
-            # Plot controls
-            plot_type = st.selectbox(
-                "Plot Type",
-                ("Scatter Plot", "Line Chart", "Bar Chart", "Histogram",
-                 "Box Plot", "Violin Plot", "Heatmap", "Contour Plot",
-                 "3D Scatter Plot", "3D Surface Plot"),
-                key="plot_type"
-            )
-
-            columns = df.columns.tolist()
-            X_axis = st.selectbox("X-Axis", columns, key="x_axis")
-            Y_axis = st.selectbox("Y-Axis", columns, key="y_axis")
-
-            if st.button("Plot", key="plot_button"):
-                with st.spinner("Generating plot..."):
-                    st.plotly_chart(generate_plot(df.head(), selected_file, plot_type, X_axis, Y_axis))
+            handle_plots(df, selected_file, data_info)
 
         with tab3:
-            with st.spinner("Loading data..."):
-                df = load_data(f"files/{selected_file}")
-                display_data_summary(df)
+            with st.spinner("Profiling data..."):
+                profile = service.profile(selected_file)
+                quality = service.quality(selected_file)
+            display_data_summary(df, profile, quality)
 
         with tab4:
-            with st.spinner("Loading data..."):
-                df = load_data(f"files/{selected_file}")
-                dataset_head = df.head()
-                dataset_info = df.info()
-                handle_hypothesis_testing(df, selected_file, dataset_head, dataset_info)
+            handle_hypothesis_testing(df, selected_file, data_info)
+
+        if dev_tab:
+            with dev_tab[0]:
+                display_traces()
 
 else:
     with st.container(border=True):
@@ -1,14 +1,58 @@
 #!/usr/bin/env python3
 
-from google import genai
-from dotenv import load_dotenv
-import os
+import ast
 
-load_dotenv()
+from gemini import get_client, TEXT_MODEL_ID
+from response_cache import response_cache
+from scheduler import scheduler, estimate_tokens
+from tracing import tracer
 
-def get_response(query: str) -> str:
-    client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
-    response = client.models.generate_content(
-        model="gemini-2.0-flash", contents=query
+def total_tokens(response):
+    return response.usage_metadata.total_token_count if response.usage_metadata else None
+
+def generate(query: str) -> str:
+    client = get_client()
+    # Identical prompts in flight at the same time share one request
+    response = scheduler.call(
+        lambda: client.models.generate_content(model=TEXT_MODEL_ID, contents=query),
+        key=("text", TEXT_MODEL_ID, query),
+        tokens=estimate_tokens(query),
+        usage=total_tokens,
     )
     return response.text
+
+def is_literal(text: str) -> bool:
+    """Tell whether a reply parses as a Python literal, such as a list of questions."""
+    try:
+        ast.literal_eval(text.strip())
+    except (ValueError, TypeError, SyntaxError):
+        return False
+    return True
+
+def get_response(query: str, accept=None) -> str:
+    # The prompt embeds the data it is about, so it is its own dataset key. A reply
+    # accept rejects is returned but not cached, so asking again gets a new one.
+    with tracer.span("model.text", prompt_chars=len(query)):
+        return response_cache.cached("text", "", query, TEXT_MODEL_ID, lambda: generate(query), accept=accept)
+
+
+def stream_response(query: str):
+    """Yield the response text in chunks as the model produces it."""
+    with tracer.span("model.text_stream", prompt_chars=len(query)) as span:
+        found, text = response_cache.get("text", "", query, TEXT_MODEL_ID)
+        if span:
+            span.set(cached=found)
+        if found:
+            yield text
+            return
+        client = get_client()
+        chunks = []
+        stream = scheduler.stream(
+            lambda: client.models.generate_content_stream(model=TEXT_MODEL_ID, contents=query),
+            tokens=estimate_tokens(query),
+        )
+        for chunk in stream:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        response_cache.put("text", "", query, TEXT_MODEL_ID, "".join(chunks))
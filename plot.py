@@ -1,34 +1,31 @@
-from smolagents import CodeAgent, LiteLLMModel
-import os
-from dotenv import load_dotenv
+import plotly.graph_objs as go
+from pool import agent_pool, AGENT_MODEL_ID
+from cache import dataset_cache, split_sheet
+from response_cache import response_cache
 
-load_dotenv()
+def run_plot_agent(query):
+    with agent_pool.checkout("plot") as agent:
+        return agent.run(query)
 
 def generate_plot(data_info, file_name, chart_type, x_axis, y_axis):
-    # Initialize Gemini model
-    model = LiteLLMModel(
-        model_id="gemini/gemini-2.0-flash",
-        api_key=os.getenv("GEMINI_API_KEY")
-    )
-
-    # Create CodeAgent with necessary permissions
-    agent = CodeAgent(
-        tools=[],
-        model=model,
-        additional_authorized_imports=["pandas", "plotly.express", "plotly.graph_objects"]
-    )
-
     # Define the query to generate the plot
+    path, sheet = split_sheet(f"files/{file_name}")
+    source = f"sheet '{sheet}' of '{path}'" if sheet else f"'{path}'"
     query = f"""
     Consider this dataset: {data_info}
     Create a function named generate_plot() that:
-    1. Reads data from 'files/{file_name}'
+    1. Reads data from {source}
     2. Creates a Plotly {chart_type} with {x_axis} on x-axis and {y_axis} on y-axis
     3. The plot should be visually appealing for dark background
     4. Returns the fig object
     """
 
-    # Generate and execute the code
-    fig = agent.run(query)
+    # Generate and execute the code on a pooled agent, or replay a stored figure
+    dataset = dataset_cache.dataset_key(f"files/{file_name}")
+    fig = response_cache.cached(
+        "plot", dataset, f"{chart_type} | {x_axis} | {y_axis}", AGENT_MODEL_ID,
+        lambda: run_plot_agent(query),
+        accept=lambda result: isinstance(result, go.Figure),
+    )
 
     return fig
@@ -0,0 +1,152 @@
+import copy
+import json
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+from litellm.llms.custom_httpx.http_handler import HTTPHandler
+from smolagents import CodeAgent, LiteLLMModel
+
+import sandbox
+from gemini import API_BASE
+from sql_tool import SQLTool
+from scheduler import scheduler, estimate_tokens
+
+AGENT_MODEL_ID = os.getenv("INDIUS_AGENT_MODEL", "gemini/gemini-2.0-flash")
+AGENTS_PER_PROFILE = int(os.getenv("INDIUS_AGENTS_PER_PROFILE", "4"))
+
+# Authorized imports for each kind of agent.
+PROFILES = {
+    "answer": ["pandas"],
+    "figure": ["pandas", "plotly.express", "plotly.graph_objects", "json"],
+    "hypothesis": ["pandas", "numpy", "sklearn", "math", "statistics"],
+    "plot": ["pandas", "plotly.express", "plotly.graph_objects"],
+}
+
+_agent_http = None
+_agent_http_lock = threading.Lock()
+
+
+def agent_api_base():
+    """Return the api_base LiteLLM needs to reach API_BASE, if one is set."""
+    if API_BASE and AGENT_MODEL_ID.startswith("gemini/"):
+        # LiteLLM appends ':generateContent' directly to a custom gemini base.
+        return f"{API_BASE.rstrip('/')}/v1beta/models/{AGENT_MODEL_ID.split('/', 1)[1]}"
+    return API_BASE
+
+
+def agent_completion_kwargs():
+    """Return extra litellm.completion arguments shared by every agent model."""
+    global _agent_http
+    if not AGENT_MODEL_ID.startswith("gemini/"):
+        return {}
+    # LiteLLM's gemini provider opens a new HTTP client per call unless given one.
+    with _agent_http_lock:
+        if _agent_http is None:
+            _agent_http = HTTPHandler()
+    return {"client": _agent_http}
+
+
+class ScheduledLiteLLMModel(LiteLLMModel):
+    """LiteLLMModel whose completions go through the shared scheduler."""
+
+    def __call__(self, messages, *args, **kwargs):
+        def complete():
+            message = LiteLLMModel.__call__(self, messages, *args, **kwargs)
+            return message, self.last_input_token_count, self.last_output_token_count
+
+        prompt = json.dumps([messages, args, kwargs], sort_keys=True, default=str)
+        # Another agent sending the very same conversation shares this request.
+        message, self.last_input_token_count, self.last_output_token_count = scheduler.call(
+            complete,
+            key=(self.model_id, prompt),
+            tokens=estimate_tokens(prompt),
+            usage=lambda result: (result[1] or 0) + (result[2] or 0),
+        )
+        return copy.copy(message)
+
+
+def create_agent(profile):
+    """Build a CodeAgent configured for one of the PROFILES."""
+    model = ScheduledLiteLLMModel(
+        model_id=AGENT_MODEL_ID,
+        api_base=agent_api_base(),
+        api_key=os.getenv("GEMINI_API_KEY"),
+        **agent_completion_kwargs(),
+    )
+    agent = CodeAgent(
+        # The sql tool is pointed at the current dataset for each run.
+        tools=[SQLTool()],
+        model=model,
+        additional_authorized_imports=PROFILES[profile],
+    )
+    if sandbox.ENABLED:
+        agent.python_executor = sandbox.SandboxExecutor(PROFILES[profile])
+    return agent
+
+
+class AgentPool:
+    """Thread-safe pool of reusable CodeAgents, one queue per profile.
+
+    An agent is only ever used by one caller at a time; callers beyond the
+    per-profile limit wait for an agent to be returned.
+    """
+
+    def __init__(self, size=AGENTS_PER_PROFILE):
+        self.size = size
+        self._idle = {profile: queue.LifoQueue() for profile in PROFILES}
+        self._created = dict.fromkeys(PROFILES, 0)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def checkout(self, profile):
+        """Borrow an agent for the given profile for the duration of a with-block."""
+        agent = self._acquire(profile)
+        try:
+            yield agent
+        finally:
+            # Variables from one question must not leak into the next.
+            agent.state.clear()
+            agent.python_executor.state.clear()
+            if isinstance(agent.python_executor, sandbox.SandboxExecutor):
+                agent.python_executor.release()
+            self._idle[profile].put(agent)
+
+    def prewarm(self, profiles=None):
+        """Create one idle agent for each profile ahead of the first request."""
+        for profile in profiles or PROFILES:
+            with self._lock:
+                if self._created[profile]:
+                    continue
+                self._created[profile] += 1
+            self._idle[profile].put(create_agent(profile))
+
+    def stats(self):
+        """Return created and idle agent counts per profile."""
+        with self._lock:
+            return {
+                profile: {"created": self._created[profile], "idle": self._idle[profile].qsize()}
+                for profile in PROFILES
+            }
+
+    def _acquire(self, profile):
+        try:
+            return self._idle[profile].get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created[profile] < self.size
+            if create:
+                self._created[profile] += 1
+        if create:
+            try:
+                return create_agent(profile)
+            except Exception:
+                with self._lock:
+                    self._created[profile] -= 1
+                raise
+        return self._idle[profile].get()
+
+
+agent_pool = AgentPool()
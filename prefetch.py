@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from scheduler import scheduler, PREFETCH
+from tracing import tracer
+
+# Agent runs precomputing suggested questions at any one time, across all sessions.
+PREFETCH_WORKERS = int(os.getenv("INDIUS_PREFETCH_WORKERS", "2"))
+
+
+class Prefetcher:
+    """Precomputes answers to suggested questions in the background.
+
+    Each owner (a browser session) has at most one batch of jobs, for the file it
+    is looking at; starting a batch for another file cancels the previous one.
+    Finished answers land in the response cache, where a click finds them.
+    """
+
+    def __init__(self, workers=PREFETCH_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="indius-prefetch")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def prefetch(self, owner, file_name, questions, data_info, df=None):
+        """Queue the figure and answer runs for each question, replacing the owner's previous batch."""
+        # Imported here so status() and wait() do not load the agent stack.
+        from agent import answer_streams
+
+        cancel = threading.Event()
+        futures = {
+            question: [
+                self._executor.submit(self._drain, stream, cancel)
+                for stream in answer_streams(question, file_name, data_info, df, cancel).values()
+            ]
+            for question in questions
+        }
+        with self._lock:
+            previous = self._jobs.get(owner)
+            self._jobs[owner] = {"file": file_name, "cancel": cancel, "futures": futures}
+        if previous:
+            self._stop(previous)
+
+    def cancel(self, owner):
+        """Drop an owner's queued jobs and stop the running ones."""
+        with self._lock:
+            job = self._jobs.pop(owner, None)
+        if job:
+            self._stop(job)
+
+    def wait(self, owner, file_name, question, timeout=None):
+        """Let an in-flight prefetch of question finish so the caller reads its cached result.
+
+        Runs that have not started yet are withdrawn instead; the caller does the work.
+        """
+        with self._lock:
+            job = self._jobs.get(owner)
+        if not job or job["file"] != file_name or question not in job["futures"]:
+            return
+        running = [f for f in job["futures"][question] if not f.cancel()]
+        wait(running, timeout)
+
+    def status(self, owner):
+        """Return how many of the owner's jobs are queued, running and done."""
+        with self._lock:
+            job = self._jobs.get(owner)
+        counts = {"queued": 0, "running": 0, "done": 0}
+        for futures in (job["futures"].values() if job else ()):
+            for future in futures:
+                state = "done" if future.done() else "running" if future.running() else "queued"
+                counts[state] += 1
+        return counts
+
+    def _stop(self, job):
+        job["cancel"].set()
+        for futures in job["futures"].values():
+            for future in futures:
+                future.cancel()
+
+    def _drain(self, stream, cancel):
+        if cancel.is_set():
+            return
+        try:
+            # Model calls made here queue behind those of people waiting on an answer.
+            with scheduler.lane(PREFETCH), tracer.span("prefetch", root=True):
+                for _ in stream:
+                    pass
+        except Exception:
+            # A failed prefetch just leaves the answer to be computed on click.
+            pass
+
+
+prefetcher = Prefetcher()
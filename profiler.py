@@ -0,0 +1,311 @@
+import copy
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from cache import dataset_cache
+from ingest import append_base, ensure_sidecar
+from sql_engine import csv_reader, scans_csv
+
+# Rows processed per chunk, whether slicing an in-memory frame or reading from disk.
+CHUNK_ROWS = 1_000_000
+# Rows per batch read from a CSV streamed without a sidecar.
+STREAM_BATCH_ROWS = 1 << 16
+# Most common values kept per chunk when merging top-value counts.
+TOP_VALUES_PER_CHUNK = 100
+# Number of dataset versions whose profiles are kept in memory.
+MAX_PROFILES = 32
+
+DESCRIBE_ROWS = ["count", "unique", "top", "freq", "mean", "std", "min", "25%", "50%", "75%", "max"]
+
+
+def canonical(series):
+    """Return a numeric column as 64-bit values, so its hashes do not depend on compact dtypes.
+
+    A float32 value hashes differently from the same float64 one, and a column
+    can be widened when appended rows no longer fit its compact dtype.
+    """
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in "iuf" and series.dtype.itemsize < 8:
+        return series.astype(f"{series.dtype.kind}8")
+    return series
+
+
+def column_hashes(series):
+    """Return stable 64-bit hashes of a column's values."""
+    return pd.util.hash_pandas_object(canonical(series), index=False).to_numpy()
+
+
+def row_hashes(chunk):
+    """Return stable 64-bit hashes of a frame's rows."""
+    return pd.util.hash_pandas_object(chunk.apply(canonical), index=False).to_numpy()
+
+
+class HyperLogLog:
+    """Approximate distinct counter over 64-bit hashes."""
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes):
+        if not len(hashes):
+            return
+        p = self.precision
+        index = (hashes >> np.uint64(64 - p)).astype(np.int64)
+        # A guard bit caps the run of leading zeros at 64 - p.
+        rest = (hashes << np.uint64(p)) | np.uint64(1 << (p - 1))
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (64 - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction: linear counting is near exact here.
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class TDigest:
+    """Mergeable quantile sketch; centroids are compressed with the arcsine scale."""
+
+    def __init__(self, compression=300):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def merge(self, other):
+        self._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+
+    def quantile(self, q):
+        if not len(self.means):
+            return np.nan
+        cumulative = np.cumsum(self.weights) - self.weights / 2
+        return float(np.interp(q * self.weights.sum(), cumulative, self.means))
+
+    def _compress(self, means, weights):
+        if not len(means):
+            return
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        q = (np.cumsum(weights) - weights / 2) / weights.sum()
+        k = np.floor(self.compression * (np.arcsin(2 * q - 1) / np.pi + 0.5)).astype(np.int64)
+        _, cluster = np.unique(k, return_inverse=True)
+        self.weights = np.bincount(cluster, weights=weights)
+        self.means = np.bincount(cluster, weights=means * weights) / self.weights
+
+
+class Profiler:
+    """Accumulates every Summary-tab statistic in one pass over a sequence of chunks."""
+
+    def __init__(self):
+        self.rows = 0
+        self.dtypes = None
+        self.nulls = None
+        self.numeric = []
+        self.moments = {}
+        self.sketches = {}
+        self.digests = {}
+        self.top_values = {}
+        self.row_hashes = []
+
+    def update(self, chunk):
+        if self.dtypes is None:
+            self.dtypes = chunk.dtypes
+            self.nulls = pd.Series(0, index=chunk.columns, dtype="int64")
+            self.numeric = [
+                c for c in chunk.columns
+                if pd.api.types.is_numeric_dtype(chunk[c]) and not pd.api.types.is_bool_dtype(chunk[c])
+            ]
+        self.rows += len(chunk)
+        self.nulls += chunk.isna().sum()
+        self.row_hashes.append(row_hashes(chunk))
+
+        for column in chunk.columns:
+            series = chunk[column]
+            present = series.dropna()
+            self.sketches.setdefault(column, HyperLogLog()).add(column_hashes(present))
+            if column in self.numeric:
+                self._update_moments(column, present.to_numpy(dtype=float))
+                self.digests.setdefault(column, TDigest()).add(present.to_numpy(dtype=float))
+            else:
+                counts = present.value_counts().head(TOP_VALUES_PER_CHUNK)
+                merged = self.top_values.setdefault(column, {})
+                for value, count in counts.items():
+                    merged[value] = merged.get(value, 0) + int(count)
+        return self
+
+    def copy(self):
+        """Return a profiler that can take more chunks without changing this one."""
+        other = copy.copy(self)
+        other.nulls = self.nulls.copy() if self.nulls is not None else None
+        other.moments = dict(self.moments)
+        other.sketches = copy.deepcopy(self.sketches)
+        other.digests = copy.deepcopy(self.digests)
+        other.top_values = copy.deepcopy(self.top_values)
+        # The hash arrays themselves are never modified, only added to.
+        other.row_hashes = list(self.row_hashes)
+        return other
+
+    def _update_moments(self, column, values):
+        if not len(values):
+            return
+        n_b, mean_b = len(values), values.mean()
+        m2_b = ((values - mean_b) ** 2).sum()
+        n_a, mean_a, m2_a, low, high = self.moments.get(column, (0, 0.0, 0.0, np.inf, -np.inf))
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        # Chan et al. parallel update of count, mean and sum of squared deviations.
+        self.moments[column] = (
+            n,
+            mean_a + delta * n_b / n,
+            m2_a + m2_b + delta * delta * n_a * n_b / n,
+            min(low, values.min()),
+            max(high, values.max()),
+        )
+
+    def result(self):
+        """Return the finished profile as a dict of plain values, Series and a describe() frame."""
+        columns = list(self.dtypes.index) if self.dtypes is not None else []
+        hashes = np.concatenate(self.row_hashes) if self.row_hashes else np.empty(0, dtype=np.uint64)
+        describe = pd.DataFrame(index=DESCRIBE_ROWS, columns=columns, dtype=object)
+        for column in columns:
+            count = self.rows - int(self.nulls[column])
+            describe.loc["count", column] = count
+            if column in self.numeric:
+                n, mean, m2, low, high = self.moments.get(column, (0, np.nan, np.nan, np.nan, np.nan))
+                digest = self.digests[column]
+                describe.loc["mean", column] = mean
+                describe.loc["std", column] = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+                describe.loc["min", column] = low
+                describe.loc["25%", column] = digest.quantile(0.25)
+                describe.loc["50%", column] = digest.quantile(0.5)
+                describe.loc["75%", column] = digest.quantile(0.75)
+                describe.loc["max", column] = high
+            else:
+                top = self.top_values.get(column)
+                describe.loc["unique", column] = self.sketches[column].count()
+                if top:
+                    value = max(top, key=top.get)
+                    describe.loc["top", column] = value
+                    describe.loc["freq", column] = top[value]
+        return {
+            "rows": self.rows,
+            "columns": len(columns),
+            "cells": self.rows * len(columns),
+            "dtypes": self.dtypes,
+            "nulls": self.nulls,
+            "distinct": pd.Series({c: self.sketches[c].count() for c in columns}, dtype="int64"),
+            "duplicates": int(len(hashes) - len(np.unique(hashes))),
+            "describe": describe.dropna(how="all"),
+        }
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Yield row slices of an in-memory frame."""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+@contextmanager
+def sidecar_reader(file_path):
+    """Open a file's sidecar as a RecordBatchReader over its memory map."""
+    with pa.memory_map(ensure_sidecar(file_path)) as source:
+        reader = pa.ipc.open_file(source)
+        yield pa.RecordBatchReader.from_batches(
+            reader.schema, (reader.get_batch(i) for i in range(reader.num_record_batches))
+        )
+
+
+def file_chunks(file_path, chunk_rows=CHUNK_ROWS, start=0):
+    """Yield a data file from row start in chunks without loading it whole.
+
+    An up-to-date sidecar is read through its memory map; a CSV without one is
+    streamed from disk by DuckDB rather than converted first.
+    """
+    opened = csv_reader(file_path, min(chunk_rows, STREAM_BATCH_ROWS)) if scans_csv(file_path) else sidecar_reader(file_path)
+    with opened as reader:
+        batches, rows, seen = [], 0, False
+        for batch in reader:
+            seen = True
+            if start >= batch.num_rows:
+                start -= batch.num_rows
+                continue
+            batch, start = batch.slice(start), 0
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= chunk_rows:
+                yield pa.Table.from_batches(batches).to_pandas()
+                batches, rows = [], 0
+        if batches or (not seen and not start):
+            yield pa.Table.from_batches(batches, schema=reader.schema).to_pandas()
+
+
+def profile_chunks(chunks, profiler=None):
+    profiler = profiler or Profiler()
+    for chunk in chunks:
+        profiler.update(chunk)
+    return profiler
+
+
+# (file path, version, of a sample) -> (profiler, profile); the profilers let appended rows be merged in.
+_profiles = OrderedDict()
+_lock = threading.Lock()
+
+
+def base_profiler(file_path):
+    """Return a copy of the profiler of the version this one appends rows to, if it is held."""
+    base = append_base(file_path)
+    if base is None:
+        return None
+    digest, rows = base
+    with _lock:
+        entry = _profiles.get((file_path, digest, False))
+    if entry is None or entry[0].rows != rows:
+        return None
+    return entry[0].copy()
+
+
+def profile_dataset(file_path, df=None):
+    """Profile a dataset once per content version.
+
+    An already loaded frame is profiled in slices; otherwise the file is streamed
+    chunk by chunk, so it never has to fit in memory. A version that appends rows
+    to an already profiled one has only the new rows profiled and merged in.
+    A frame that is only a sample of the file (df.attrs["sample"], set by
+    sql_engine.sample) is profiled and kept apart from the file's own profile.
+    """
+    sampled = df is not None and df.attrs.get("sample", False)
+    key = (file_path, dataset_cache.version(file_path), sampled)
+    with _lock:
+        if key in _profiles:
+            _profiles.move_to_end(key)
+            return _profiles[key][1]
+    profiler = None if sampled else base_profiler(file_path)
+    start = profiler.rows if profiler else 0
+    chunks = frame_chunks(df.iloc[start:]) if df is not None else file_chunks(file_path, start=start)
+    profiler = profile_chunks(chunks, profiler)
+    if df is not None:
+        # Compact dtypes can change with the new rows.
+        profiler.dtypes = df.dtypes
+    profile = profiler.result()
+    with _lock:
+        _profiles[key] = (profiler, profile)
+        while len(_profiles) > MAX_PROFILES:
+            _profiles.popitem(last=False)
+    return profile
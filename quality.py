@@ -0,0 +1,281 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache import dataset_cache
+
+# Values beyond this many interquartile ranges outside the quartiles are flagged
+# as outliers (Tukey's "far out" fences).
+OUTLIER_IQR = 3.0
+# A text column is expected to hold numbers (or dates) when at least this share
+# of its values parse as such; the rest are counted as type violations.
+TYPE_MAJORITY = 0.9
+# Distinct values of a text column tried as numbers or dates before parsing them all.
+TYPE_PROBE = 1000
+# Significant digits floats are rounded to when looking for near-duplicates.
+NEAR_DIGITS = 6
+# Duplicate groups whose row positions are kept as examples.
+EXAMPLE_GROUPS = 5
+EXAMPLE_ROWS = 5
+# Number of dataset versions whose reports are kept in memory.
+MAX_REPORTS = 32
+
+
+def scramble(keys):
+    """Spread 64-bit integers over all 64 bits (the splitmix64 finalizer)."""
+    keys = keys + np.uint64(0x9E3779B97F4A7C15)
+    keys = (keys ^ (keys >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    keys = (keys ^ (keys >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return keys ^ (keys >> np.uint64(31))
+
+
+class ColumnIndex:
+    """A column's hash index: the code of each row's value among the column's distinct values.
+
+    Built with one factorize (hash table) pass; checks on values then run once
+    per distinct value and are spread back to the rows by code. Code -1 marks
+    a missing value.
+    """
+
+    def __init__(self, series):
+        self.codes, self.uniques = pd.factorize(series, use_na_sentinel=True)
+        self.counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.uniques))
+
+    @property
+    def nulls(self):
+        return int(len(self.codes) - self.counts.sum())
+
+    @property
+    def distinct(self):
+        return len(self.uniques)
+
+    def mix(self, hashes, groups=None):
+        """Mix each row's value into its 64-bit row hash; equal values mix in equally.
+
+        groups, a group number per distinct value, makes values of a group equal.
+        """
+        codes = self.codes if groups is None else np.where(self.codes >= 0, groups[self.codes], -1)
+        return scramble(hashes ^ codes.astype(np.uint64))
+
+
+def near_groups(uniques):
+    """Number distinct values by the group near-duplicate detection puts them in.
+
+    Text is compared lowercased with whitespace collapsed, and floats rounded to
+    NEAR_DIGITS significant digits. Returns None when values only match
+    themselves.
+    """
+    values = pd.Series(uniques)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(values.cat.categories.dtype)
+    if pd.api.types.is_float_dtype(values):
+        x = values.to_numpy(dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            magnitude = np.where(x == 0, 0, np.floor(np.log10(np.abs(x))))
+            scale = np.power(10.0, NEAR_DIGITS - 1 - np.nan_to_num(magnitude))
+            return np.unique(np.round(x * scale) / scale, return_inverse=True)[1]
+    if pd.api.types.is_string_dtype(values):
+        text = pa.array(values.astype(str) if values.dtype == object else values, type=pa.string())
+        text = pc.utf8_lower(pc.utf8_trim_whitespace(text))
+        # Matching is much cheaper than replacing, and most text has nothing to collapse.
+        if pc.any(pc.match_substring_regex(text, r"\s\s|[^\S ]")).as_py():
+            text = pc.replace_substring_regex(text, r"\s+", " ")
+        return pc.dictionary_encode(text).indices.to_numpy()
+    return None
+
+
+def duplicate_groups(hashes, positions=None):
+    """Return (duplicate rows, groups, example row positions) for rows with equal hashes.
+
+    Duplicate rows are those beyond the first of each group. positions gives
+    the row position of each hash when they are not every row's, in order.
+    """
+    uniques, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    repeated = np.flatnonzero(counts > 1)
+    examples = []
+    for group in repeated[np.argsort(-counts[repeated], kind="stable")][:EXAMPLE_GROUPS]:
+        members = np.flatnonzero(inverse == group)
+        if positions is not None:
+            members = np.sort(positions[members])
+        examples.append(members[:EXAMPLE_ROWS].tolist())
+    return int(len(hashes) - len(uniques)), len(repeated), examples
+
+
+def outliers(series):
+    """Return a mask of the values outside the OUTLIER_IQR fences of a numeric column."""
+    values = series.to_numpy(dtype=float, na_value=np.nan)
+    if not np.isfinite(values).any():
+        return np.zeros(len(values), dtype=bool)
+    q1, q3 = np.nanpercentile(values[np.isfinite(values)], [25, 75])
+    spread = OUTLIER_IQR * (q3 - q1)
+    with np.errstate(invalid="ignore"):
+        return (values < q1 - spread) | (values > q3 + spread)
+
+
+def type_violations(index, series):
+    """Return (expected type, violating rows) for a column, or (None, 0) if it has no clear type.
+
+    Numeric columns should hold finite numbers. Text columns whose values are
+    mostly numbers, or else mostly dates, should hold only those. Distinct values
+    are checked, weighted by how often they occur, first TYPE_PROBE of them.
+    """
+    if pd.api.types.is_bool_dtype(series):
+        return None, 0
+    if pd.api.types.is_numeric_dtype(series):
+        values = np.asarray(index.uniques, dtype=float)
+        return "finite number", int(index.counts[np.isinf(values)].sum())
+    probe = pd.Series(index.uniques[:TYPE_PROBE]).astype(str)
+    weights = index.counts[:TYPE_PROBE]
+    for expected, parse in (("number", numbers), ("date", dates)):
+        parsed = parse(probe)
+        if weights[parsed].sum() < TYPE_MAJORITY * weights.sum():
+            continue
+        if index.distinct > TYPE_PROBE:
+            parsed = parse(pd.Series(index.uniques).astype(str))
+        if index.counts[parsed].sum() >= TYPE_MAJORITY * index.counts.sum():
+            return expected, int(index.counts[~parsed].sum())
+    return None, 0
+
+
+def numbers(text):
+    """Return a mask of the strings that parse as numbers."""
+    return pd.to_numeric(text, errors="coerce").notna().to_numpy()
+
+
+def dates(text):
+    """Return a mask of the strings that parse as dates."""
+    return pd.to_datetime(text, errors="coerce", format="mixed").notna().to_numpy()
+
+
+def assess(df):
+    """Check a frame's data quality in one vectorized pass over its columns.
+
+    Every column gets a hash index, mixed into 64-bit exact and normalized row
+    hashes, so no per-row Python or wide-frame comparison runs.
+    Near-duplicates are rows beyond the exact duplicates that repeat once text
+    is normalized, floats are rounded (see near_groups) and integer ids unique
+    across the distinct rows are ignored. Returns a dict of plain values and a
+    per-column frame.
+    """
+    rows, width = df.shape
+    exact = np.zeros(rows, dtype=np.uint64)
+    near = np.zeros(rows, dtype=np.uint64)
+    flagged = np.zeros(rows, dtype=bool)
+    report, keys, ignored = [], [], []
+    # Integer columns that may be surrogate keys: decided once the distinct rows are known.
+    surrogates = {}
+    for i in range(width):
+        # By position, so duplicate column names are handled too.
+        series = df.iloc[:, i]
+        name = str(df.columns[i])
+        index = ColumnIndex(series)
+        # Identifiers are whole numbers or text; all-distinct measurements are not keys.
+        is_key = (rows > 1 and index.distinct == rows and not index.nulls
+                  and not pd.api.types.is_float_dtype(series))
+        exact = index.mix(exact)
+        if is_key:
+            keys.append(name)
+        if width > 1 and pd.api.types.is_integer_dtype(series) and not index.nulls and 2 * index.distinct > rows:
+            surrogates[name] = index
+        else:
+            near = index.mix(near, near_groups(index.uniques))
+        numeric = pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+        mask = outliers(series) if numeric and not is_key else None
+        if mask is not None:
+            flagged |= mask
+        expected, violations = type_violations(index, series)
+        report.append({
+            "column": name,
+            "distinct": index.distinct,
+            "nulls": index.nulls,
+            "duplicate values": rows - index.nulls - index.distinct,
+            "unique key": is_key,
+            "outliers": int(mask.sum()) if mask is not None else 0,
+            "expected type": expected,
+            "type violations": violations,
+        })
+
+    duplicates, groups, examples = duplicate_groups(exact)
+    # One row per distinct exact row, so exact duplicates are not counted again.
+    _, first = np.unique(exact, return_index=True)
+    for name, index in surrogates.items():
+        if index.distinct == len(first):
+            # A surrogate key (a row number or id) tells otherwise repeated rows apart.
+            ignored.append(name)
+        else:
+            near = index.mix(near)
+    near_rows, near_count, near_examples = duplicate_groups(near[first], first)
+    columns = pd.DataFrame(report, columns=[
+        "column", "distinct", "nulls", "duplicate values", "unique key", "outliers", "expected type", "type violations",
+    ]).set_index("column")
+    missing = int(columns["nulls"].sum())
+    violations = int(columns["type violations"].sum())
+    cells = rows * width
+    # Outliers may be genuine, so they are reported but do not lower the score.
+    bad = missing + duplicates * width + violations
+    return {
+        "rows": rows,
+        "cells": cells,
+        "missing": missing,
+        "duplicates": {"rows": duplicates, "groups": groups, "examples": examples},
+        "near_duplicates": {
+            "rows": near_rows,
+            "groups": near_count,
+            "examples": near_examples,
+            "ignored": ignored,
+        },
+        "keys": keys,
+        "outlier_rows": int(flagged.sum()),
+        "violations": violations,
+        "score": 100.0 * (1 - min(bad, cells) / cells) if cells else 100.0,
+        "columns": columns,
+    }
+
+
+_reports = OrderedDict()
+_lock = threading.Lock()
+
+
+def quality_report(file_path, df, source_rows=None):
+    """Return the data-quality report of a dataset, computed once per content version.
+
+    df may be a sample of a larger file: source_rows is then the file's row
+    count, given in the report next to the "rows" that were checked.
+    """
+    key = (file_path, dataset_cache.version(file_path))
+    with _lock:
+        report = _reports.get(key)
+        if report is not None:
+            _reports.move_to_end(key)
+    if report is None:
+        report = assess(df)
+        with _lock:
+            _reports[key] = report
+            while len(_reports) > MAX_REPORTS:
+                _reports.popitem(last=False)
+    return {**report, "source_rows": report["rows"] if source_rows is None else source_rows}
+
+
+def summary_line(report, limit=3):
+    """Describe a report's findings in one line of prompt text, or return None if there are none."""
+    columns = report["columns"]
+    parts = []
+    if report["duplicates"]["rows"]:
+        parts.append(f"{report['duplicates']['rows']} exact duplicate rows")
+    if report["near_duplicates"]["rows"]:
+        parts.append(f"{report['near_duplicates']['rows']} near-duplicate rows")
+    if report["keys"]:
+        parts.append("unique key: " + ", ".join(report["keys"][:limit]))
+    outlying = columns["outliers"][columns["outliers"] > 0].sort_values(ascending=False).head(limit)
+    if len(outlying):
+        parts.append("outliers: " + ", ".join(f"{name} ({count})" for name, count in outlying.items()))
+    violating = columns[columns["type violations"] > 0].head(limit)
+    if len(violating):
+        parts.append("type violations: " + ", ".join(
+            f"{name} ({row['type violations']} not {row['expected type']})" for name, row in violating.iterrows()
+        ))
+    return "Data quality: " + "; ".join(parts) + "." if parts else None
@@ -0,0 +1,213 @@
+import difflib
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import plotly.graph_objs as go
+import plotly.io as pio
+
+CACHE_PATH = os.getenv("INDIUS_RESPONSE_CACHE", ".cache/responses.sqlite3")
+TTL_SECONDS = int(os.getenv("INDIUS_RESPONSE_TTL", str(7 * 24 * 3600)))
+MAX_BYTES = int(os.getenv("INDIUS_RESPONSE_CACHE_MAX_BYTES", str(256 * 1024 ** 2)))
+# Similarity (0-1) above which a near-identical question reuses a cached answer; 0 disables.
+FUZZY_THRESHOLD = float(os.getenv("INDIUS_FUZZY_MATCH", "0"))
+# How many recent entries are compared when fuzzy matching.
+FUZZY_CANDIDATES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dataset TEXT NOT NULL,
+    model TEXT NOT NULL,
+    prompt TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_scope ON responses (kind, dataset, model, accessed);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def normalize_prompt(prompt):
+    """Normalize case, whitespace and trailing punctuation of a prompt."""
+    return re.sub(r"\s+", " ", prompt).strip().rstrip("?.! ").lower()
+
+
+def encode(value):
+    """Serialize a response for storage, or return None if it should not be cached."""
+    if isinstance(value, go.Figure):
+        return "figure", value.to_json()
+    if isinstance(value, str):
+        return "text", value
+    try:
+        return "json", json.dumps(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def decode(encoding, value):
+    if encoding == "figure":
+        return go.Figure(pio.from_json(value))
+    if encoding == "json":
+        return json.loads(value)
+    return value
+
+
+class ResponseCache:
+    """On-disk cache of model responses keyed by dataset version, prompt and model id.
+
+    Text, JSON-serializable results and Plotly figures are stored, so figures
+    can be replayed without a model call. Errors and other results are never
+    cached.
+    """
+
+    def __init__(self, path=CACHE_PATH, ttl=TTL_SECONDS, max_bytes=MAX_BYTES, fuzzy_threshold=FUZZY_THRESHOLD):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.fuzzy_threshold = fuzzy_threshold
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def key(self, kind, dataset, prompt, model):
+        raw = "\0".join((kind, dataset, model, normalize_prompt(prompt)))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, kind, dataset, prompt, model, fuzzy=False):
+        """Return (found, value) for a cached response."""
+        db = self._db()
+        now = time.time()
+        row = db.execute(
+            "SELECT key, encoding, value, created FROM responses WHERE key = ?",
+            (self.key(kind, dataset, prompt, model),),
+        ).fetchone()
+        if row is None and fuzzy and self.fuzzy_threshold:
+            row = self._closest(db, kind, dataset, prompt, model)
+            if row is not None:
+                self.fuzzy_hits += 1
+        if row is None or now - row[3] > self.ttl:
+            self.misses += 1
+            return False, None
+        with db:
+            db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, row[0]))
+        self.hits += 1
+        return True, decode(row[1], row[2])
+
+    def put(self, kind, dataset, prompt, model, value):
+        """Store a response; values that cannot be serialized are skipped."""
+        encoded = encode(value)
+        if encoded is None:
+            return
+        encoding, data = encoded
+        now = time.time()
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(kind, dataset, prompt, model),
+                    kind,
+                    dataset,
+                    model,
+                    normalize_prompt(prompt),
+                    encoding,
+                    data,
+                    len(data),
+                    now,
+                    now,
+                ),
+            )
+        self.evict()
+
+    def cached(self, kind, dataset, prompt, model, compute, fuzzy=False, accept=None):
+        """Return the cached response, or call compute() and cache what it returns.
+
+        accept, if given, decides whether a computed value is worth keeping.
+        """
+        found, value = self.get(kind, dataset, prompt, model, fuzzy=fuzzy)
+        if found:
+            return value
+        value = compute()
+        if accept is None or accept(value):
+            self.put(kind, dataset, prompt, model, value)
+        return value
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones beyond max_bytes."""
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+            total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - self.max_bytes
+            freed = 0
+            doomed = []
+            for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                doomed.append((key,))
+                freed += size
+                if freed >= excess:
+                    break
+            db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+    def invalidate(self, dataset):
+        """Drop every response computed against a dataset version, for each of its sheets too."""
+        db = self._db()
+        with db:
+            db.execute("DELETE FROM responses WHERE dataset = ? OR dataset LIKE ?", (dataset, f"{dataset}#%"))
+
+    def stats(self):
+        db = self._db()
+        entries, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {
+            "hits": self.hits,
+            "fuzzy_hits": self.fuzzy_hits,
+            "misses": self.misses,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def _closest(self, db, kind, dataset, prompt, model):
+        target = normalize_prompt(prompt)
+        best, best_ratio = None, self.fuzzy_threshold
+        rows = db.execute(
+            "SELECT key, encoding, value, created, prompt FROM responses"
+            " WHERE kind = ? AND dataset = ? AND model = ? ORDER BY accessed DESC LIMIT ?",
+            (kind, dataset, model, FUZZY_CANDIDATES),
+        )
+        for row in rows:
+            matcher = difflib.SequenceMatcher(None, target, row[4])
+            if matcher.real_quick_ratio() < best_ratio or matcher.quick_ratio() < best_ratio:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= best_ratio:
+                best, best_ratio = row[:4], ratio
+        return best
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            with self._lock:
+                if not self._schema_ready:
+                    db.executescript(SCHEMA)
+                    self._schema_ready = True
+            self._local.db = db
+        return db
+
+
+response_cache = ResponseCache()
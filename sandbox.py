@@ -0,0 +1,314 @@
+import multiprocessing
+import os
+import pickle
+import queue
+import resource
+import signal
+import subprocess
+import sys
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+
+# Imported here so workers have them loaded before their first code action.
+import numpy  # noqa: F401
+import pandas  # noqa: F401
+import plotly.express  # noqa: F401
+import plotly.graph_objects  # noqa: F401
+from smolagents.default_tools import FinalAnswerTool
+from smolagents.local_python_executor import InterpreterError, LocalPythonInterpreter
+
+import config  # noqa: F401
+from cache import dataset_cache
+from ingest import load_table
+from sql_tool import SQLTool
+
+# Run agent code in worker processes; set to 0 to run it in-process as before.
+ENABLED = os.getenv("INDIUS_SANDBOX", "1") != "0"
+WORKERS = int(os.getenv("INDIUS_SANDBOX_WORKERS", str(max(os.cpu_count() or 1, 2))))
+# Per code action: CPU seconds, wall-clock seconds, and the worker's address space in MB.
+CPU_SECONDS = int(os.getenv("INDIUS_SANDBOX_CPU_SECONDS", "60"))
+WALL_SECONDS = float(os.getenv("INDIUS_SANDBOX_WALL_SECONDS", "120"))
+MEMORY_MB = int(os.getenv("INDIUS_SANDBOX_MEMORY_MB", "4096"))
+# Results larger than this are handed back through shared memory instead of the pipe.
+SHM_THRESHOLD = 1 << 20
+# How often a waiting caller checks for cancellation.
+POLL_SECONDS = 0.05
+
+
+class CPULimitExceeded(Exception):
+    pass
+
+
+def on_cpu_limit(signum, frame):
+    raise CPULimitExceeded(f"Code execution exceeded the {CPU_SECONDS}s CPU time limit.")
+
+
+def cpu_used():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def set_cpu_limit(seconds):
+    """Deliver SIGXCPU once this process has used seconds more CPU time (None lifts the limit)."""
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = resource.RLIM_INFINITY if seconds is None else int(cpu_used() + seconds) + 1
+    if hard != resource.RLIM_INFINITY and soft != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def pack(reply):
+    """Serialize a reply, moving large payloads into a shared memory block."""
+    try:
+        data = pickle.dumps(reply, protocol=pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        # Objects that cannot cross processes are returned as their repr.
+        status, output, *rest = reply
+        data = pickle.dumps((status, repr(output), *rest), protocol=pickle.HIGHEST_PROTOCOL)
+    if len(data) <= SHM_THRESHOLD:
+        return ("inline", data)
+    block = shared_memory.SharedMemory(create=True, size=len(data))
+    block.buf[:len(data)] = data
+    # The parent unlinks the block once read; the worker must not clean it up on exit.
+    resource_tracker.unregister(block._name, "shared_memory")
+    block.close()
+    return ("shm", block.name, len(data))
+
+
+def unpack(message):
+    if message[0] == "inline":
+        return pickle.loads(message[1])
+    _, name, size = message
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        return pickle.loads(bytes(block.buf[:size]))
+    finally:
+        block.close()
+        block.unlink()
+
+
+def serve(fd, memory_mb):
+    """Worker entry point: serve code actions from the parent over fd until it goes away."""
+    conn = Connection(fd)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGXCPU, on_cpu_limit)
+    if memory_mb:
+        limit = memory_mb * 1024 ** 2
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    interpreter = None
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        op = message[0]
+        if op == "reset":
+            interpreter = None
+            reply = ("ok", None)
+        elif op == "load":
+            dataset_cache.get(message[1], load_table)
+            reply = ("ok", None)
+        else:
+            _, code, variables, imports, dataset, preload, cpu_seconds = message
+            if interpreter is None:
+                tools = {"final_answer": FinalAnswerTool(), "sql": SQLTool(dataset)}
+                interpreter = LocalPythonInterpreter(imports, tools)
+                if dataset and preload:
+                    # Shallow copy of the worker's cached frame; copy-on-write keeps the cache intact.
+                    interpreter.state["df"] = dataset_cache.get(dataset, load_table).copy(deep=False)
+            try:
+                set_cpu_limit(cpu_seconds)
+                output, logs, is_final_answer = interpreter(code, variables)
+                reply = ("ok", output, logs, is_final_answer)
+            except BaseException as e:
+                error = str(e) if isinstance(e, (InterpreterError, CPULimitExceeded)) else f"{type(e).__name__}: {e}"
+                reply = ("error", error, str(interpreter.state.get("_print_outputs", "")))
+            finally:
+                set_cpu_limit(None)
+        conn.send(pack(reply))
+
+
+class Worker:
+    """Parent-side handle on one sandbox process."""
+
+    def __init__(self):
+        # A fresh interpreter rather than a fork: the server process holds threads and sockets.
+        self.conn, child = multiprocessing.Pipe()
+        fd = child.fileno()
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)), env.get("PYTHONPATH")]))
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", f"import sandbox; sandbox.serve({fd}, {MEMORY_MB})"],
+            pass_fds=[fd],
+            env=env,
+            stdin=subprocess.DEVNULL,
+        )
+        child.close()
+
+    def request(self, message, timeout=None, cancel=None):
+        """Send a message and wait for the reply, raising TimeoutError past timeout."""
+        self.conn.send(message)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.conn.poll(POLL_SECONDS):
+            if cancel is not None and cancel.is_set():
+                self.kill()
+                raise InterpreterError("Code execution was cancelled.")
+            if deadline is not None and time.monotonic() > deadline:
+                self.kill()
+                raise TimeoutError
+        return unpack(self.conn.recv())
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def kill(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+        self.conn.close()
+
+
+class SandboxPool:
+    """Pool of pre-started worker processes, each leased to one agent run at a time."""
+
+    def __init__(self, size=WORKERS):
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            create = self._created < self.size
+            if create:
+                self._created += 1
+        if create:
+            try:
+                return Worker()
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                raise
+        return self._idle.get()
+
+    def release(self, worker):
+        """Return a worker to the pool with its variables cleared, or drop it if it was killed."""
+        if worker.alive():
+            try:
+                worker.request(("reset",), timeout=WALL_SECONDS)
+                self._idle.put(worker)
+                return
+            except (TimeoutError, EOFError, OSError):
+                worker.kill()
+        with self._lock:
+            self._created -= 1
+
+    def discard(self, worker):
+        worker.kill()
+        with self._lock:
+            self._created -= 1
+
+    def prewarm(self, count=None):
+        """Start workers ahead of the first request."""
+        count = self.size if count is None else count
+        for _ in range(count):
+            with self._lock:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            self._idle.put(Worker())
+
+    def preload(self, file_path):
+        """Start the workers and have the idle ones load a dataset, in the background."""
+        def load():
+            self.prewarm()
+            workers = []
+            while True:
+                try:
+                    workers.append(self._idle.get_nowait())
+                except queue.Empty:
+                    break
+            for worker in workers:
+                try:
+                    worker.request(("load", file_path), timeout=WALL_SECONDS)
+                    self._idle.put(worker)
+                except Exception:
+                    self.discard(worker)
+
+        threading.Thread(target=load, daemon=True, name="indius-sandbox-preload").start()
+
+    def stats(self):
+        with self._lock:
+            return {"created": self._created, "idle": self._idle.qsize(), "size": self.size}
+
+
+sandbox_pool = SandboxPool()
+
+
+class SandboxExecutor:
+    """Drop-in CodeAgent python_executor that runs each code action in a sandbox worker.
+
+    One worker is leased for a whole agent run, so variables carry over between
+    steps as they do in-process. attach() names the dataset the worker's sql tool
+    queries, whether to also load it as df, and an optional threading.Event that
+    cancels a running action.
+    """
+
+    def __init__(self, additional_authorized_imports, pool=None):
+        self.additional_authorized_imports = additional_authorized_imports
+        self.pool = pool or sandbox_pool
+        self.state = {}
+        self.dataset = None
+        self.preload = False
+        self.cancel = None
+        self.worker = None
+
+    def attach(self, dataset=None, cancel=None, preload=False):
+        self.dataset = dataset
+        self.preload = preload
+        self.cancel = cancel
+
+    def __call__(self, code_action, additional_variables):
+        if self.worker is None:
+            self.worker = self.pool.acquire()
+        message = ("run", code_action, dict(additional_variables), self.additional_authorized_imports,
+                   self.dataset, self.preload, CPU_SECONDS)
+        try:
+            reply = self.worker.request(message, timeout=WALL_SECONDS, cancel=self.cancel)
+        except TimeoutError:
+            self.lost()
+            raise InterpreterError(f"Code execution exceeded the {WALL_SECONDS:g}s time limit and was stopped.")
+        except InterpreterError:
+            self.lost()
+            raise
+        except (EOFError, OSError):
+            self.lost()
+            raise InterpreterError(
+                "Code execution was stopped: the sandbox process exited, most likely by exceeding "
+                f"its {MEMORY_MB} MB memory limit. Variables from earlier steps are lost."
+            )
+        if reply[0] == "error":
+            _, error, logs = reply
+            self.state["_print_outputs"] = logs
+            raise InterpreterError(error)
+        _, output, logs, is_final_answer = reply
+        self.state["_print_outputs"] = logs
+        return output, logs, is_final_answer
+
+    def lost(self):
+        self.pool.discard(self.worker)
+        self.worker = None
+
+    def release(self):
+        """Give the leased worker back to the pool at the end of an agent run."""
+        if self.worker is not None:
+            self.pool.release(self.worker)
+        self.worker = None
+        self.state.clear()
+        self.attach()
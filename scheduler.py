@@ -0,0 +1,269 @@
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+from tracing import tracer
+
+# Provider quotas shared by every session in this process.
+REQUESTS_PER_MINUTE = float(os.getenv("INDIUS_LLM_RPM", "1000"))
+TOKENS_PER_MINUTE = float(os.getenv("INDIUS_LLM_TPM", "1000000"))
+MAX_RETRIES = int(os.getenv("INDIUS_LLM_RETRIES", "5"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+# HTTP statuses worth retrying: rate limiting and transient server errors.
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Latency samples kept per lane for the percentiles in stats().
+LATENCY_SAMPLES = 500
+
+# Lanes, in priority order: lower numbers are admitted first.
+INTERACTIVE = 0
+PREFETCH = 1
+LANE_NAMES = {INTERACTIVE: "interactive", PREFETCH: "prefetch"}
+
+_lane = contextvars.ContextVar("indius_lane", default=INTERACTIVE)
+
+
+def estimate_tokens(text):
+    """Rough token count: about four characters per token."""
+    return len(text) // 4 + 1
+
+
+def status_code(error):
+    """Return the HTTP status carried by a google-genai or LiteLLM exception, if any."""
+    for name in ("code", "status_code"):
+        value = getattr(error, name, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error):
+    return status_code(error) in RETRY_STATUSES
+
+
+class TokenBucket:
+    """Refills at rate_per_minute up to one minute's worth; callers take from it."""
+
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.level = rate_per_minute
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount):
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        self.refill()
+        # A request larger than the whole bucket waits for a full bucket rather than forever.
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.refill()
+        self.level -= amount
+
+    def adjust(self, amount):
+        """Correct an earlier take once the real cost is known; the level may go negative."""
+        self.level = min(self.capacity, self.level - amount)
+
+
+class Scheduler:
+    """Central gate for model calls.
+
+    Calls are admitted one at a time, interactive lane before prefetch lane, when
+    the request and token buckets allow. Rate-limit and transient server errors are retried
+    with full-jitter exponential backoff. Concurrent calls with the same key are
+    coalesced into one request whose result every caller receives.
+    """
+
+    def __init__(self, rpm=REQUESTS_PER_MINUTE, tpm=TOKENS_PER_MINUTE, retries=MAX_RETRIES):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.retries = retries
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._inflight = {}
+        self._active = 0
+        self._counters = dict.fromkeys(("calls", "requests", "retries", "rate_limited", "coalesced", "errors"), 0)
+        self._latency = {lane: deque(maxlen=LATENCY_SAMPLES) for lane in LANE_NAMES}
+        self._queued = {lane: deque(maxlen=LATENCY_SAMPLES) for lane in LANE_NAMES}
+
+    @contextmanager
+    def lane(self, lane):
+        """Send the model calls made inside the with-block through the given lane."""
+        token = _lane.set(lane)
+        try:
+            yield
+        finally:
+            _lane.reset(token)
+
+    def call(self, fn, key=None, tokens=1, usage=None):
+        """Run fn() under the rate limits, retrying transient failures.
+
+        key: calls with an equal, hashable key that overlap share one request.
+        tokens: estimated token cost, charged to the token bucket up front.
+        usage: optional function mapping fn's result to the real token count,
+        used to correct the estimate.
+        """
+        if key is None:
+            return self._run(fn, tokens, usage)
+        with self._cond:
+            self._counters["calls"] += 1
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = {"done": threading.Event(), "result": None, "error": None}
+            else:
+                self._counters["coalesced"] += 1
+        if not leader:
+            flight["done"].wait()
+            if flight["error"] is not None:
+                raise flight["error"]
+            return flight["result"]
+        try:
+            flight["result"] = self._run(fn, tokens, usage, counted=True)
+            return flight["result"]
+        except BaseException as e:
+            flight["error"] = e
+            raise
+        finally:
+            with self._cond:
+                del self._inflight[key]
+            flight["done"].set()
+
+    def stream(self, open_stream, tokens=1):
+        """Yield from open_stream() under the rate limits.
+
+        Failures before the first chunk are retried like call(); once chunks
+        have been yielded an error is passed on as is.
+        """
+        lane = _lane.get()
+        with self._cond:
+            self._counters["calls"] += 1
+        with tracer.span("llm.stream", lane=LANE_NAMES[lane], tokens=tokens) as span:
+            for attempt in itertools.count():
+                started = time.monotonic()
+                self._admit(lane, tokens)
+                if span:
+                    span.set(attempts=attempt + 1, queued=time.monotonic() - started)
+                yielded = False
+                try:
+                    for chunk in open_stream():
+                        yielded = True
+                        yield chunk
+                except GeneratorExit:
+                    # The consumer stopped reading; the request is over either way.
+                    self._record(lane, started)
+                    raise
+                except Exception as e:
+                    if not self._should_retry(e, attempt, allowed=not yielded):
+                        self._fail()
+                        raise
+                else:
+                    self._record(lane, started)
+                    return
+                self._backoff(attempt)
+
+    def stats(self):
+        """Return counters, queue depth and latency percentiles per lane."""
+        with self._cond:
+            depth = {name: 0 for name in LANE_NAMES.values()}
+            for lane, _, _ in self._waiting:
+                depth[LANE_NAMES[lane]] += 1
+            stats = dict(self._counters, active=self._active, queue_depth=depth)
+            for lane, name in LANE_NAMES.items():
+                latency, queued = list(self._latency[lane]), list(self._queued[lane])
+                stats[f"{name}_latency_p50"] = float(np.percentile(latency, 50)) if latency else None
+                stats[f"{name}_latency_p95"] = float(np.percentile(latency, 95)) if latency else None
+                stats[f"{name}_queue_p95"] = float(np.percentile(queued, 95)) if queued else None
+            return stats
+
+    def _run(self, fn, tokens, usage, counted=False):
+        lane = _lane.get()
+        if not counted:
+            with self._cond:
+                self._counters["calls"] += 1
+        with tracer.span("llm.call", lane=LANE_NAMES[lane], tokens=tokens) as span:
+            for attempt in itertools.count():
+                started = time.monotonic()
+                self._admit(lane, tokens)
+                if span:
+                    span.set(attempts=attempt + 1, queued=time.monotonic() - started)
+                try:
+                    result = fn()
+                except Exception as e:
+                    if not self._should_retry(e, attempt):
+                        self._fail()
+                        raise
+                else:
+                    self._record(lane, started)
+                    if usage is not None:
+                        actual = usage(result)
+                        if actual:
+                            with self._cond:
+                                self.tokens.adjust(actual - tokens)
+                            if span:
+                                span.set(tokens=actual)
+                    return result
+                self._backoff(attempt)
+
+    def _admit(self, lane, tokens):
+        """Block until this call is first in line and both buckets allow it."""
+        queued = time.monotonic()
+        with self._cond:
+            ticket = (lane, next(self._sequence), tokens)
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                if self._waiting[0] is ticket:
+                    delay = max(self.requests.delay(1), self.tokens.delay(tokens))
+                    if delay <= 0:
+                        break
+                    self._cond.wait(delay)
+                else:
+                    self._cond.wait()
+            heapq.heappop(self._waiting)
+            self.requests.take(1)
+            self.tokens.take(tokens)
+            self._counters["requests"] += 1
+            self._active += 1
+            self._queued[lane].append(time.monotonic() - queued)
+            self._cond.notify_all()
+
+    def _should_retry(self, error, attempt, allowed=True):
+        with self._cond:
+            self._active -= 1
+            if status_code(error) == 429:
+                self._counters["rate_limited"] += 1
+            retry = allowed and is_retryable(error) and attempt < self.retries
+            if retry:
+                self._counters["retries"] += 1
+            return retry
+
+    def _backoff(self, attempt):
+        # Full jitter keeps sessions that were throttled together from retrying in lockstep.
+        time.sleep(random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt)))
+
+    def _record(self, lane, started):
+        with self._cond:
+            self._active -= 1
+            self._latency[lane].append(time.monotonic() - started)
+
+    def _fail(self):
+        with self._cond:
+            self._counters["errors"] += 1
+
+
+scheduler = Scheduler()
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""Worker service that runs the app's heavy work for one or more UI processes.
+
+Start it with ``python service.py`` and point each Streamlit replica at it with
+INDIUS_SERVICE=<address>. The address is a Unix socket path, or host:port for
+replicas on other machines, which must then share the 'files' directory (and
+so the Arrow sidecars) with the service. The service and every replica need
+the same secret in INDIUS_SERVICE_KEY: requests are pickled, so anyone who can
+connect with the key can run code in the service. Profiling, dataset cards,
+quality checks, statistical tests, agent runs, prefetching and every model call
+happen here, so replicas share one response cache, agent pool and rate limiter.
+Each replica still loads the frames it shows and charts itself (load_frame), into
+its own dataset cache, from the sidecars it shares with the service.
+
+Without INDIUS_SERVICE the job functions below simply run in the UI process.
+"""
+
+import argparse
+import ast
+import functools
+import importlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from multiprocessing.connection import Client, Listener
+
+import config  # noqa: F401
+from cache import dataset_cache
+from card import dataset_card
+from ingest import load_table
+from profiler import profile_dataset
+from quality import quality_report
+from scheduler import scheduler
+from sql_engine import count_rows, is_large, sample
+from tracing import tracer
+import tracing
+
+ADDRESS = os.getenv("INDIUS_SERVICE")
+AUTHKEY = os.getenv("INDIUS_SERVICE_KEY", "").encode()
+# Jobs run at once; further requests queue.
+WORKERS = int(os.getenv("INDIUS_SERVICE_WORKERS", "16"))
+
+# The model and agent stack (smolagents, LiteLLM, google-genai, scipy) takes
+# seconds to import. Jobs import it when first used; warm_up loads it up front.
+HEAVY_MODULES = ("model", "stats_tests", "pool", "agent", "plot", "prefetch")
+
+JOBS = {}
+_serving = False
+# Runs jobs that only start background work, in the order they came in. Their
+# first call imports the agent stack, which the page should not wait for.
+_background = ThreadPoolExecutor(max_workers=1, thread_name_prefix="indius-background")
+_warmed = False
+_warm_lock = threading.Lock()
+
+
+def parse_address(address):
+    """Turn 'host:port' into a TCP address; anything else is a Unix socket path."""
+    host, _, port = address.rpartition(":")
+    if host and port.isdigit() and "/" not in address:
+        return host, int(port)
+    return address
+
+
+def authkey():
+    """Return the key connections authenticate with; there is no default, since it guards unpickling."""
+    if not AUTHKEY:
+        raise RuntimeError("INDIUS_SERVICE_KEY must be set to a secret shared by the service and the UI")
+    return AUTHKEY
+
+
+def job(stream=False):
+    """Register a function as a service job.
+
+    Calls run in this process unless INDIUS_SERVICE is set, in which case they
+    are sent to the service; stream jobs then yield what the service streams back.
+    """
+    def register(fn):
+        JOBS[fn.__name__] = (fn, stream)
+
+        @functools.wraps(fn)
+        def dispatch(*args, **kwargs):
+            if ADDRESS and not _serving:
+                return (remote_stream if stream else remote_call)(fn.__name__, args, kwargs)
+            if stream:
+                return traced_stream(fn.__name__, fn(*args, **kwargs))
+            with tracer.span(f"job.{fn.__name__}"):
+                return fn(*args, **kwargs)
+        return dispatch
+    return register
+
+
+def traced_stream(name, items):
+    with tracer.span(f"job.{name}"):
+        yield from items
+
+
+def connect(name, args, kwargs):
+    conn = Client(parse_address(ADDRESS), authkey=authkey())
+    # The service continues the caller's trace, if there is one.
+    conn.send((name, args, kwargs, tracing.context()))
+    return conn
+
+
+def remote_call(name, args, kwargs):
+    conn = connect(name, args, kwargs)
+    try:
+        kind, value = conn.recv()
+    finally:
+        conn.close()
+    if kind == "error":
+        raise value
+    return value
+
+
+def remote_stream(name, args, kwargs):
+    conn = connect(name, args, kwargs)
+    try:
+        while True:
+            kind, value = conn.recv()
+            if kind == "error":
+                raise value
+            if kind == "end":
+                return
+            yield value
+    finally:
+        # Closing early tells the service to stop the job.
+        conn.close()
+
+
+def load_frame(file_path):
+    """Load a dataset, reusing the parsed frame across reruns and sessions."""
+    with tracer.span("load_data", file=file_path) as span:
+        if is_large(file_path):
+            # Too big for pandas: work from an even sample; agents query the whole file with SQL
+            df = dataset_cache.get(file_path, sample)
+        else:
+            df = dataset_cache.get(file_path, load_table)
+        if span:
+            span.set(rows=len(df), columns=df.shape[1])
+        return df
+
+
+def agent_frame(file_path):
+    """Return the frame agents may use directly: None when they must query the file instead."""
+    return None if is_large(file_path) else load_frame(file_path)
+
+
+@lru_cache(maxsize=32)
+def full_row_count(file_path, version):
+    """Count the rows of a large file once per version."""
+    return count_rows(file_path)
+
+
+@job()
+def describe(file_name):
+    """Return the dataset's prompt description and its full row count."""
+    file_path = f"files/{file_name}"
+    df = load_frame(file_path)
+    # Compact description of the dataset shared by every prompt, built once per file version
+    data_info = dataset_card(file_path, df)
+    if not is_large(file_path):
+        return data_info, len(df)
+    rows = full_row_count(file_path, dataset_cache.version(file_path))
+    data_info = (f"The file has {rows} rows; the summary below describes a random sample of {len(df)} of them. "
+                 f"Use the sql tool for exact figures.\n{data_info}")
+    return data_info, rows
+
+
+@job()
+def profile(file_name):
+    file_path = f"files/{file_name}"
+    if is_large(file_path):
+        # Streamed from disk: the loaded frame is only a sample of it.
+        return profile_dataset(file_path)
+    return profile_dataset(file_path, load_frame(file_path))
+
+
+@job()
+def quality(file_name):
+    """Return the dataset's data-quality report (duplicates, keys, outliers, type violations)."""
+    file_path = f"files/{file_name}"
+    df = load_frame(file_path)
+    if is_large(file_path):
+        # Checked on the sample the other tabs use.
+        return quality_report(file_path, df, full_row_count(file_path, dataset_cache.version(file_path)))
+    return quality_report(file_path, df)
+
+
+def preload_workers(file_path):
+    import sandbox
+
+    if sandbox.ENABLED and not is_large(file_path):
+        sandbox.sandbox_pool.preload(file_path)
+
+
+@job()
+def preload(file_name):
+    """Warm the agent code workers with a dataset while the user reads the table."""
+    _background.submit(preload_workers, f"files/{file_name}")
+
+
+@job()
+def ask_literal(prompt):
+    """Ask for a Python literal and return it parsed; a reply that does not parse raises and is not cached."""
+    from model import get_response, is_literal
+
+    return ast.literal_eval(get_response(prompt, accept=is_literal).strip())
+
+
+@job(stream=True)
+def stream_text(prompt):
+    from model import stream_response
+
+    yield from stream_response(prompt)
+
+
+@job(stream=True)
+def answer(owner, question, file_name, data_info):
+    """Stream the events of answering a question, reusing the owner's prefetched result."""
+    from agent import stream_answer
+    from prefetch import prefetcher
+
+    # A suggested question may already be precomputing; its result lands in the response cache
+    prefetcher.wait(owner, file_name, question)
+    yield from stream_answer(question, file_name, data_info, agent_frame(f"files/{file_name}"))
+
+
+@job()
+def stats_test(text, file_name):
+    """Run the built-in test a hypothesis maps to, as (result, its text), or return None if none fits.
+
+    Rules map the hypothesis first, then the model. Raises ValueError when the
+    test it maps to does not suit the columns.
+    """
+    from stats_tests import format_result, route_hypothesis, run_test
+
+    df = load_frame(f"files/{file_name}")
+    spec = route_hypothesis(text, df)
+    if spec is None:
+        return None
+    result = run_test(df, spec)
+    return result, format_result(result)
+
+
+@job(stream=True)
+def hypothesis(text, file_name, data_info):
+    from agent import stream_hypothesis
+
+    yield from stream_hypothesis(text, file_name, data_info, agent_frame(f"files/{file_name}"))
+
+
+@job()
+def plot(data_info, file_name, chart_type, x_axis, y_axis):
+    from plot import generate_plot
+
+    return generate_plot(data_info, file_name, chart_type, x_axis, y_axis)
+
+
+def prefetch_answers(owner, file_name, questions, data_info):
+    from prefetch import prefetcher
+
+    prefetcher.prefetch(owner, file_name, questions, data_info, agent_frame(f"files/{file_name}"))
+
+
+@job()
+def prefetch(owner, file_name, questions, data_info):
+    """Start precomputing answers to the suggested questions."""
+    _background.submit(prefetch_answers, owner, file_name, questions, data_info)
+
+
+@job()
+def prefetch_status(owner):
+    from prefetch import prefetcher
+
+    return prefetcher.status(owner)
+
+
+@job()
+def invalidate_answers(version):
+    """Drop the cached answers computed from a dataset version that was replaced."""
+    from response_cache import response_cache
+
+    response_cache.invalidate(version)
+
+
+@job()
+def model_stats():
+    return scheduler.stats()
+
+
+@job()
+def traces():
+    """Return the traces recorded where the jobs run."""
+    return tracer.traces()
+
+
+def warm_up():
+    """Import the model and agent stack and create its clients and agents, once per process.
+
+    Keeps the first question, or plot, from paying for it.
+    """
+    global _warmed
+    with _warm_lock:
+        if _warmed:
+            return
+        _warmed = True
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+    from gemini import get_client
+    from pool import agent_pool
+
+    try:
+        get_client()
+    except ValueError:
+        # No API key configured; the first model call reports it.
+        pass
+    agent_pool.prewarm()
+
+
+def start_warm_up():
+    """Run warm_up on a background thread, unless the jobs run in a separate service."""
+    if ADDRESS and not _serving or _warmed:
+        return
+    threading.Thread(target=warm_up, name="indius-warm-up", daemon=True).start()
+
+
+def reply(conn, kind, value):
+    try:
+        conn.send((kind, value))
+    except Exception:
+        if kind != "error":
+            raise
+        # The exception itself does not pickle; send what it says.
+        conn.send((kind, RuntimeError(f"{type(value).__name__}: {value}")))
+
+
+def run_job(conn, request):
+    """Run one request and send its result, or each streamed item, back on conn."""
+    try:
+        name, args, kwargs, parent = request
+        fn, stream = JOBS[name]
+        with tracer.span(f"job.{name}", parent=parent):
+            if not stream:
+                reply(conn, "value", fn(*args, **kwargs))
+                return
+            items = fn(*args, **kwargs)
+            try:
+                for item in items:
+                    conn.send(("item", item))
+            except (OSError, EOFError):
+                # The UI went away; closing the generator cancels the work behind it.
+                items.close()
+                return
+            conn.send(("end", None))
+    except (OSError, EOFError):
+        pass
+    except Exception as e:
+        try:
+            reply(conn, "error", e)
+        except (OSError, EOFError):
+            pass
+    finally:
+        conn.close()
+
+
+def receive(conn, jobs):
+    """Read a request off the accept loop, so a slow client cannot stall it, and queue it."""
+    try:
+        request = conn.recv()
+    except (OSError, EOFError):
+        conn.close()
+        return
+    jobs.submit(run_job, conn, request)
+
+
+def serve(address=ADDRESS, workers=WORKERS):
+    """Accept requests on address until interrupted, running them on a pool of job threads."""
+    global _serving
+    key = authkey()
+    _serving = True
+    address = parse_address(address)
+    if isinstance(address, str) and os.path.exists(address):
+        # Left over from a previous run.
+        os.remove(address)
+    jobs = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="indius-job")
+    with Listener(address, authkey=key) as listener:
+        # Accept requests at once; ones that arrive early wait on the imports.
+        start_warm_up()
+        while True:
+            try:
+                conn = listener.accept()
+            except Exception:
+                # A client that dropped or failed the handshake.
+                continue
+            threading.Thread(target=receive, args=(conn, jobs), daemon=True).start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default=ADDRESS or os.path.join(".cache", "indius.sock"))
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    if not AUTHKEY:
+        parser.error("set INDIUS_SERVICE_KEY to a secret shared with the UI replicas")
+    os.makedirs(".cache", exist_ok=True)
+    print(f"Serving on {args.address}", flush=True)
+    serve(args.address, args.workers)
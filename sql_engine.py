@@ -0,0 +1,103 @@
+import os
+import threading
+from contextlib import contextmanager
+
+import duckdb
+import pyarrow.dataset as ds
+
+from cache import source_path
+from ingest import ensure_sidecar, is_fresh, sidecar_path
+
+# Files at least this large are queried in place instead of being loaded into pandas.
+LARGE_FILE_BYTES = int(os.getenv("INDIUS_LARGE_FILE_MB", "1024")) * 1024 ** 2
+# Largest result handed back to pandas; bigger results are truncated.
+MAX_RESULT_ROWS = int(os.getenv("INDIUS_SQL_MAX_ROWS", "10000"))
+# DuckDB spills to SPILL_DIR once a query needs more than MEMORY_LIMIT.
+MEMORY_LIMIT = os.getenv("INDIUS_DUCKDB_MEMORY", "2GB")
+THREADS = int(os.getenv("INDIUS_DUCKDB_THREADS", str(os.cpu_count() or 1)))
+SPILL_DIR = os.getenv("INDIUS_DUCKDB_SPILL", os.path.join(".cache", "duckdb"))
+# Rows of a large file loaded into pandas for the table, plots and summary.
+SAMPLE_ROWS = int(os.getenv("INDIUS_SAMPLE_ROWS", "100000"))
+
+TABLE = "data"
+
+_local = threading.local()
+
+
+def is_large(file_path):
+    """Check whether a file is too large to load whole into a DataFrame."""
+    return os.path.getsize(source_path(file_path)) >= LARGE_FILE_BYTES
+
+
+def connection():
+    """Return this thread's DuckDB connection; connections are not shared across threads."""
+    if getattr(_local, "connection", None) is None:
+        os.makedirs(SPILL_DIR, exist_ok=True)
+        _local.connection = duckdb.connect(config={
+            "threads": THREADS,
+            "memory_limit": MEMORY_LIMIT,
+            "temp_directory": SPILL_DIR,
+        })
+    return _local.connection
+
+
+def scans_csv(file_path):
+    """Tell whether a file is read from its CSV text, having no up-to-date sidecar."""
+    return file_path.endswith("csv") and not (os.path.exists(sidecar_path(file_path)) and is_fresh(file_path))
+
+
+def register(con, file_path):
+    """Expose a data file to con as the view TABLE, scanned lazily.
+
+    An up-to-date Arrow sidecar is scanned through pyarrow.dataset, which takes
+    DuckDB's column projection and filters; CSVs without one are read by
+    DuckDB's parallel CSV scanner. Workbook sheets are converted to a sidecar first.
+    """
+    if scans_csv(file_path):
+        con.read_csv(file_path).create_view(TABLE)
+    else:
+        con.register(TABLE, ds.dataset(ensure_sidecar(file_path), format="ipc"))
+
+
+@contextmanager
+def csv_reader(file_path, batch_rows):
+    """Stream a CSV's rows in order as an Arrow RecordBatchReader, through DuckDB's CSV scanner."""
+    # A cursor of its own, so queries run while the batches are read do not interfere.
+    con = connection().cursor()
+    try:
+        yield con.read_csv(file_path).to_arrow_reader(batch_rows)
+    finally:
+        con.close()
+
+
+def run_sql(file_path, query, max_rows=MAX_RESULT_ROWS):
+    """Run a SQL query over a data file and return at most max_rows rows as a DataFrame.
+
+    The file is visible as the table 'data'. df.attrs["truncated"] tells whether
+    rows were cut off.
+    """
+    con = connection()
+    register(con, file_path)
+    try:
+        relation = con.sql(query)
+        if relation is None:
+            return None
+        table = relation.limit(max_rows + 1).to_arrow_table()
+    finally:
+        con.execute(f"DROP VIEW IF EXISTS {TABLE}")
+    df = table.slice(0, max_rows).to_pandas()
+    df.attrs["truncated"] = table.num_rows > max_rows
+    return df
+
+
+def sample(file_path, rows=SAMPLE_ROWS):
+    """Return an even random sample of a file's rows, marked as such in df.attrs["sample"]."""
+    df = run_sql(file_path, f"SELECT * FROM {TABLE} USING SAMPLE {int(rows)} ROWS", rows)
+    df.attrs["sample"] = True
+    return df
+
+
+def count_rows(file_path):
+    """Count a file's rows without loading it."""
+    return int(run_sql(file_path, f"SELECT count(*) AS n FROM {TABLE}").iloc[0, 0])
+
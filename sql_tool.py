@@ -0,0 +1,24 @@
+from smolagents import Tool
+
+from sql_engine import MAX_RESULT_ROWS, TABLE, run_sql
+
+
+# Kept out of sql_engine so the UI can use the engine without importing smolagents.
+class SQLTool(Tool):
+    name = "sql"
+    description = (
+        f"Runs a DuckDB SQL query over the whole dataset, available as the table '{TABLE}', and returns "
+        f"the result as a pandas DataFrame of at most {MAX_RESULT_ROWS} rows. Filters and column selection "
+        "are pushed down into the file scan, so aggregate, filter and join in SQL and only fetch small results."
+    )
+    inputs = {"query": {"type": "string", "description": f"A DuckDB SQL query reading from '{TABLE}'."}}
+    output_type = "object"
+
+    def __init__(self, file_path=None):
+        super().__init__()
+        self.file_path = file_path
+
+    def forward(self, query):
+        if self.file_path is None:
+            raise ValueError("No dataset is attached to the sql tool.")
+        return run_sql(self.file_path, query)
@@ -0,0 +1,354 @@
+import json
+import re
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from charts import is_numeric
+from model import get_response
+
+ALPHA = 0.05
+# Category levels are only matched against the hypothesis text for columns this small.
+MAX_LEVELS = 1000
+
+TEST_NAMES = {
+    "t_test": "Welch's t-test",
+    "student_t": "Student's t-test",
+    "anova": "One-way ANOVA",
+    "mann_whitney": "Mann-Whitney U test",
+    "kruskal": "Kruskal-Wallis H test",
+    "chi_square": "Chi-square test of independence",
+    "pearson": "Pearson correlation",
+    "spearman": "Spearman rank correlation",
+    "kendall": "Kendall rank correlation",
+}
+
+# Words that name a test outright, matched as whole words.
+TEST_KEYWORDS = [
+    ("spearman", ("spearman",)),
+    ("kendall", ("kendall",)),
+    ("pearson", ("pearson",)),
+    ("chi_square", ("chi-square", "chi square", "chi2", "chi-squared", "contingency")),
+    ("anova", ("anova", "analysis of variance")),
+    ("kruskal", ("kruskal",)),
+    ("mann_whitney", ("mann-whitney", "mann whitney", "wilcoxon", "median", "non-parametric", "nonparametric")),
+    ("student_t", ("student",)),
+    ("t_test", ("t-test", "t test", "welch")),
+]
+# Wording that asks whether two columns vary together: a correlation for two
+# numeric columns, a chi-square test for two categorical ones.
+RELATION_WORDS = (
+    "correlated", "correlation", "correlate", "correlates", "relationship", "related", "relates",
+    "associated", "association",
+)
+CORRELATIONS = ("pearson", "spearman", "kendall")
+
+
+def find_spans(text, name):
+    """Return (start, end) of each whole-word occurrence of name in lower-case text."""
+    names = {name.lower(), name.lower().replace("_", " ")}
+    pattern = "|".join(re.escape(n) for n in sorted(names, key=len, reverse=True))
+    return [m.span() for m in re.finditer(rf"(?<![a-z0-9_])(?:{pattern})(?![a-z0-9_])", text)]
+
+
+def mentioned(text, names):
+    """Return the names that occur in text, in order of appearance.
+
+    Longer names are matched first, so 'sat_fat' is not also read as 'fat'.
+    """
+    taken, found = [], []
+    for name in sorted(names, key=lambda n: len(str(n)), reverse=True):
+        for start, end in find_spans(text, str(name)):
+            if all(end <= s or start >= e for s, e in taken):
+                taken.append((start, end))
+                found.append((start, name))
+                break
+    return [name for _, name in sorted(found, key=lambda item: item[0])]
+
+
+def mentioned_levels(text, series):
+    values = series.dropna().unique()
+    if len(values) > MAX_LEVELS:
+        return []
+    return mentioned(text, list(values))
+
+
+def parse_hypothesis(hypothesis, df):
+    """Map a hypothesis to a test spec with simple rules, or return None.
+
+    A spec is a dict with "test" (a TEST_NAMES key), two "columns" and, for group
+    comparisons, optional "levels" of the grouping column to compare.
+    """
+    text = hypothesis.lower()
+    columns = mentioned(text, list(df.columns))[:2]
+    if len(columns) == 1 and is_numeric(df[columns[0]]):
+        # "Do A and B differ in x?": the groups are named, their column is not.
+        columns += [
+            c for c in df.columns
+            if not is_numeric(df[c]) and len(mentioned_levels(text, df[c])) >= 2
+        ][:1]
+    if len(columns) < 2:
+        return None
+    numeric = [is_numeric(df[c]) for c in columns]
+    named = named_tests(text, numeric)
+    if len(named) > 1:
+        # Wording that fits more than one test is left to the language model.
+        return None
+    test = named[0] if named else None
+    levels = []
+    if numeric.count(True) == 1:
+        group = columns[numeric.index(False)]
+        levels = mentioned_levels(text, df[group])
+        count = len(levels) if len(levels) >= 2 else df[group].nunique()
+        if test == "mann_whitney" and count > 2:
+            # Medians or ranks of more than two groups.
+            test = "kruskal"
+        elif test is None or (test in ("t_test", "student_t") and count > 2 and len(levels) < 2):
+            test = "t_test" if count == 2 else "anova"
+    elif test is None:
+        test = "pearson" if all(numeric) else "chi_square"
+    return {"test": test, "columns": columns, "levels": levels}
+
+
+def named_tests(text, numeric):
+    """Return the tests lower-case hypothesis text asks for, given which of its two columns are numeric."""
+    named = [name for name, words in TEST_KEYWORDS if any(find_spans(text, w) for w in words)]
+    if "student_t" in named and "t_test" in named:
+        # "Student's t-test" names one test.
+        named.remove("t_test")
+    if "kruskal" in named and "mann_whitney" in named:
+        # So does "the nonparametric Kruskal-Wallis test".
+        named.remove("mann_whitney")
+    if any(find_spans(text, w) for w in RELATION_WORDS):
+        if all(numeric) and not any(name in CORRELATIONS for name in named):
+            named.insert(0, "pearson")
+        elif not any(numeric) and "chi_square" not in named:
+            named.insert(0, "chi_square")
+    return named
+
+
+def reply_object(reply):
+    """Return the JSON object in a model reply, or None."""
+    reply = reply.strip().strip("`")
+    try:
+        value = json.loads(reply[reply.find("{"):reply.rfind("}") + 1])
+    except ValueError:
+        return None
+    return value if isinstance(value, dict) else None
+
+
+def ask_for_spec(hypothesis, df):
+    """Have the language model map a hypothesis to a test spec, or return None."""
+    columns = {c: str(t) for c, t in df.dtypes.items()}
+    prompt = f"""
+    Map this hypothesis to one statistical test on a dataset with columns and dtypes {columns}.
+    Hypothesis: "{hypothesis}"
+    Available tests: {json.dumps(TEST_NAMES)}
+    Reply with only a JSON object, no backticks: {{"test": "<test key>", "columns": ["<column>", "<column>"], "levels": ["<group value>", ...]}}
+    "levels" lists the values of a categorical column to compare, or is empty. Reply {{"test": null}} if no test fits.
+    """
+    # A reply without a JSON object is not cached, so the next attempt asks again.
+    spec = reply_object(get_response(prompt, accept=lambda reply: reply_object(reply) is not None))
+    if spec is None or spec.get("test") not in TEST_NAMES:
+        return None
+    columns = spec.get("columns") or []
+    if len(columns) != 2 or any(c not in df.columns for c in columns):
+        return None
+    return {"test": spec["test"], "columns": list(columns), "levels": list(spec.get("levels") or [])}
+
+
+def route_hypothesis(hypothesis, df, use_model=True):
+    """Return a test spec for a hypothesis: rules first, then the language model."""
+    spec = parse_hypothesis(hypothesis, df)
+    if spec is None and use_model:
+        spec = ask_for_spec(hypothesis, df)
+    return spec
+
+
+def value_and_group(df, columns):
+    a, b = columns
+    if is_numeric(df[a]) and not is_numeric(df[b]):
+        return a, b
+    if is_numeric(df[b]) and not is_numeric(df[a]):
+        return b, a
+    return None
+
+
+def samples(df, columns, levels):
+    """Return the two or more samples a group comparison runs on, keyed by label."""
+    split = value_and_group(df, columns)
+    if split is None:
+        a, b = columns
+        if not (is_numeric(df[a]) and is_numeric(df[b])):
+            raise ValueError("Comparing groups needs a numeric column.")
+        # Two numeric columns: compare their values against each other.
+        return {a: df[a].dropna().to_numpy(float), b: df[b].dropna().to_numpy(float)}
+    value, group = split
+    data = df[[group, value]].dropna()
+    if levels:
+        data = data[data[group].isin(levels)]
+    groups = {str(k): v.to_numpy(float) for k, v in data.groupby(group, observed=True, sort=True)[value]}
+    return {k: v for k, v in groups.items() if len(v) >= 2}
+
+
+def summary(groups):
+    return {k: {"n": len(v), "mean": float(v.mean()), "median": float(np.median(v))} for k, v in groups.items()}
+
+
+def two_samples(df, columns, levels, test):
+    groups = samples(df, columns, levels)
+    if len(groups) != 2:
+        raise ValueError(
+            f"{TEST_NAMES[test]} compares exactly two groups but found {len(groups)}; "
+            "name the two groups in the hypothesis or use ANOVA."
+        )
+    return groups, *groups.values()
+
+
+def t_test(df, columns, levels, test="t_test"):
+    groups, a, b = two_samples(df, columns, levels, test)
+    result = stats.ttest_ind(a, b, equal_var=test == "student_t")
+    pooled = np.sqrt(((len(a) - 1) * a.var(ddof=1) + (len(b) - 1) * b.var(ddof=1)) / (len(a) + len(b) - 2))
+    return {
+        "statistic": ("t", result.statistic),
+        "p_value": result.pvalue,
+        "dof": round(float(result.df), 2),
+        "effect_size": ("Cohen's d", (a.mean() - b.mean()) / pooled if pooled else np.nan),
+        "groups": summary(groups),
+    }
+
+
+def mann_whitney(df, columns, levels, test="mann_whitney"):
+    groups, a, b = two_samples(df, columns, levels, test)
+    result = stats.mannwhitneyu(a, b, alternative="two-sided")
+    return {
+        "statistic": ("U", result.statistic),
+        "p_value": result.pvalue,
+        "effect_size": ("rank-biserial r", 1 - 2 * result.statistic / (len(a) * len(b))),
+        "groups": summary(groups),
+    }
+
+
+def anova(df, columns, levels, test="anova"):
+    groups = samples(df, columns, levels)
+    if len(groups) < 2:
+        raise ValueError("ANOVA needs at least two groups with two or more values each.")
+    result = stats.f_oneway(*groups.values())
+    values = np.concatenate(list(groups.values()))
+    between = sum(len(v) * (v.mean() - values.mean()) ** 2 for v in groups.values())
+    total = ((values - values.mean()) ** 2).sum()
+    return {
+        "statistic": ("F", result.statistic),
+        "p_value": result.pvalue,
+        "dof": (len(groups) - 1, len(values) - len(groups)),
+        "effect_size": ("eta squared", between / total if total else np.nan),
+        "groups": summary(groups),
+    }
+
+
+def kruskal(df, columns, levels, test="kruskal"):
+    groups = samples(df, columns, levels)
+    if len(groups) < 2:
+        raise ValueError("The Kruskal-Wallis test needs at least two groups with two or more values each.")
+    result = stats.kruskal(*groups.values())
+    n = sum(len(v) for v in groups.values())
+    return {
+        "statistic": ("H", result.statistic),
+        "p_value": result.pvalue,
+        "dof": len(groups) - 1,
+        "effect_size": ("epsilon squared", result.statistic / (n - 1)),
+        "groups": summary(groups),
+    }
+
+
+def chi_square(df, columns, levels, test="chi_square"):
+    a, b = columns
+    table = pd.crosstab(df[a], df[b])
+    if min(table.shape) < 2:
+        raise ValueError("The chi-square test needs at least two categories in each column.")
+    chi2, p_value, dof, _ = stats.chi2_contingency(table)
+    n = table.to_numpy().sum()
+    return {
+        "statistic": ("chi2", chi2),
+        "p_value": p_value,
+        "dof": int(dof),
+        "effect_size": ("Cramér's V", np.sqrt(chi2 / (n * (min(table.shape) - 1)))),
+        "n": int(n),
+    }
+
+
+def correlation(df, columns, levels, test="pearson"):
+    a, b = columns
+    if not (is_numeric(df[a]) and is_numeric(df[b])):
+        raise ValueError(f"{TEST_NAMES[test]} needs two numeric columns.")
+    data = df[[a, b]].dropna()
+    if len(data) < 3:
+        raise ValueError("Correlation needs at least three complete rows.")
+    x, y = data[a].to_numpy(float), data[b].to_numpy(float)
+    function = {"pearson": stats.pearsonr, "spearman": stats.spearmanr, "kendall": stats.kendalltau}[test]
+    result = function(x, y)
+    name = {"pearson": "r", "spearman": "rho", "kendall": "tau"}[test]
+    return {"statistic": (name, result.statistic), "p_value": result.pvalue, "n": len(data)}
+
+
+TESTS = {
+    "t_test": t_test,
+    "student_t": t_test,
+    "anova": anova,
+    "mann_whitney": mann_whitney,
+    "kruskal": kruskal,
+    "chi_square": chi_square,
+    "pearson": correlation,
+    "spearman": correlation,
+    "kendall": correlation,
+}
+
+
+def run_test(df, spec, alpha=ALPHA):
+    """Run the test a spec names and return its structured result.
+
+    Raises ValueError when the columns do not suit the test.
+    """
+    test, columns, levels = spec["test"], spec["columns"], spec.get("levels") or []
+    result = TESTS[test](df, columns, levels, test)
+    statistic_name, statistic = result.pop("statistic")
+    p_value = float(result.pop("p_value"))
+    output = {
+        "test": TEST_NAMES[test],
+        "columns": columns,
+        "statistic_name": statistic_name,
+        "statistic": float(statistic),
+        "p_value": p_value,
+        "alpha": alpha,
+        "significant": bool(p_value < alpha),
+    }
+    if levels:
+        output["levels"] = [str(level) for level in levels]
+    if "effect_size" in result:
+        name, value = result.pop("effect_size")
+        output["effect_size_name"], output["effect_size"] = name, float(value)
+    output.update(result)
+    return output
+
+
+def format_result(result):
+    """Render a test result as plain text for the explanation prompt."""
+    lines = [
+        f"Test: {result['test']}",
+        f"Columns: {', '.join(result['columns'])}",
+        f"{result['statistic_name']} = {result['statistic']:.4g}",
+        f"p-value = {result['p_value']:.4g} (alpha = {result['alpha']})",
+        f"Significant: {'yes' if result['significant'] else 'no'}",
+    ]
+    if "levels" in result:
+        lines.insert(2, f"Groups compared: {', '.join(result['levels'])}")
+    if "dof" in result:
+        lines.append(f"Degrees of freedom: {result['dof']}")
+    if "effect_size" in result:
+        lines.append(f"Effect size ({result['effect_size_name']}): {result['effect_size']:.4g}")
+    if "n" in result:
+        lines.append(f"Observations: {result['n']}")
+    for group, values in result.get("groups", {}).items():
+        lines.append(f"Group {group}: n = {values['n']}, mean = {values['mean']:.4g}, median = {values['median']:.4g}")
+    return "\n".join(lines)
@@ -0,0 +1,92 @@
+"""Shared fixtures: a scratch working directory, small CSV datasets and a local fake model API."""
+
+import io
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_llm import DEFAULT_REPLY, FakeLLMServer  # noqa: E402
+
+# Modules read their settings when first imported, so they are set before any
+# test imports them: caches go to a scratch directory and model calls to the
+# fake server, whose replies each test can set.
+SCRATCH = tempfile.mkdtemp(prefix="indius-tests-")
+_reply = {"fn": lambda prompt: DEFAULT_REPLY}
+SERVER = FakeLLMServer(lambda prompt: _reply["fn"](prompt)).start()
+os.environ.update({
+    "INDIUS_LLM_API_BASE": SERVER.url,
+    "GEMINI_API_KEY": "test",
+    "INDIUS_RESPONSE_CACHE": os.path.join(SCRATCH, "responses.sqlite3"),
+    "INDIUS_SANDBOX": "0",
+})
+os.environ.pop("INDIUS_SERVICE", None)
+
+import config  # noqa: E402,F401
+
+
+class Upload(io.BytesIO):
+    """Stands in for a Streamlit UploadedFile."""
+
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+
+@pytest.fixture
+def fake_llm():
+    """The fake model API, cleared of earlier calls; set .reply to a function of the prompt."""
+    SERVER.requests.clear()
+    SERVER.throttled = 0
+    SERVER.latency = SERVER.error_rate = SERVER.chunk_delay = 0.0
+    SERVER.rpm = None
+
+    class Control:
+        server = SERVER
+
+        @property
+        def requests(self):
+            return SERVER.requests
+
+        @property
+        def reply(self):
+            return _reply["fn"]
+
+        @reply.setter
+        def reply(self, fn):
+            _reply["fn"] = fn
+
+    yield Control()
+    _reply["fn"] = lambda prompt: DEFAULT_REPLY
+    SERVER.latency = SERVER.error_rate = SERVER.chunk_delay = 0.0
+    SERVER.rpm = None
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory with a 'files' folder, as the app does, and an empty dataset cache."""
+    from cache import dataset_cache
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "files").mkdir()
+    # Paths like 'files/data.csv' repeat across tests; forget what earlier tests cached under them.
+    dataset_cache.__init__(dataset_cache.max_bytes)
+    return tmp_path
+
+
+@pytest.fixture
+def write_csv(workdir):
+    """Return a function writing text (or bytes) to files/<name> and returning its app path."""
+    def write(name, data):
+        path = workdir / "files" / name
+        if isinstance(data, str):
+            path.write_text(data)
+        else:
+            path.write_bytes(data)
+        return f"files/{name}"
+    return write
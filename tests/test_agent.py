@@ -0,0 +1,61 @@
+import pytest
+
+from agent import stream_answer, stream_hypothesis
+from cache import dataset_cache
+from response_cache import response_cache
+
+FIGURE_CODE = """Thought: Plot it.
+Code:
+```py
+import plotly.graph_objects as go
+fig = go.Figure(go.Bar(x=df["kind"], y=df["price"]))
+final_answer(fig)
+```<end_code>"""
+
+ANSWER_CODE = """Thought: Count the rows.
+Code:
+```py
+final_answer(f"{len(df)} rows")
+```<end_code>"""
+
+
+def reply(prompt):
+    return FIGURE_CODE if "Create a Plotly graph" in prompt else ANSWER_CODE
+
+
+@pytest.fixture
+def menu(write_csv):
+    from ingest import load_table
+
+    path = write_csv("menu.csv", "kind,price\na,1.5\nb,2.5\na,3.5\n")
+    return load_table(path)
+
+
+def test_answer_and_figure_stream_from_one_run(menu, fake_llm):
+    fake_llm.reply = reply
+    events = list(stream_answer("How many rows?", "menu.csv", "three rows", menu))
+    steps, done = events[:-1], events[-1]
+    assert {event["stage"] for event in steps} == {"answer", "figure"}
+    assert all(event["type"] == "step" and event["error"] is None for event in steps)
+    assert done["type"] == "done"
+    assert done["answer"] == "3 rows"
+    assert done["figure"] is not None and done["figure"].data[0].type == "bar"
+    assert set(done["timings"]) == {"answer agent", "figure agent", "total"}
+
+
+def test_answers_are_cached_per_dataset_version(menu, fake_llm):
+    fake_llm.reply = reply
+    list(stream_answer("How many rows are there?", "menu.csv", "three rows", menu))
+    calls = len(fake_llm.requests)
+    done = list(stream_answer("How many rows are there?", "menu.csv", "three rows", menu))[-1]
+    assert len(fake_llm.requests) == calls
+    assert done["answer"] == "3 rows"
+    response_cache.invalidate(dataset_cache.version("files/menu.csv"))
+    list(stream_answer("How many rows are there?", "menu.csv", "three rows", menu))
+    assert len(fake_llm.requests) > calls
+
+
+def test_hypothesis_stream_ends_with_the_result(menu, fake_llm):
+    fake_llm.reply = lambda prompt: ANSWER_CODE
+    events = list(stream_hypothesis("Prices differ by kind", "menu.csv", "three rows", menu))
+    assert events[-1] == {"type": "final", "stage": "hypothesis", "result": "3 rows"}
@@ -0,0 +1,71 @@
+"""The page's tab fragments, driven through Streamlit's AppTest.
+
+AppTest reruns the whole script on every interaction, so these check that each
+fragment's widgets work and do not redo page-level work, not which code reran.
+"""
+
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import ROOT
+from prefetch import prefetcher
+from test_agent import reply as agent_reply
+
+MENU = "kind,price,calories\n" + "".join(f"{'ab'[i % 2]},{i + 0.5},{i * 20 + i % 3}\n" for i in range(40))
+
+
+def reply(prompt):
+    if "three interesting questions" in prompt:
+        return '["How many rows?", "Which kind is dearer?", "What is the top price?"]'
+    if "final_answer" in prompt:
+        return agent_reply(prompt)
+    return "1. Price rises with calories - use a correlation."
+
+
+@pytest.fixture
+def app(write_csv, fake_llm):
+    """The app with one CSV uploaded, after its first run."""
+    write_csv("menu.csv", MENU)
+    # The page loads its assets relative to the working directory.
+    os.symlink(os.path.join(ROOT, "logo.png"), "logo.png")
+    fake_llm.reply = reply
+    at = AppTest.from_file(os.path.join(ROOT, "main.py"), default_timeout=120)
+    at.run()
+    assert not at.exception
+    yield at
+    # Let the background answers finish before the next test changes directory.
+    for question in at.session_state.questions:
+        prefetcher.wait(at.session_state.session_id, "menu.csv", question)
+    prefetcher.cancel(at.session_state.session_id)
+
+
+def test_first_run_suggests_questions(app):
+    assert [b.label for b in app.button][:3] == ["How many rows?", "Which kind is dearer?", "What is the top price?"]
+
+
+def test_plot_tab_draws_without_regenerating_questions(app, fake_llm):
+    fake_llm.requests.clear()
+    app.selectbox(key="plot_type").set_value("Scatter Plot")
+    app.selectbox(key="x_axis").set_value("price")
+    app.selectbox(key="y_axis").set_value("calories")
+    app.button(key="plot_button").click().run()
+    assert not app.exception and not app.error
+    assert app.get("plotly_chart")
+    assert not any("three interesting questions" in prompt for prompt in fake_llm.requests)
+
+
+def test_ask_answers_in_the_table_tab(app):
+    app.text_input(key="tab1_input").input("How many rows?")
+    app.button(key="ask_button").click().run()
+    assert not app.exception and not app.error
+    assert any("40 rows" in str(element.value) for element in app.markdown)
+
+
+def test_hypothesis_tab_runs_a_built_in_test(app):
+    app.text_input[-1].input("Price is correlated with calories")
+    next(b for b in app.button if b.label == "Run Hypothesis!").click().run()
+    assert not app.exception and not app.error
+    assert any("Pearson correlation" in element.value for element in app.markdown)
+    assert any("Price rises with calories" in element.value for element in app.markdown)
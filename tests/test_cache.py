@@ -0,0 +1,79 @@
+import os
+
+import pandas as pd
+
+from cache import DatasetCache, file_digest, frame_nbytes
+
+
+def frame(rows):
+    return pd.DataFrame({"a": range(rows)})
+
+
+def loader_for(frames, calls):
+    def load(file_path):
+        calls.append(file_path)
+        return frames[file_path]
+    return load
+
+
+def test_hits_after_the_first_load(write_csv):
+    path = write_csv("a.csv", "a\n1\n")
+    cache, calls = DatasetCache(), []
+    load = loader_for({path: frame(3)}, calls)
+    first = cache.get(path, load)
+    assert cache.get(path, load) is first
+    assert calls == [path]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["bytes_held"] == frame_nbytes(first)
+
+
+def test_touched_file_with_the_same_content_still_hits(write_csv):
+    path = write_csv("a.csv", "a\n1\n")
+    cache, calls = DatasetCache(), []
+    load = loader_for({path: frame(3)}, calls)
+    cache.get(path, load)
+    os.utime(path, ns=(1, 1))
+    cache.get(path, load)
+    assert calls == [path]
+    write_csv("a.csv", "a\n2\n")
+    cache.get(path, load)
+    assert calls == [path, path]
+
+
+def test_least_recently_used_frames_are_evicted(write_csv):
+    paths = [write_csv(f"{name}.csv", "a\n1\n") for name in "abc"]
+    frames = {path: frame(100) for path in paths}
+    size = frame_nbytes(frames[paths[0]])
+    cache, calls = DatasetCache(max_bytes=2 * size), []
+    load = loader_for(frames, calls)
+    cache.get(paths[0], load)
+    cache.get(paths[1], load)
+    cache.get(paths[0], load)
+    cache.get(paths[2], load)
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["bytes_held"]) == (2, 1, 2 * size)
+    # b was used least recently, so it went; a was kept.
+    cache.get(paths[0], load)
+    cache.get(paths[1], load)
+    assert calls == [paths[0], paths[1], paths[2], paths[1]]
+
+
+def test_frames_larger_than_the_cache_are_not_held(write_csv):
+    path = write_csv("a.csv", "a\n1\n")
+    cache, calls = DatasetCache(max_bytes=10), []
+    load = loader_for({path: frame(100)}, calls)
+    cache.get(path, load)
+    cache.get(path, load)
+    assert len(calls) == 2
+    assert cache.stats()["bytes_held"] == 0
+
+
+def test_version_follows_the_content(write_csv):
+    path = write_csv("a.csv", "a\n1\n")
+    cache = DatasetCache()
+    assert cache.version(path) == file_digest(path)
+    write_csv("a.csv", "a\n2\n")
+    assert cache.version(path) == file_digest(path)
+    cache.invalidate(path)
+    assert cache.stats()["entries"] == 0
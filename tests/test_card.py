@@ -0,0 +1,16 @@
+from card import CARD_TOKENS, build_card, render_card
+from ingest import load_table
+from scheduler import estimate_tokens
+
+
+def test_card_fits_its_token_budget(write_csv):
+    rows = "".join(f"{i},{'abc'[i % 3]},{i * 0.5},  item {i}\n" for i in range(200))
+    path = write_csv("data.csv", "id,kind,price,name\n" + rows + "0,a,0.0,  item 0\n")
+    card = build_card(path, load_table(path))
+    text = render_card(card)
+    assert estimate_tokens(text) <= CARD_TOKENS
+    assert "Dataset 'data.csv': 201 rows, 4 columns." in text
+    assert "Data quality: 1 exact duplicate rows" in text
+    short = render_card(card, budget=40)
+    assert short.count("\n") < text.count("\n")
+    assert short.endswith("more columns.")
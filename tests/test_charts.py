@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import PLOT_TYPES, Z_REQUIRED, build_figure
+
+
+@pytest.fixture
+def menu():
+    rng = np.random.default_rng(0)
+    n = 300
+    return pd.DataFrame({
+        "restaurant": rng.choice(["Mcdonalds", "Subway", "Sonic"], n),
+        "calories": rng.normal(500, 100, n).round(),
+        "protein": rng.normal(25, 5, n).round(1),
+        "sodium": rng.normal(1000, 200, n).round(),
+    })
+
+
+@pytest.mark.parametrize("plot_type", PLOT_TYPES)
+def test_every_plot_type_draws(menu, plot_type):
+    z = "sodium" if plot_type in Z_REQUIRED or plot_type in ("Heatmap", "Contour Plot") else None
+    fig = build_figure(menu, plot_type, "calories", "protein", z)
+    assert len(fig.data) == 1
+    assert fig.layout.template.layout.paper_bgcolor is not None
+
+
+def test_large_scatter_becomes_a_density_grid(menu):
+    fig = build_figure(menu, "Scatter Plot", "calories", "protein", budget=100)
+    assert fig.data[0].type == "heatmap"
+    assert fig.data[0].z.sum() == len(menu)
+
+
+def test_small_traces_keep_every_point(menu):
+    fig = build_figure(menu, "Scatter Plot", "calories", "protein")
+    assert fig.data[0].type == "scattergl" and len(fig.data[0].x) == len(menu)
+
+
+def test_large_histograms_and_boxes_are_aggregated(menu):
+    histogram = build_figure(menu, "Histogram", "calories", "calories", budget=100).data[0]
+    assert histogram.type == "bar" and sum(histogram.y) == len(menu)
+    box = build_figure(menu, "Box Plot", "restaurant", "calories", budget=100).data[0]
+    assert box.type == "box" and list(box.x) == ["Mcdonalds", "Sonic", "Subway"] and box.q1 is not None
+
+
+def test_bar_chart_averages_by_category(menu):
+    bar = build_figure(menu, "Bar Chart", "restaurant", "calories").data[0]
+    means = menu.groupby("restaurant")["calories"].mean()
+    assert dict(zip(bar.x, bar.y)) == pytest.approx(means.to_dict())
+
+
+def test_zoom_range_filters_x(menu):
+    fig = build_figure(menu, "Line Chart", "calories", "protein", x_range=(450, 550))
+    assert min(fig.data[0].x) >= 450 and max(fig.data[0].x) <= 550
+
+
+def test_missing_z_and_unknown_types_are_errors(menu):
+    with pytest.raises(ValueError, match="Z-axis"):
+        build_figure(menu, "3D Surface Plot", "calories", "protein")
+    with pytest.raises(ValueError, match="Unsupported"):
+        build_figure(menu, "Pie Chart", "calories", "protein")
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+from downsample import box_stats, downsample_figure, histogram_bins, line_indices, lttb, minmax, stride
+
+
+def test_lttb_keeps_the_endpoints_and_the_peaks():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[4321] = 50
+    indices = lttb(x, y, 200)
+    assert len(indices) == 200
+    assert indices[0] == 0 and indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    assert 4321 in indices
+
+
+def test_minmax_keeps_each_buckets_extremes():
+    y = np.zeros(1000)
+    y[10], y[990] = -5, 5
+    indices = minmax(y, 20)
+    assert len(indices) <= 20
+    assert {10, 990} <= set(indices)
+
+
+def test_stride_and_small_inputs():
+    assert list(stride(10, 4)) == [0, 3, 6, 9]
+    assert list(stride(3, 10)) == [0, 1, 2]
+    assert list(lttb(np.arange(5.0), np.arange(5.0), 10)) == [0, 1, 2, 3, 4]
+
+
+def test_unsorted_lines_fall_back_to_minmax():
+    x = np.random.default_rng(0).permutation(1000)
+    y = np.arange(1000.0)
+    indices = line_indices(x, y, 50)
+    assert {0, 999} <= set(indices)
+
+
+def test_histogram_bins_count_every_value():
+    values = pd.Series(np.random.default_rng(0).normal(size=5000))
+    centers, counts, widths = histogram_bins(values, bins=50)
+    assert len(centers) == len(counts) == len(widths) == 50
+    assert counts.sum() == len(values)
+
+
+def test_box_stats_match_the_quartiles():
+    stats = box_stats(list(range(1, 101)) + [1000])
+    assert stats["median"] == 51
+    assert stats["upperfence"] == 100
+
+
+def test_downsample_figure_keeps_marker_colors_aligned():
+    n = 20_000
+    x = np.arange(n)
+    fig = go.Figure([
+        go.Scatter(x=x, y=x * 2.0, mode="markers", marker={"color": x}),
+        go.Scatter(x=x, y=np.sin(x / 100.0), mode="lines"),
+        go.Bar(x=[1, 2], y=[3, 4]),
+    ])
+    light = downsample_figure(fig, budget=1000)
+    markers, line, bar = light.data
+    assert len(markers.x) == len(markers.marker.color) == 1000
+    assert (np.asarray(markers.marker.color) == np.asarray(markers.x)).all()
+    assert (np.asarray(markers.y) == np.asarray(markers.x) * 2).all()
+    assert len(line.x) == 1000
+    assert bar.y == (3, 4)
+
+
+def test_large_histogram_and_box_traces_are_aggregated():
+    values = np.random.default_rng(0).normal(size=5000)
+    fig = go.Figure([go.Histogram(x=values), go.Box(x=np.repeat(["a", "b"], 2500), y=values)])
+    histogram, box = downsample_figure(fig, budget=1000).data
+    assert histogram.type == "bar" and sum(histogram.y) == len(values)
+    assert box.type == "box" and list(box.x) == ["a", "b"] and len(box.median) == 2
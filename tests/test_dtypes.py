@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+
+from dtypes import ARROW_STRING, compact_frame
+from ingest import load_table
+
+
+def test_integers_keep_64_bit_arithmetic():
+    df = compact_frame(pd.DataFrame({"a": [100_000, 200_000], "b": [100_000, 300_000]}))
+    assert (df["a"].dtype, df["b"].dtype) == (np.int64, np.int64)
+    assert (df["a"] * df["b"]).tolist() == [10_000_000_000, 60_000_000_000]
+    assert df["a"].cumsum().iloc[-1] == 300_000
+
+
+def test_exact_values_are_compacted():
+    df = pd.DataFrame({
+        "half": [0.5, 1.5] * 50,
+        "tenth": [0.1, 0.2] * 50,
+        "kind": ["a", "b"] * 50,
+        "label": [f"row {i}" for i in range(100)],
+    })
+    compact = compact_frame(df)
+    assert compact["half"].dtype == np.float32
+    assert compact["tenth"].dtype == np.float64
+    assert isinstance(compact["kind"].dtype, pd.CategoricalDtype)
+    assert compact["label"].dtype == ARROW_STRING
+    pd.testing.assert_frame_equal(compact.astype(df.dtypes), df)
+    memory = compact.attrs["memory"]
+    assert memory["after"] < memory["before"]
+
+
+def test_loaded_integers_stay_int64(write_csv):
+    path = write_csv("data.csv", "count\n1\n2\n3\n")
+    assert load_table(path)["count"].dtype == np.int64
@@ -0,0 +1,112 @@
+import json
+import urllib.error
+import urllib.request
+
+import pandas as pd
+import pytest
+
+import bench
+from fake_llm import DEFAULT_REPLY, FakeLLMServer, Recording
+
+
+def post(url, prompt, stream=False):
+    method = "streamGenerateContent?alt=sse" if stream else "generateContent"
+    request = urllib.request.Request(
+        f"{url}/v1beta/models/gemini-2.0-flash:{method}",
+        data=json.dumps({"contents": [{"role": "user", "parts": [{"text": prompt}]}]}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.read().decode()
+
+
+def test_recording_prefers_exact_prompts_then_the_first_match():
+    recording = Recording(entries=[
+        {"match": "plot", "reply": "first"},
+        {"match": "plot a chart", "reply": "second"},
+        {"prompt": "please  plot\na chart", "reply": "exact"},
+    ])
+    assert recording("please plot a chart") == "exact"
+    assert recording("plot a chart now") == "first"
+    assert recording("something else") == DEFAULT_REPLY
+
+
+def test_recording_reads_and_appends_to_its_file(tmp_path):
+    path = tmp_path / "replies.jsonl"
+    path.write_text(json.dumps({"prompt": "known", "reply": "from file"}) + "\n\n")
+    with FakeLLMServer(["from upstream"]) as upstream:
+        recording = Recording(str(path), upstream=upstream.url, api_key="test")
+        assert recording("known") == "from file"
+        assert recording("new prompt") == "from upstream"
+        # Asked upstream only once.
+        assert recording("new  prompt") == "from upstream"
+        assert upstream.requests == ["new prompt"]
+    assert recording.recorded == 1
+    assert Recording(str(path))("new prompt") == "from upstream"
+
+
+def test_replies_stream_in_chunks():
+    with FakeLLMServer(["one two three four five"], chunk_words=2) as server:
+        events = [line[len("data: "):] for line in post(server.url, "hi", stream=True).splitlines() if line]
+    texts = [json.loads(event)["candidates"][0]["content"]["parts"][0]["text"] for event in events]
+    assert texts == ["one two ", "three four ", "five"]
+
+
+def test_calls_past_the_rpm_limit_get_429():
+    with FakeLLMServer(["ok"], rpm=2) as server:
+        assert [json.loads(post(server.url, "hi"))["candidates"][0]["content"]["parts"][0]["text"]
+                for _ in range(2)] == ["ok", "ok"]
+        with pytest.raises(urllib.error.HTTPError) as raised:
+            post(server.url, "hi")
+    assert raised.value.code == 429
+    assert json.loads(raised.value.read())["error"]["code"] == 429
+    assert server.throttled == 1
+    assert server.requests == ["hi", "hi"]
+
+
+def test_error_rate_follows_the_seed():
+    def throttled(seed):
+        server = FakeLLMServer(error_rate=0.5, seed=seed)
+        server.httpd.server_close()
+        return [server.throttle() for _ in range(20)]
+
+    assert throttled(3) == throttled(3)
+    assert 0 < sum(throttled(3)) < 20
+
+
+def test_synthetic_datasets_keep_the_source_columns(tmp_path):
+    path = tmp_path / "synthetic.csv"
+    bench.synthesize(path, 50, chunk_rows=20)
+    source, synthetic = pd.read_csv(bench.SOURCE), pd.read_csv(path)
+    assert len(synthetic) == 50
+    assert list(synthetic.columns) == list(source.columns)
+    assert (synthetic["calories"] >= 0).all()
+
+
+def test_compare_flattens_numbers_but_not_settings():
+    result = {"config": {"latency": 0.5}, "seconds": 2.0, "latency": {"ask": bench.percentiles([1.0, 2.0, 3.0])}}
+    numbers = bench.flatten(result)
+    assert numbers["latency.ask.p50"] == 2.0
+    assert numbers["latency.ask.count"] == 3
+    assert numbers["seconds"] == 2.0
+    assert not any(key.startswith("config") for key in numbers)
+
+
+@pytest.mark.parametrize("match, profile", [
+    ("Create a Plotly graph", "figure"),
+    ("answer the user's question", "answer"),
+    ("Returns the fig object", "plot"),
+])
+def test_scripted_agent_replies_run(match, profile):
+    # Benchmarks would otherwise time agents failing until they run out of steps.
+    from smolagents.default_tools import FinalAnswerTool
+    from smolagents.local_python_executor import LocalPythonInterpreter
+
+    from pool import PROFILES
+
+    reply = next(entry["reply"] for entry in bench.SCRIPTED_REPLIES if entry.get("match") == match)
+    code = reply.split("```py\n")[1].split("```")[0]
+    interpreter = LocalPythonInterpreter(PROFILES[profile], {"final_answer": FinalAnswerTool()})
+    interpreter.state["df"] = pd.read_csv(bench.SOURCE)
+    output, _, is_final_answer = interpreter(code, {})
+    assert is_final_answer and output is not None
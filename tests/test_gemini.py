@@ -0,0 +1,35 @@
+from google import genai
+
+import gemini
+
+
+def new_client(fake_llm):
+    return genai.Client(api_key="test", http_options={"base_url": fake_llm.server.url})
+
+
+def ask(client):
+    return client.models.generate_content(model=gemini.TEXT_MODEL_ID, contents="hello").text
+
+
+def test_pooled_client_reuses_its_connection(fake_llm):
+    fake_llm.reply = lambda prompt: "hi"
+    fake_llm.server.connections.clear()
+    client = new_client(fake_llm)
+    assert gemini.keep_alive(client._api_client)
+    assert [ask(client) for _ in range(3)] == ["hi"] * 3
+    assert len(fake_llm.server.connections) == 1
+
+
+def test_other_sdk_releases_are_not_patched(fake_llm, monkeypatch):
+    monkeypatch.setattr(genai, "__version__", "9.0.0")
+    fake_llm.reply = lambda prompt: "hi"
+    client = new_client(fake_llm)
+    assert not gemini.keep_alive(client._api_client)
+    assert "_request_unauthorized" not in vars(client._api_client)
+    assert ask(client) == "hi"
+
+
+def test_unexpected_signature_is_not_patched(fake_llm, monkeypatch):
+    client = new_client(fake_llm)
+    monkeypatch.setattr(type(client._api_client), "_request_unauthorized", lambda self, request: None)
+    assert not gemini.keep_alive(client._api_client)
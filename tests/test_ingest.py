@@ -0,0 +1,57 @@
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+import ingest
+from conftest import Upload
+from ingest import append_base, ensure_sidecar, ingest_upload, is_fresh, load_table, sidecar_path
+
+
+def test_upload_round_trip(workdir):
+    path = ingest_upload(Upload("data.csv", b"a,b\n1,x\n2,y\n"))
+    assert load_table(path)["a"].tolist() == [1, 2]
+
+
+def test_appended_rows_extend_the_stored_sidecar(workdir):
+    path = ingest_upload(Upload("data.csv", b"a,b\n1,x\n2,y\n"))
+    assert append_base(path) is None
+    ingest_upload(Upload("data.csv", b"a,b\n1,x\n2,y\n3,z\n"))
+    df = load_table(path)
+    assert df["a"].tolist() == [1, 2, 3]
+    assert df["b"].astype(str).tolist() == ["x", "y", "z"]
+    assert append_base(path)[1] == 2
+
+
+def test_upload_continuing_the_last_row_is_not_an_append(workdir):
+    path = ingest_upload(Upload("data.csv", b"x\n1\n2"))
+    ingest_upload(Upload("data.csv", b"x\n1\n23\n4\n"))
+    assert load_table(path)["x"].tolist() == [1, 23, 4]
+    assert append_base(path) is None
+    pd.testing.assert_frame_equal(load_table(path), pd.read_csv(path), check_dtype=False)
+
+
+def test_sidecar_is_built_once_and_rebuilt_when_stale(write_csv):
+    path = write_csv("data.csv", "a,b\n1,x\n2,x\n3,y\n")
+    assert not is_fresh(path)
+    load_table(path)
+    assert os.path.exists(sidecar_path(path)) and is_fresh(path)
+    built = os.stat(sidecar_path(path)).st_mtime_ns
+    # Touched but unchanged: the content hash keeps the sidecar.
+    os.utime(path, ns=(1, 1))
+    ingest._verified.clear()
+    assert is_fresh(path)
+    load_table(path)
+    assert os.stat(sidecar_path(path)).st_mtime_ns == built
+    write_csv("data.csv", "a,b\n1,x\n2,x\n9,y\n")
+    assert not is_fresh(path)
+    assert load_table(path)["a"].tolist() == [1, 2, 9]
+    assert is_fresh(path)
+
+
+def test_sidecar_keeps_types_and_encodes_repeated_text(write_csv):
+    path = write_csv("data.csv", "n,kind,note\n1,a,first\n2,a,second\n3,b,third\n4,a,fourth\n")
+    schema = pa.ipc.open_file(ensure_sidecar(path)).schema
+    assert pa.types.is_integer(schema.field("n").type)
+    assert pa.types.is_dictionary(schema.field("kind").type)
+    assert pa.types.is_string(schema.field("note").type)
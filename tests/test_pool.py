@@ -0,0 +1,49 @@
+import threading
+import time
+
+from pool import AgentPool
+
+ANSWER_CODE = 'Code:\n```py\nfinal_answer("done")\n```<end_code>'
+
+
+def test_agents_are_reused_with_clean_state():
+    pool = AgentPool(size=2)
+    with pool.checkout("answer") as agent:
+        agent.state["df"] = "old frame"
+    with pool.checkout("answer") as again:
+        assert again is agent
+        assert "df" not in again.state
+    assert pool.stats()["answer"] == {"created": 1, "idle": 1}
+
+
+def test_callers_beyond_the_limit_wait_for_an_agent():
+    pool = AgentPool(size=1)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def use():
+        with pool.checkout("plot"):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=use) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert peak[0] == 1
+    assert pool.stats()["plot"] == {"created": 1, "idle": 1}
+
+
+def test_pooled_agents_share_connections(fake_llm):
+    fake_llm.reply = lambda prompt: ANSWER_CODE
+    fake_llm.server.connections.clear()
+    pool = AgentPool(size=1)
+    for question in ("one", "two", "three"):
+        with pool.checkout("answer") as agent:
+            assert agent.run(f"Answer {question}") == "done"
+    assert len(fake_llm.requests) == 3
+    assert len(fake_llm.server.connections) == 1
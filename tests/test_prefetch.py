@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+import agent
+from prefetch import Prefetcher
+
+
+@pytest.fixture
+def runs(monkeypatch):
+    """Replace the agent runs with streams that block until released; record what started."""
+    release = threading.Event()
+    started = []
+
+    def answer_streams(question, file_name, data_info, df=None, cancel=None):
+        def stream(stage):
+            started.append((question, stage))
+            release.wait(5)
+            yield {"type": "final", "stage": stage}
+        return {"figure": stream("figure"), "answer": stream("answer")}
+
+    monkeypatch.setattr(agent, "answer_streams", answer_streams)
+    yield started, release
+    release.set()
+
+
+def test_status_counts_queued_running_and_done(runs):
+    started, release = runs
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.prefetch("session", "menu.csv", ["q1", "q2"], "info")
+    while not started:
+        time.sleep(0.01)
+    assert prefetcher.status("session") == {"queued": 3, "running": 1, "done": 0}
+    assert prefetcher.status("other") == {"queued": 0, "running": 0, "done": 0}
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert prefetcher.status("session") == {"queued": 0, "running": 0, "done": 4}
+    assert len(started) == 4
+
+
+def test_wait_withdraws_runs_that_have_not_started(runs):
+    started, release = runs
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.prefetch("session", "menu.csv", ["q1", "q2"], "info")
+    # q2's runs are still queued behind q1's, so the caller is left to do them.
+    prefetcher.wait("session", "menu.csv", "q2", timeout=5)
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert {question for question, _ in started} == {"q1"}
+
+
+def test_a_new_file_cancels_the_previous_batch(runs):
+    started, release = runs
+    prefetcher = Prefetcher(workers=1)
+    prefetcher.prefetch("session", "menu.csv", ["q1", "q2"], "info")
+    prefetcher.prefetch("session", "sales.csv", ["q3"], "info")
+    release.set()
+    prefetcher._executor.shutdown(wait=True)
+    assert ("q2", "figure") not in started
+    assert {question for question, _ in started} <= {"q1", "q3"}
+    assert prefetcher.status("session")["done"] == 2
+    prefetcher.cancel("session")
+    assert prefetcher.status("session") == {"queued": 0, "running": 0, "done": 0}
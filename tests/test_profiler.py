@@ -0,0 +1,83 @@
+import os
+
+import pandas as pd
+
+import service
+import sql_engine
+from conftest import Upload
+from ingest import append_base, ingest_upload, load_table, sidecar_path
+from profiler import file_chunks, frame_chunks, profile_chunks, profile_dataset
+
+
+def fresh_profile(df):
+    return profile_chunks(frame_chunks(df)).result()
+
+
+def test_profile_matches_pandas(write_csv):
+    path = write_csv("data.csv", "a,b\n1,x\n2,y\n2,y\n,z\n")
+    df = load_table(path)
+    profile = profile_dataset(path, df)
+    assert profile["rows"] == 4
+    assert profile["duplicates"] == int(df.duplicated().sum()) == 1
+    assert profile["nulls"].to_dict() == {"a": 1, "b": 0}
+    assert profile["distinct"].to_dict() == {"a": 2, "b": 3}
+
+
+def test_appended_rows_are_merged_into_the_profile(workdir):
+    path = ingest_upload(Upload("data.csv", b"a,b\n1,x\n2,y\n"))
+    profile_dataset(path, load_table(path))
+    ingest_upload(Upload("data.csv", b"a,b\n1,x\n2,y\n2,y\n3,z\n"))
+    df = load_table(path)
+    assert append_base(path) is not None
+    merged, fresh = profile_dataset(path, df), fresh_profile(df)
+    assert merged["rows"] == fresh["rows"] == 4
+    assert merged["duplicates"] == fresh["duplicates"] == 1
+    pd.testing.assert_series_equal(merged["distinct"], fresh["distinct"])
+
+
+def test_appended_rows_that_widen_a_compact_dtype(workdir):
+    # 1.5 fits float32 exactly, so the column is compacted; 0.1 does not, so the
+    # appended version is float64. Hashes of both versions must still agree.
+    path = ingest_upload(Upload("data.csv", b"a\n1.5\n"))
+    assert load_table(path)["a"].dtype == "float32"
+    profile_dataset(path, load_table(path))
+    ingest_upload(Upload("data.csv", b"a\n1.5\n1.5\n0.1\n"))
+    df = load_table(path)
+    assert df["a"].dtype == "float64" and append_base(path) is not None
+    merged = profile_dataset(path, df)
+    assert merged["duplicates"] == 1
+    assert merged["distinct"]["a"] == 2
+
+
+def test_csv_without_sidecar_is_streamed(write_csv):
+    path = write_csv("data.csv", "a,b\n" + "".join(f"{i},{'xy'[i % 2]}\n" for i in range(1000)))
+    chunks = list(file_chunks(path, chunk_rows=300, start=100))
+    assert len(chunks) > 1
+    assert pd.concat(chunks)["a"].tolist() == list(range(100, 1000))
+    assert not os.path.exists(sidecar_path(path))
+
+
+def test_large_files_are_profiled_whole(write_csv, monkeypatch):
+    rows = "".join(f"{i},{i % 7}\n" for i in range(515))
+    write_csv("big.csv", "a,b\n" + rows)
+    monkeypatch.setattr(sql_engine, "LARGE_FILE_BYTES", 0)
+    monkeypatch.setattr(service, "sample", lambda file_path: sql_engine.sample(file_path, 50))
+    assert len(service.load_frame("files/big.csv")) == 50
+    profile = service.profile("big.csv")
+    assert profile["rows"] == 515
+    assert profile["distinct"]["b"] == 7
+
+
+def test_the_card_sample_does_not_stand_in_for_the_whole_profile(write_csv, monkeypatch):
+    # The page describes a dataset (profiling the sample for its card) before
+    # the Summary tab asks for the profile of the whole file.
+    rows = "".join(f"{i},{i % 7}\n" for i in range(515))
+    write_csv("big.csv", "a,b\n" + rows)
+    monkeypatch.setattr(sql_engine, "LARGE_FILE_BYTES", 0)
+    monkeypatch.setattr(service, "sample", lambda file_path: sql_engine.sample(file_path, 50))
+    data_info, total = service.describe("big.csv")
+    assert total == 515 and "sample of 50" in data_info
+    profile = service.profile("big.csv")
+    assert profile["rows"] == 515
+    assert profile["duplicates"] == 0
+    assert profile_dataset("files/big.csv", service.load_frame("files/big.csv"))["rows"] == 50
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+import service
+import sql_engine
+from quality import assess, quality_report, summary_line
+
+
+def messy_frame():
+    rng = np.random.default_rng(0)
+    n = 50
+    df = pd.DataFrame({
+        "id": np.arange(n),
+        "name": [f"Item {i}" for i in range(n)],
+        "price": rng.normal(10, 1, n).round(2),
+        "when": pd.date_range("2024-01-01", periods=n).astype(str),
+    })
+    # Row 1 repeats row 0 up to case, spacing and float noise.
+    df.loc[1, ["name", "price", "when"]] = ["  item 0 ", df.loc[0, "price"] + 1e-9, df.loc[0, "when"]]
+    # Rows 40 and 41 repeat row 3 exactly.
+    df.loc[40:41] = df.loc[3].values
+    df.loc[5, "when"] = "garbage"
+    df.loc[7, "price"] = 1000.0
+    return df
+
+
+def test_assess_finds_each_problem():
+    report = assess(messy_frame())
+    assert report["duplicates"] == {"rows": 2, "groups": 1, "examples": [[3, 40, 41]]}
+    assert report["duplicates"]["rows"] == int(messy_frame().duplicated().sum())
+    assert report["near_duplicates"]["rows"] == 1
+    assert report["near_duplicates"]["examples"] == [[0, 1]]
+    assert report["near_duplicates"]["ignored"] == ["id"]
+    assert report["outlier_rows"] == 1
+    columns = report["columns"]
+    assert columns.loc["when", "expected type"] == "date"
+    assert columns.loc["when", "type violations"] == 1
+    assert report["violations"] == 1
+    assert 0 < report["score"] < 100
+
+
+def test_unique_keys():
+    df = pd.DataFrame({"code": ["a", "b", "c"], "value": [1.5, 2.5, 3.5], "group": [1, 1, 2]})
+    assert assess(df)["keys"] == ["code"]
+
+
+def test_clean_frame_has_nothing_to_say():
+    df = pd.DataFrame({"a": [1, 2, 3, 4], "b": ["w", "x", "y", "z"]})
+    report = assess(df)
+    assert report["score"] == 100.0
+    assert report["duplicates"]["rows"] == report["near_duplicates"]["rows"] == 0
+    assert summary_line({**report, "keys": []}) is None
+
+
+def test_summary_line():
+    line = summary_line(assess(messy_frame()))
+    assert line.startswith("Data quality: 2 exact duplicate rows; 1 near-duplicate rows")
+    assert "when (1 not date)" in line
+
+
+def test_report_is_cached_per_version(write_csv):
+    path = write_csv("data.csv", "a\n1\n1\n")
+    first = quality_report(path, pd.read_csv(path))
+    assert quality_report(path, None)["duplicates"] == first["duplicates"]
+    write_csv("data.csv", "a\n1\n2\n")
+    assert quality_report(path, pd.read_csv(path))["duplicates"]["rows"] == 0
+
+
+def test_large_files_report_their_sample(write_csv, monkeypatch):
+    write_csv("big.csv", "a,b\n" + "".join(f"{i},{i % 7}\n" for i in range(515)))
+    monkeypatch.setattr(sql_engine, "LARGE_FILE_BYTES", 0)
+    monkeypatch.setattr(service, "sample", lambda file_path: sql_engine.sample(file_path, 50))
+    report = service.quality("big.csv")
+    assert (report["rows"], report["source_rows"]) == (50, 515)
+    assert service.quality("big.csv")["rows"] == 50
@@ -0,0 +1,74 @@
+import time
+
+import plotly.graph_objs as go
+import pytest
+
+import model
+from response_cache import ResponseCache
+
+
+def test_round_trips_text_json_and_figures(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"))
+    figure = go.Figure(go.Bar(x=[1, 2], y=[3, 4]))
+    cache.put("text", "v1", "Hello?", "m", "hi")
+    cache.put("json", "v1", "Questions", "m", ["a", "b"])
+    cache.put("figure", "v1", "Plot", "m", figure)
+    assert cache.get("text", "v1", "  hello ", "m") == (True, "hi")
+    assert cache.get("json", "v1", "Questions", "m") == (True, ["a", "b"])
+    found, replayed = cache.get("figure", "v1", "Plot", "m")
+    assert found and replayed.data[0].y == (3, 4)
+    assert cache.get("text", "v2", "Hello?", "m") == (False, None)
+    cache.put("text", "v1", "Broken", "m", object())
+    assert cache.get("text", "v1", "Broken", "m") == (False, None)
+
+
+def test_expired_and_invalidated_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), ttl=60)
+    cache.put("answer", "v1", "q", "m", "a")
+    cache.put("answer", "v2", "q", "m", "b")
+    cache.invalidate("v1")
+    assert cache.get("answer", "v1", "q", "m") == (False, None)
+    assert cache.get("answer", "v2", "q", "m") == (True, "b")
+    cache.ttl = -1
+    assert cache.get("answer", "v2", "q", "m") == (False, None)
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), max_bytes=25)
+    cache.put("text", "", "first", "m", "x" * 10)
+    time.sleep(0.01)
+    cache.put("text", "", "second", "m", "y" * 10)
+    time.sleep(0.01)
+    cache.get("text", "", "first", "m")
+    cache.put("text", "", "third", "m", "z" * 10)
+    assert cache.get("text", "", "first", "m")[0]
+    assert not cache.get("text", "", "second", "m")[0]
+
+
+def test_fuzzy_match(tmp_path):
+    cache = ResponseCache(str(tmp_path / "responses.sqlite3"), fuzzy_threshold=0.9)
+    cache.put("answer", "v1", "What is the average price per item?", "m", "4.2")
+    assert cache.get("answer", "v1", "What is the average price per item", "m", fuzzy=True) == (True, "4.2")
+    assert cache.get("answer", "v1", "What is the average price of items?", "m", fuzzy=True)[0]
+    assert not cache.get("answer", "v1", "Which item has the most calories?", "m", fuzzy=True)[0]
+
+
+def test_model_replies_are_served_from_the_cache(fake_llm):
+    fake_llm.reply = lambda prompt: "cached reply"
+    prompt = f"Say something {time.time()}"
+    assert model.get_response(prompt) == "cached reply"
+    assert model.get_response(prompt + "  ") == "cached reply"
+    assert len(fake_llm.requests) == 1
+
+
+def test_rejected_replies_are_not_cached(fake_llm):
+    import service
+
+    replies = iter(["Sure! Here are three questions: ...", '["a?", "b?", "c?"]'])
+    fake_llm.reply = lambda prompt: next(replies)
+    prompt = f"Give me three questions {time.time()}"
+    with pytest.raises(SyntaxError):
+        service.ask_literal(prompt)
+    assert service.ask_literal(prompt) == ["a?", "b?", "c?"]
+    assert service.ask_literal(prompt) == ["a?", "b?", "c?"]
+    assert len(fake_llm.requests) == 2
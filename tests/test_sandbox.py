@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+from smolagents.local_python_executor import InterpreterError
+
+import sandbox
+from sandbox import SandboxExecutor, SandboxPool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """A one-worker pool of real sandbox processes, killed afterwards."""
+    monkeypatch.setattr(sandbox, "MEMORY_MB", 1024)
+    monkeypatch.setattr(sandbox, "CPU_SECONDS", 2)
+    pool = SandboxPool(size=1)
+    yield pool
+    while not pool._idle.empty():
+        pool._idle.get().kill()
+
+
+@pytest.fixture
+def make_executor(pool):
+    """Return a function making executors on the pool; their workers go back to it afterwards."""
+    made = []
+
+    def make(imports=("pandas",)):
+        made.append(SandboxExecutor(list(imports), pool))
+        return made[-1]
+
+    yield make
+    for executor in made:
+        executor.release()
+
+
+def run(executor, code):
+    output, _, _ = executor(code + "\nfinal_answer(result)", {})
+    return output
+
+
+def test_variables_carry_over_and_workers_are_reused(pool, make_executor):
+    executor = make_executor()
+    run(executor, "total = 40\nresult = None")
+    assert run(executor, "result = total + 2") == 42
+    pid = executor.worker.process.pid
+    executor.release()
+    executor = make_executor()
+    with pytest.raises(InterpreterError, match="total"):
+        run(executor, "result = total")
+    # The same process, with the previous run's variables cleared.
+    assert executor.worker.process.pid == pid
+
+
+def test_frames_round_trip_through_shared_memory(make_executor):
+    executor = make_executor()
+    expected = pd.DataFrame({"a": range(200_000), "b": ["x", "y"] * 100_000})
+    df = run(executor, "import pandas as pd\nresult = pd.DataFrame({'a': range(200_000), 'b': ['x', 'y'] * 100_000})")
+    assert expected.memory_usage(deep=True).sum() > sandbox.SHM_THRESHOLD
+    pd.testing.assert_frame_equal(df, expected)
+    assert run(executor, "result = len(pd.DataFrame({'a': [1, 2]}))") == 2
+
+
+def test_preloaded_dataset_is_df(make_executor, write_csv):
+    path = write_csv("menu.csv", "kind,price\na,1.5\nb,2.5\n")
+    executor = make_executor()
+    executor.attach(path, preload=True)
+    assert run(executor, "result = float(df['price'].sum())") == 4.0
+
+
+def test_busy_loop_hits_the_cpu_limit(make_executor):
+    executor = make_executor([])
+    started = time.monotonic()
+    with pytest.raises(InterpreterError, match="CPU time limit"):
+        run(executor, "result = 0\nfor i in range(10 ** 9):\n    result += i")
+    assert time.monotonic() - started < 30
+    # The worker survives and takes the next action.
+    assert run(executor, "result = 1") == 1
+
+
+def test_large_allocation_raises_memory_error(make_executor):
+    executor = make_executor([])
+    with pytest.raises(InterpreterError, match="MemoryError"):
+        run(executor, "result = 'x' * (2 * 1024 ** 3)")
+    assert run(executor, "result = 'still here'") == "still here"
+
+
+def test_wall_clock_limit_stops_the_worker(pool, make_executor, monkeypatch):
+    monkeypatch.setattr(sandbox, "WALL_SECONDS", 0.5)
+    executor = make_executor(["time"])
+    with pytest.raises(InterpreterError, match="time limit"):
+        run(executor, "import time\ntime.sleep(30)\nresult = None")
+    assert executor.worker is None and pool.stats()["created"] == 0
+
+
+def test_cancel_returns_promptly(pool, make_executor):
+    cancel = threading.Event()
+    executor = make_executor(["time"])
+    executor.attach(cancel=cancel)
+    threading.Timer(0.5, cancel.set).start()
+    started = time.monotonic()
+    with pytest.raises(InterpreterError, match="cancelled"):
+        run(executor, "import time\ntime.sleep(30)\nresult = None")
+    assert time.monotonic() - started < 5
+    assert executor.worker is None and pool.stats()["created"] == 0
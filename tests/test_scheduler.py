@@ -0,0 +1,126 @@
+import random
+import threading
+import time
+
+import pytest
+from google import genai
+from google.genai import errors
+
+import scheduler as scheduler_module
+from scheduler import INTERACTIVE, PREFETCH, Scheduler
+
+
+@pytest.fixture(autouse=True)
+def quick_backoff(monkeypatch):
+    monkeypatch.setattr(scheduler_module, "BACKOFF_BASE", 0.01)
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+def generate(fake_llm):
+    client = genai.Client(api_key="test", http_options={"base_url": fake_llm.server.url})
+    return lambda: client.models.generate_content(model="gemini-2.0-flash", contents="hello").text
+
+
+def test_rate_limited_calls_are_retried(fake_llm, monkeypatch):
+    fake_llm.reply = lambda prompt: "ok"
+    fake_llm.server.error_rate = 0.5
+    monkeypatch.setattr(fake_llm.server, "_random", random.Random(1))
+    gate = Scheduler(retries=20)
+    assert [gate.call(generate(fake_llm)) for _ in range(5)] == ["ok"] * 5
+    stats = gate.stats()
+    assert fake_llm.server.throttled > 0
+    assert stats["rate_limited"] == stats["retries"] == fake_llm.server.throttled
+    assert stats["requests"] == 5 + fake_llm.server.throttled
+    assert len(fake_llm.requests) == 5
+    assert stats["errors"] == 0
+
+
+def test_retries_are_bounded(fake_llm):
+    fake_llm.server.error_rate = 1.0
+    gate = Scheduler(retries=2)
+    with pytest.raises(errors.APIError) as raised:
+        gate.call(generate(fake_llm))
+    assert raised.value.code == 429
+    assert fake_llm.server.throttled == 3
+    assert gate.stats()["errors"] == 1
+
+
+def test_other_errors_are_not_retried():
+    gate = Scheduler()
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        gate.call(broken)
+    assert len(calls) == 1
+
+
+def test_identical_calls_in_flight_share_one_request():
+    gate = Scheduler()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "shared"
+
+    threads = [threading.Thread(target=lambda: results.append(gate.call(slow, key="same"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ["shared"] * 3
+    assert len(calls) == 1
+    assert gate.stats()["coalesced"] == 2
+
+
+def test_interactive_calls_go_before_prefetch():
+    gate = Scheduler(rpm=600)
+    # An empty bucket admits one request every 0.1 s, so the calls queue up.
+    gate.requests.level = 0
+    order = []
+
+    def run(lane, name):
+        with gate.lane(lane):
+            gate.call(lambda: order.append(name))
+
+    threads = [threading.Thread(target=run, args=(PREFETCH, f"prefetch {i}")) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.03)
+    threads.append(threading.Thread(target=run, args=(INTERACTIVE, "interactive")))
+    threads[-1].start()
+    for thread in threads:
+        thread.join()
+    assert order[0] == "interactive"
+    assert sorted(order[1:]) == ["prefetch 0", "prefetch 1"]
+
+
+def test_streams_retry_only_before_the_first_chunk():
+    gate = Scheduler(retries=3)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise Unavailable()
+        yield "a"
+        yield "b"
+
+    assert list(gate.stream(flaky)) == ["a", "b"]
+    assert len(attempts) == 2
+
+    def breaks_midway():
+        yield "a"
+        raise Unavailable()
+
+    stream = gate.stream(breaks_midway)
+    assert next(stream) == "a"
+    with pytest.raises(Unavailable):
+        next(stream)
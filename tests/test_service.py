@@ -0,0 +1,88 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from multiprocessing import AuthenticationError
+
+import pytest
+
+import service
+from conftest import ROOT
+
+
+def test_serve_refuses_without_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "AUTHKEY", b"")
+    with pytest.raises(RuntimeError, match="INDIUS_SERVICE_KEY"):
+        service.serve(str(tmp_path / "indius.sock"))
+    assert not (tmp_path / "indius.sock").exists()
+
+
+def test_client_refuses_without_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "ADDRESS", str(tmp_path / "indius.sock"))
+    monkeypatch.setattr(service, "AUTHKEY", b"")
+    with pytest.raises(RuntimeError, match="INDIUS_SERVICE_KEY"):
+        service.model_stats()
+
+
+def test_command_line_refuses_without_key(tmp_path):
+    env = dict(os.environ, INDIUS_SERVICE_KEY="")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "service.py"), "--address", str(tmp_path / "s.sock")],
+                            cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode != 0
+    assert "INDIUS_SERVICE_KEY" in result.stderr
+
+
+@pytest.fixture
+def running_service(tmp_path, monkeypatch):
+    """A service process on a Unix socket, with this process sending its jobs there."""
+    address = str(tmp_path / "indius.sock")
+    env = dict(os.environ, INDIUS_SERVICE_KEY="secret")
+    worker = subprocess.Popen([sys.executable, os.path.join(ROOT, "service.py"), "--address", address],
+                              cwd=tmp_path, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 60
+    while not os.path.exists(address):
+        assert worker.poll() is None and time.monotonic() < deadline, "service did not start"
+        time.sleep(0.1)
+    monkeypatch.setattr(service, "ADDRESS", address)
+    yield address
+    worker.kill()
+    worker.wait()
+
+
+def test_jobs_run_in_the_service(running_service, monkeypatch):
+    monkeypatch.setattr(service, "AUTHKEY", b"secret")
+    assert "requests" in service.model_stats()
+
+
+def test_wrong_key_is_rejected(running_service, monkeypatch):
+    monkeypatch.setattr(service, "AUTHKEY", b"guess")
+    with pytest.raises(AuthenticationError):
+        service.model_stats()
+
+
+def test_replaced_answers_are_dropped_in_the_service(running_service, monkeypatch):
+    from response_cache import response_cache
+
+    monkeypatch.setattr(service, "AUTHKEY", b"secret")
+    # The service shares the test's cache file; this process must not do the work itself.
+    response_cache.put("answer", "old-version", "How many rows?", "model", "515")
+    monkeypatch.setattr(response_cache, "invalidate", lambda version: pytest.fail("invalidated locally"))
+    service.invalidate_answers("old-version")
+    assert response_cache.get("answer", "old-version", "How many rows?", "model") == (False, None)
+
+
+def test_hypotheses_are_routed_in_the_service(running_service, write_csv, fake_llm, monkeypatch):
+    import stats_tests
+
+    monkeypatch.setattr(service, "AUTHKEY", b"secret")
+    rows = "".join(f"{i},{i * 2 + i % 3}\n" for i in range(30))
+    write_csv("menu.csv", "protein,calories\n" + rows)
+    spec = {"test": "spearman", "columns": ["protein", "calories"], "levels": []}
+    fake_llm.reply = lambda prompt: json.dumps(spec)
+    # Routing and the model call behind it must not happen in this process.
+    monkeypatch.setattr(stats_tests, "route_hypothesis", lambda *args: pytest.fail("routed locally"))
+    result, text = service.stats_test("Is protein correlated with calories? Use a t-test.", "menu.csv")
+    assert result["test"] == "Spearman rank correlation"
+    assert "Test: Spearman rank correlation" in text
+    assert any("Map this hypothesis" in prompt for prompt in fake_llm.requests)
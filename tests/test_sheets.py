@@ -0,0 +1,50 @@
+import pandas as pd
+import pytest
+
+import sql_engine
+from agent import stream_answer
+from cache import dataset_cache, split_sheet
+from ingest import load_table, read_sheet, sheet_names
+from pool import AGENT_MODEL_ID
+from response_cache import response_cache
+from test_agent import reply
+
+
+@pytest.fixture
+def book(workdir):
+    pytest.importorskip("openpyxl")
+    with pd.ExcelWriter("files/book.xlsx", engine="openpyxl") as writer:
+        pd.DataFrame({"kind": list("aba"), "price": [1.5, 2.5, 3.5]}).to_excel(writer, sheet_name="One", index=False)
+        pd.DataFrame({"kind": list("abcde"), "price": [1, 2, 3, 4, 5]}).to_excel(writer, sheet_name="Two", index=False)
+        pd.DataFrame({"note": ["x"]}).to_excel(writer, sheet_name="Hidden", index=False)
+        writer.book["Hidden"].sheet_state = "hidden"
+    return "files/book.xlsx"
+
+
+def test_sheet_paths():
+    assert split_sheet("files/book.xlsx#Two") == ("files/book.xlsx", "Two")
+    assert split_sheet("files/book.xlsx") == ("files/book.xlsx", None)
+
+
+def test_visible_sheets_are_listed_in_order(book):
+    assert sheet_names(book) == ["One", "Two"]
+
+
+def test_sheets_are_read_by_name(book):
+    assert len(read_sheet(book)) == 3
+    assert read_sheet(f"{book}#Two")["kind"].tolist() == list("abcde")
+    two = load_table(f"{book}#Two")
+    assert two["price"].sum() == 15
+    assert sql_engine.run_sql(f"{book}#Two", "SELECT max(price) AS top FROM data")["top"].iloc[0] == 5
+
+
+def test_answers_are_cached_per_sheet(book, fake_llm):
+    fake_llm.reply = reply
+    one, two = load_table(f"{book}#One"), load_table(f"{book}#Two")
+    assert list(stream_answer("How many rows?", "book.xlsx#One", "a sheet", one))[-1]["answer"] == "3 rows"
+    assert list(stream_answer("How many rows?", "book.xlsx#Two", "a sheet", two))[-1]["answer"] == "5 rows"
+    # Replacing the workbook drops the answers for all of its sheets.
+    key = dataset_cache.dataset_key(f"{book}#Two")
+    assert response_cache.get("answer", key, "How many rows?", AGENT_MODEL_ID) == (True, "5 rows")
+    response_cache.invalidate(dataset_cache.version(book))
+    assert response_cache.get("answer", key, "How many rows?", AGENT_MODEL_ID) == (False, None)
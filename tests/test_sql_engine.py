@@ -0,0 +1,48 @@
+import pytest
+
+import sql_engine
+from ingest import ensure_sidecar
+from sql_tool import SQLTool
+
+ROWS = "item,calories\n" + "".join(f"item{i},{i * 10}\n" for i in range(100))
+
+
+@pytest.mark.parametrize("sidecar", [False, True])
+def test_queries_run_over_the_csv_or_its_sidecar(write_csv, sidecar):
+    path = write_csv("menu.csv", ROWS)
+    if sidecar:
+        ensure_sidecar(path)
+    assert sql_engine.scans_csv(path) is not sidecar
+    df = sql_engine.run_sql(path, "SELECT sum(calories) AS total FROM data WHERE calories >= 500")
+    assert df["total"].iloc[0] == sum(range(500, 1000, 10))
+    assert not df.attrs["truncated"]
+
+
+def test_results_are_capped_at_max_rows(write_csv):
+    path = write_csv("menu.csv", ROWS)
+    df = sql_engine.run_sql(path, "SELECT * FROM data ORDER BY calories", max_rows=10)
+    assert len(df) == 10 and df.attrs["truncated"]
+    assert df["calories"].tolist() == list(range(0, 100, 10))
+    assert not sql_engine.run_sql(path, "SELECT * FROM data", max_rows=100).attrs["truncated"]
+
+
+def test_count_and_sample(write_csv):
+    path = write_csv("menu.csv", ROWS)
+    assert sql_engine.count_rows(path) == 100
+    df = sql_engine.sample(path, 20)
+    assert len(df) == 20 and df.attrs["sample"]
+    assert df["item"].is_unique and set(df.columns) == {"item", "calories"}
+
+
+def test_large_files_are_detected_by_size(write_csv, monkeypatch):
+    path = write_csv("menu.csv", ROWS)
+    assert not sql_engine.is_large(path)
+    monkeypatch.setattr(sql_engine, "LARGE_FILE_BYTES", len(ROWS))
+    assert sql_engine.is_large(path)
+
+
+def test_sql_tool(write_csv):
+    path = write_csv("menu.csv", ROWS)
+    assert SQLTool(path)("SELECT count(*) AS n FROM data")["n"].iloc[0] == 100
+    with pytest.raises(ValueError):
+        SQLTool().forward("SELECT 1")
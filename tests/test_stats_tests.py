@@ -0,0 +1,84 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from stats_tests import ask_for_spec, parse_hypothesis, route_hypothesis, run_test
+
+
+@pytest.fixture
+def menu():
+    rng = np.random.default_rng(0)
+    n = 60
+    calories = rng.normal(500, 100, n)
+    return pd.DataFrame({
+        "restaurant": np.repeat(["Mcdonalds", "Subway", "Sonic"], n // 3),
+        "size": np.tile(["small", "large"], n // 2),
+        "calories": calories,
+        "protein": calories / 20 + rng.normal(0, 2, n),
+    })
+
+
+@pytest.mark.parametrize("hypothesis, test", [
+    ("Is protein correlated with calories in the latest test data?", "pearson"),
+    ("Protein has a relationship with calories", "pearson"),
+    ("Protein is associated with calories (Spearman)", "spearman"),
+    ("Restaurant is related to size", "chi_square"),
+    ("Mcdonalds and Subway differ in calories", "t_test"),
+    ("Calories differ by restaurant", "anova"),
+    ("Run a Student's t-test of calories between Mcdonalds and Subway", "student_t"),
+    ("Welch t test: calories of Sonic versus Subway", "t_test"),
+    ("Calories differ between the latest Mcdonalds and Subway items", "t_test"),
+    ("Median calories of Mcdonalds and Subway differ", "mann_whitney"),
+    ("Median calories differ by restaurant", "kruskal"),
+    ("Nonparametric comparison: calories differ by restaurant", "kruskal"),
+    ("Kruskal-Wallis (nonparametric): calories by restaurant", "kruskal"),
+])
+def test_rules_route_hypotheses(menu, hypothesis, test):
+    assert parse_hypothesis(hypothesis, menu)["test"] == test
+
+
+def test_substrings_do_not_name_tests(menu):
+    # "latest test" contains "t test".
+    spec = parse_hypothesis("Protein goes up with calories in the latest test batch", menu)
+    assert spec["test"] == "pearson"
+
+
+@pytest.mark.parametrize("hypothesis", [
+    "Is protein correlated with calories? Use a t-test.",
+    "Compare the median calories of Mcdonalds and Subway with a t-test",
+])
+def test_conflicting_wording_is_left_to_the_model(menu, hypothesis):
+    assert parse_hypothesis(hypothesis, menu) is None
+    assert route_hypothesis(hypothesis, menu, use_model=False) is None
+
+
+def test_model_routes_what_rules_cannot(menu, fake_llm):
+    spec = {"test": "spearman", "columns": ["protein", "calories"], "levels": []}
+    fake_llm.reply = lambda prompt: json.dumps(spec) if "Map this hypothesis" in prompt else "no"
+    hypothesis = "Is protein correlated with calories? Use a t-test."
+    assert route_hypothesis(hypothesis, menu) == spec
+    assert any(hypothesis in prompt for prompt in fake_llm.requests)
+
+
+def test_correlation_result(menu):
+    result = run_test(menu, {"test": "pearson", "columns": ["protein", "calories"]})
+    assert result["test"] == "Pearson correlation"
+    assert result["significant"] and result["statistic"] > 0.5
+
+
+def test_replies_without_a_spec_are_asked_again(menu, fake_llm):
+    spec = {"test": "pearson", "columns": ["protein", "calories"], "levels": []}
+    replies = iter(["I am not sure.", json.dumps(spec)])
+    fake_llm.reply = lambda prompt: next(replies)
+    hypothesis = "Protein tracks calories, but use a t-test"
+    assert ask_for_spec(hypothesis, menu) is None
+    assert ask_for_spec(hypothesis, menu) == spec
+
+
+def test_rank_comparison_of_more_than_two_groups(menu):
+    result = run_test(menu, parse_hypothesis("Median calories differ by restaurant", menu))
+    assert result["test"] == "Kruskal-Wallis H test"
+    assert result["statistic_name"] == "H" and result["dof"] == 2
+    assert set(result["groups"]) == {"Mcdonalds", "Sonic", "Subway"}
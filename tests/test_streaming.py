@@ -0,0 +1,38 @@
+import time
+
+import model
+from agent import stream_agent
+
+REPLY = "one two three four five six seven eight nine ten eleven twelve"
+
+
+def test_text_streams_in_chunks_then_comes_from_the_cache(fake_llm):
+    fake_llm.reply = lambda prompt: REPLY
+    fake_llm.server.chunk_delay = 0.1
+    prompt = f"Stream something {time.time()}"
+    started = time.perf_counter()
+    stream = model.stream_response(prompt)
+    first = next(stream)
+    first_seconds = time.perf_counter() - started
+    chunks = [first, *stream]
+    total_seconds = time.perf_counter() - started
+    assert len(chunks) == 3 and "".join(chunks) == REPLY
+    # The first words arrive before the reply is complete.
+    assert first_seconds < total_seconds - 0.15
+    assert list(model.stream_response(prompt)) == [REPLY]
+    assert len(fake_llm.requests) == 1
+
+
+def test_agent_steps_are_yielded_as_they_finish(write_csv, fake_llm):
+    from ingest import load_table
+
+    replies = iter([
+        'Thought: Look first.\nCode:\n```py\nprint(len(df))\n```<end_code>',
+        'Thought: Done.\nCode:\n```py\nfinal_answer("3")\n```<end_code>',
+    ])
+    fake_llm.reply = lambda prompt: next(replies)
+    df = load_table(write_csv("steps.csv", "a\n1\n2\n3\n"))
+    events = list(stream_agent("answer", "How many rows?", "steps.csv", "Count the rows of df.", df))
+    assert [event["type"] for event in events] == ["step", "step", "final"]
+    assert "3" in events[0]["observations"]
+    assert events[-1]["result"] == "3"
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from tracing import Tracer, aggregates, context
+
+
+def test_spans_nest_within_a_root():
+    tracer = Tracer()
+    with tracer.span("ignored"):
+        pass
+    assert tracer.traces() == {}
+    with tracer.span("request", root=True, file="menu.csv") as root:
+        with tracer.span("agent") as child:
+            child.set(steps=np.int64(3))
+            parent = context()
+        tracer.record("model", None, None, tokens=10)
+    (trace_id, spans), = tracer.traces().items()
+    names = {span["name"]: span for span in spans}
+    assert set(names) == {"request", "agent", "model"}
+    assert names["agent"]["parent_id"] == names["model"]["parent_id"] == root.span_id
+    assert parent == (trace_id, child.span_id)
+    assert names["request"]["attributes"] == {"file": "menu.csv"}
+    assert all(span["end"] >= span["start"] for span in spans)
+    assert context() is None
+
+
+def test_spans_continue_a_trace_from_another_process():
+    tracer = Tracer()
+    with tracer.span("service", parent=("a" * 32, "b" * 16)) as span:
+        pass
+    assert span.trace_id == "a" * 32 and span.parent_id == "b" * 16
+
+
+def test_errors_and_old_traces():
+    tracer = Tracer(max_traces=2)
+    with pytest.raises(KeyError):
+        with tracer.span("failing", root=True):
+            raise KeyError("x")
+    for _ in range(2):
+        with tracer.span("ok", root=True):
+            pass
+    traces = tracer.traces()
+    assert len(traces) == 2
+    assert [spans[0]["name"] for spans in traces.values()] == ["ok", "ok"]
+    assert aggregates(traces)["ok"]["count"] == 2
+
+
+def test_finished_traces_are_exported_as_otlp_json(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(export_path=str(path))
+    with pytest.raises(ValueError):
+        with tracer.span("request", root=True, cached=True, seconds=0.5):
+            with tracer.span("agent", steps=np.int64(2)):
+                raise ValueError("bad")
+    line, = path.read_text().splitlines()
+    resource, = json.loads(line)["resourceSpans"]
+    assert resource["resource"]["attributes"][0] == {"key": "service.name", "value": {"stringValue": "indius"}}
+    request, agent = resource["scopeSpans"][0]["spans"]
+    assert len(request["traceId"]) == 32 and len(request["spanId"]) == 16
+    assert "parentSpanId" not in request and agent["parentSpanId"] == request["spanId"]
+    assert int(request["endTimeUnixNano"]) >= int(request["startTimeUnixNano"])
+    assert request["attributes"] == [
+        {"key": "cached", "value": {"boolValue": True}},
+        {"key": "seconds", "value": {"doubleValue": 0.5}},
+    ]
+    assert agent["attributes"] == [{"key": "steps", "value": {"intValue": "2"}}]
+    assert agent["status"] == {"code": 2, "message": "ValueError: bad"}
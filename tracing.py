@@ -0,0 +1,188 @@
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+ENABLED = os.getenv("INDIUS_TRACING", "1") != "0"
+# Recent traces kept in memory for the developer panel and the aggregates.
+MAX_TRACES = int(os.getenv("INDIUS_TRACE_KEEP", "200"))
+# If set, each finished trace is appended to this file as one line of OTLP JSON.
+EXPORT_PATH = os.getenv("INDIUS_TRACE_FILE")
+SERVICE_NAME = "indius"
+# Show the developer tab with request waterfalls and latency percentiles.
+PANEL = os.getenv("INDIUS_DEV_PANEL", "0") == "1"
+
+_current = contextvars.ContextVar("indius_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace; times are Unix nanoseconds."""
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.start = time.time_ns()
+        self.end = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def context(self):
+        """The (trace id, span id) pair other processes use to attach child spans."""
+        return self.trace_id, self.span_id
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": self.end,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, (int, np.integer)):
+        return {"intValue": str(int(value))}
+    if isinstance(value, (float, np.floating)):
+        return {"doubleValue": float(value)}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(spans):
+    """Encode span dicts as an OpenTelemetry (OTLP/JSON) ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{
+            "scope": {"name": SERVICE_NAME},
+            "spans": [{
+                "traceId": span["trace_id"],
+                "spanId": span["span_id"],
+                **({"parentSpanId": span["parent_id"]} if span["parent_id"] else {}),
+                "name": span["name"],
+                "kind": 1,
+                "startTimeUnixNano": str(span["start"]),
+                "endTimeUnixNano": str(span["end"] or span["start"]),
+                "attributes": [{"key": k, "value": otlp_value(v)} for k, v in span["attributes"].items()],
+                "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+            } for span in spans],
+        }],
+    }]}
+
+
+class Tracer:
+    """Collects spans into traces, keeping the most recent ones.
+
+    A span marked root starts a new trace; other spans join the current trace
+    and are not recorded outside one, so work such as page reruns does not flood
+    the store. A trace is finished, and exported, when the span that started it
+    in this process ends.
+    """
+
+    def __init__(self, max_traces=MAX_TRACES, export_path=EXPORT_PATH):
+        self.max_traces = max_traces
+        self.export_path = export_path
+        self._traces = OrderedDict()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name, root=False, parent=None, **attributes):
+        """Time the with-block as a span and yield it (None if it is not recorded).
+
+        parent: a (trace id, span id) pair from another process to continue its trace.
+        """
+        current = _current.get()
+        if parent is None and current is not None and not root:
+            parent = current.context
+        if not ENABLED or (parent is None and not root):
+            yield None
+            return
+        trace_id, parent_id = parent if parent is not None else (secrets.token_hex(16), None)
+        span = Span(name, trace_id, parent_id, attributes)
+        local_root = root or current is None
+        with self._lock:
+            spans = self._traces.setdefault(trace_id, [])
+            spans.append(span)
+            self._traces.move_to_end(trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time_ns()
+            # Set rather than reset: generators may be closed from another context.
+            _current.set(current)
+            if local_root:
+                self.export(spans)
+
+    def record(self, name, start, end, **attributes):
+        """Add an already finished child span, with start and end in seconds since the epoch.
+
+        A missing start or end is taken as now.
+        """
+        current = _current.get()
+        if not ENABLED or current is None:
+            return
+        span = Span(name, current.trace_id, current.span_id, attributes)
+        now = time.time()
+        span.start, span.end = int((start or now) * 1e9), int((end or now) * 1e9)
+        with self._lock:
+            self._traces.setdefault(current.trace_id, []).append(span)
+
+    def export(self, spans):
+        if not self.export_path:
+            return
+        with self._lock:
+            payload = json.dumps(to_otlp([span.to_dict() for span in spans]))
+            with open(self.export_path, "a") as f:
+                f.write(payload + "\n")
+
+    def traces(self, limit=None):
+        """Return recent traces, newest first, as {trace id: [span dicts]}."""
+        with self._lock:
+            items = list(self._traces.items())[::-1][:limit]
+            return {trace_id: [span.to_dict() for span in spans] for trace_id, spans in items}
+
+
+def context():
+    """Return the current span's (trace id, span id), or None outside a trace."""
+    current = _current.get()
+    return current.context if current is not None else None
+
+
+def aggregates(traces):
+    """Return count, p50 and p95 seconds per span name over finished spans."""
+    durations = {}
+    for spans in traces.values():
+        for span in spans:
+            if span["end"] is not None:
+                durations.setdefault(span["name"], []).append((span["end"] - span["start"]) / 1e9)
+    return {
+        name: {"count": len(values), "p50": float(np.percentile(values, 50)), "p95": float(np.percentile(values, 95))}
+        for name, values in sorted(durations.items())
+    }
+
+
+tracer = Tracer()
+span = tracer.span